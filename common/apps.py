@@ -2,4 +2,38 @@ from django.apps import AppConfig
 
 class CommonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'common'
\ No newline at end of file
+    name = 'common'
+
+    def ready(self):
+        # The cache session engine refuses to run without its shared tier
+        from django.conf import settings
+        if settings.SESSION_ENGINE == 'common.sessions':
+            from common.sessions import get_session_tiers
+            get_session_tiers()
+
+        # Switch the MAIN database live when db_config.ini changes
+        from core.dbhelper import connect_signals as connect_db_config
+        connect_db_config()
+
+        # Keep the opt-in autocomplete indexes current on save/delete
+        from common.utils.autocomplete_index import connect_signals
+        connect_signals()
+
+        # Keep cached row versions (ETags of fetch views) current
+        from common.utils import record_versions
+        record_versions.connect_signals()
+
+        # Opt-in per-request query counting / N+1 detection
+        from common.utils import query_inspector
+        query_inspector.connect_signals()
+
+        # Compile the universal form schemas once, at startup
+        import common.forms.schemas  # noqa: F401 (registers the forms)
+        from common.utils.form_schema import get_form_registry
+        get_form_registry().compile_all()
+
+        # Sidebar menus declared in <app>/navigation.py, compiled once
+        from django.utils.module_loading import autodiscover_modules
+        from common.utils.navigation import get_navigation_registry
+        autodiscover_modules('navigation')
+        get_navigation_registry().compile_all()
@@ -0,0 +1,118 @@
+# common/backends.py
+"""
+Authentication against the MAIN database
+
+Users live in the 'itemgroups' table (description = username,
+narration = password, custid = tenant). Company info and customer database
+credentials come from 'customers' and 'softwares'.
+"""
+
+from django.db import connections
+import logging
+
+from common.utils.tenant_registry import get_tenant_registry, record_from_row
+from core.dbhelper import main_database_changed
+
+logger = logging.getLogger(__name__)
+
+
+class MainDatabaseAuthBackend:
+    """
+    Authenticate users with one joined, parameterized query
+
+    Runs on Django's persistent 'default' connection (CONN_MAX_AGE) rather
+    than opening a new psycopg2/sqlite3 connection per login. The softwares
+    column map is resolved once and shared with the tenant registry.
+    """
+
+    def __init__(self, using='default', registry=None):
+        self.using = using
+        self.registry = registry or get_tenant_registry()
+        self._query = None
+
+    def get_query(self):
+        """Build the joined authentication query (once per backend)"""
+        if self._query is None:
+            columns = self.registry.get_columns()
+            self._query = f"""
+                SELECT
+                    i.description,
+                    i.custid,
+                    s.{columns['custid']},
+                    c.custname,
+                    s.{columns['expiry']},
+                    s.{columns['host']},
+                    s.{columns['db']},
+                    s.{columns['username']},
+                    s.{columns['pwd']},
+                    s.{columns['dbpass']}
+                FROM itemgroups i
+                LEFT JOIN customers c ON c.custid = i.custid
+                LEFT JOIN softwares s ON s.{columns['custid']} = i.custid
+                WHERE i.description = %s
+                AND i.narration = %s
+            """
+        return self._query
+
+    def authenticate(self, request=None, username=None, password=None):
+        """
+        Authenticate a user and fetch their tenant in a single round trip
+
+        Returns:
+            dict: user data for the session, or None if authentication failed
+        """
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(self.get_query(), [username, password])
+            row = cursor.fetchone()
+
+        if not row:
+            logger.warning(f"Authentication failed - invalid credentials for user: {username}")
+            return None
+
+        db_username, custid, software_custid = row[0], row[1], row[2]
+
+        if not custid:
+            logger.error(f"No custid found for user: {username}")
+            return None
+
+        if software_custid is None:
+            logger.error(f"No customer database credentials found for custid: {custid}")
+            return None
+
+        tenant = record_from_row(custid, *row[3:])
+
+        # Keep the registry current with what we just read
+        self.registry.put(tenant)
+
+        return {
+            'username': db_username,
+            'custid': custid,
+            'company_name': tenant.company_name,
+            'company_expiry': tenant.company_expiry,
+
+            # Customer database credentials (for middleware)
+            'customer_db_host': tenant.db_host,
+            'customer_db_name': tenant.db_name,
+            'customer_db_user': tenant.db_user,
+            'customer_db_password': tenant.db_password,
+        }
+
+
+_backend = None
+
+
+def get_auth_backend():
+    """Return the shared authentication backend"""
+    global _backend
+    if _backend is None:
+        _backend = MainDatabaseAuthBackend()
+    return _backend
+
+
+def _reset_backend(sender, **kwargs):
+    """The registry and softwares column map belong to the previous MAIN database"""
+    global _backend
+    _backend = None
+
+
+main_database_changed.connect(_reset_backend)
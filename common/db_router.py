@@ -1,6 +1,31 @@
 # common/db_router.py
 
-from common.middleware.database_middleware import get_customer_db
+from common.middleware.database_middleware import get_customer_db, is_router_trace_enabled
+import logging
+
+# Structured routing trace, only written for sampled requests
+# (see DB_ROUTER_TRACE in settings)
+trace_logger = logging.getLogger('common.db_router.trace')
+
+MAIN_DB = 'default'
+
+# Marker for "the current request's customer database"
+CUSTOMER_DB = object()
+
+
+def trace_route(operation, model, db):
+    """Log a routing decision with structured fields"""
+    trace_logger.info(
+        'db route %s %s.%s -> %s',
+        operation, model._meta.app_label, model.__name__, db,
+        extra={
+            'operation': operation,
+            'app_label': model._meta.app_label,
+            'model': model.__name__,
+            'database': db,
+        },
+    )
+
 
 class CustomerDatabaseRouter:
     """
@@ -12,7 +37,8 @@ class CustomerDatabaseRouter:
     - Django admin, contenttypes, messages
     - Authentication tables (itemgroups, customers, softwares)
     
-    Customer Database ('customer_db'):
+    Customer Database (per-tenant alias 'tenant_<custid>', or 'customer_db'
+    when no tenant is logged in):
     - All customer-specific models:
       * common app (Organization, CompanyInformation)
       * laundry app models
@@ -41,56 +67,46 @@ class CustomerDatabaseRouter:
         'reports',
     }
     
+    def __init__(self):
+        # Precomputed app_label -> routing decision table, so routing a
+        # query is a single dict lookup instead of set checks per call
+        self.routes = {app_label: MAIN_DB for app_label in self.main_database_apps}
+        self.routes.update({app_label: CUSTOMER_DB for app_label in self.customer_database_apps})
+    
+    def route(self, model):
+        """
+        Get the database alias for a model
+        Unknown apps fall back to the MAIN database
+        """
+        db = self.routes.get(model._meta.app_label, MAIN_DB)
+        if db is CUSTOMER_DB:
+            db = get_customer_db()
+        return db
+    
     def db_for_read(self, model, **hints):
         """
         Route read operations to appropriate database
         """
-        app_label = model._meta.app_label
-        model_name = model.__name__
-        
-        # Django core apps -> MAIN database
-        if app_label in self.main_database_apps:
-            print(f"[ROUTER READ] App: {app_label}, Model: {model_name}, Using DB: default")
-            return 'default'
-        
-        # Customer apps -> CUSTOMER database
-        if app_label in self.customer_database_apps:
-            db = get_customer_db()
-            print(f"[ROUTER READ] App: {app_label}, Model: {model_name}, Using DB: {db}")
-            return db
-        
-        # Default to MAIN database
-        print(f"[ROUTER READ] App: {app_label}, Model: {model_name}, Using DB: default (fallback)")
-        return 'default'
+        db = self.route(model)
+        if is_router_trace_enabled():
+            trace_route('read', model, db)
+        return db
     
     def db_for_write(self, model, **hints):
         """
         Route write operations to appropriate database
         """
-        app_label = model._meta.app_label
-        model_name = model.__name__
-        
-        # Django core apps -> MAIN database
-        if app_label in self.main_database_apps:
-            print(f"[ROUTER WRITE] App: {app_label}, Model: {model_name}, Using DB: default")
-            return 'default'
-        
-        # Customer apps -> CUSTOMER database
-        if app_label in self.customer_database_apps:
-            db = get_customer_db()
-            print(f"[ROUTER WRITE] App: {app_label}, Model: {model_name}, Using DB: {db}")
-            return db
-        
-        # Default to MAIN database
-        print(f"[ROUTER WRITE] App: {app_label}, Model: {model_name}, Using DB: default (fallback)")
-        return 'default'
+        db = self.route(model)
+        if is_router_trace_enabled():
+            trace_route('write', model, db)
+        return db
     
     def allow_relation(self, obj1, obj2, **hints):
         """
         Allow relations if both objects are in the same database
         """
-        db1 = self.db_for_read(obj1.__class__)
-        db2 = self.db_for_read(obj2.__class__)
+        db1 = obj1._state.db or self.route(obj1.__class__)
+        db2 = obj2._state.db or self.route(obj2.__class__)
         
         # Allow relations if both in same database
         if db1 and db2:
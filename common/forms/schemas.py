@@ -0,0 +1,693 @@
+# common/forms/schemas.py
+"""
+Universal form declarations
+
+Each form is declared once here and compiled at startup by
+common.utils.form_schema; views get the compiled schema with
+get_form_schema() / form_context(). 'action' may be a URL name
+('common:save_company'), reversed on first use.
+"""
+
+from datetime import date
+
+from common.utils.form_schema import register_form
+
+
+def year_start():
+    return f'{date.today().year}-01-01'
+
+
+def year_end():
+    return f'{date.today().year}-12-31'
+
+
+COMPANY_FORM = {
+    'form_id': 'company-form',
+    'title': 'Company Information',
+    'icon': '🏢',
+    'action': 'common:save_company',
+    'footer_status': 'Ready',
+    'background': 'white',
+    
+    # Buttons configuration
+    'buttons': [
+        {
+            'label': 'New',
+            'icon': '➕',
+            'type': 'primary',
+            'onclick': "newCompany()"
+        },
+        {
+            'label': 'Save',
+            'icon': '💾',
+            'type': 'success',
+            'onclick': "saveCompany()"
+        },
+        {
+            'label': 'Delete',
+            'icon': '🗑️',
+            'type': 'danger',
+            'onclick': "deleteCompany()"
+        },
+    ],
+    
+    # Menu items
+    'menu_items': [
+        {'label': 'Print', 'icon': '🖨️', 'onclick': "printCompany()"},
+        {'label': 'Export', 'icon': '📤', 'onclick': "exportCompany()"},
+        {'label': 'Import', 'icon': '📥', 'onclick': "importCompany()"},
+        {'label': 'Settings', 'icon': '⚙️', 'onclick': "companySettings()"},
+    ],
+    
+    # Field groups
+    'groups': [
+        {
+            'id': 'address',
+            'title': 'General',
+            'icon': '📍',
+        },
+        {
+            'id': 'contact',
+            'title': 'Contact Information',
+            'icon': '📞',
+        },
+        {
+            'id': 'financial',
+            'title': 'Financial Information',
+            'icon': '💰',
+        },
+        {
+            'id': 'options',
+            'title': 'Options',
+            'icon': '🔗',
+        },
+    ],
+    
+    # Fields configuration
+    'fields': [
+        # Basic Information Fields
+        {
+            'name': 'company_code',
+            'label': 'Company Code',
+            'type': 'text',
+            'required': True,
+            'width': '50%',
+            'placeholder': 'Enter Company code',
+            'group': None,
+            'db_field': 'CompanyId',
+            'lookup': True,  # Enable exact lookup
+        },
+        {
+            'name': 'company_name',
+            'label': 'Company Name',
+            'type': 'text',
+            'required': True,
+            'width': '50%',
+            'placeholder': 'Start typing to search...',
+            'group': None,
+            'db_field': 'CompanyName',
+            'autocomplete': True,  # Enable autocomplete dropdown
+        },
+        {
+            'name': 'arabic_name',
+            'label': 'Arabic Name',
+            'type': 'text',
+            'required': False,
+            'width': '33.33%',
+            'placeholder': 'Enter Arabic name',
+            'group': None,
+            'db_field': 'ArabicName'
+        },
+        {
+            'name': 'subtitle',
+            'label': 'Subtitle',
+            'type': 'text',
+            'required': False,
+            'width': '33.33%',
+            'placeholder': 'Enter subtitle',
+            'group': None,
+            'db_field': 'Subtitle'
+        },
+        {
+            'name': 'business_type',
+            'label': 'Business Type',
+            'type': 'select',
+            'required': True,
+            'width': '33.33%',
+            'placeholder': 'Select business type',
+            'group': None,
+            'db_field': 'BusinessType',
+            'options': [
+                {'value': '1', 'label': 'Laundry'},
+                {'value': '2', 'label': 'Restaurant'},
+            ]
+        },
+        {
+            'name': 'period_from',
+            'label': 'Period From',
+            'type': 'date',
+            'required': True,
+            'width': '50%',
+            'group': None,
+            'db_field': 'PeriodFrom',
+            'default': year_start
+        },
+        {
+            'name': 'period_to',
+            'label': 'Period To',
+            'type': 'date',
+            'required': True,
+            'width': '50%',
+            'group': None,
+            'db_field': 'PeriodTo',
+            'default': year_end
+        },
+
+        # Address Group
+        {
+            'name': 'crno',
+            'label': 'CR No',
+            'type': 'text',
+            'required': False,
+            'width': '50%',
+            'placeholder': 'CR No',
+            'group': 'address',
+            'db_field': 'CrNo'
+        },
+        {
+            'name': 'licenseno',
+            'label': 'License No',
+            'type': 'text',
+            'required': False,
+            'width': '50%',
+            'placeholder': 'License No',
+            'group': 'address',
+            'db_field': 'LicenseNo'
+        },
+        {
+            'name': 'address1',
+            'label': 'Address 1',
+            'type': 'text',
+            'required': False,
+            'width': '33.33%',
+            'placeholder': 'Enter address 1',
+            'group': 'address',
+            'db_field': 'Address1'
+        },
+        {
+            'name': 'address2',
+            'label': 'Address 2',
+            'type': 'text',
+            'required': False,
+            'width': '33.33%',
+            'placeholder': 'Enter address 2',
+            'group': 'address',
+            'db_field': 'Address2'
+        },
+        {
+            'name': 'address3',
+            'label': 'Address 3',
+            'type': 'text',
+            'required': False,
+            'width': '33.33%',
+            'placeholder': 'Enter address 3',
+            'group': 'address',
+            'db_field': 'Address3'
+        },
+        {
+            'name': 'building_no',
+            'label': 'Building No',
+            'type': 'text',
+            'required': False,
+            'width': '33.33%',
+            'placeholder': 'Enter building number',
+            'group': 'address',
+            'db_field': 'BuildingNo'
+        },
+        {
+            'name': 'street_name',
+            'label': 'Street Name',
+            'type': 'text',
+            'required': False,
+            'width': '33.33%',
+            'placeholder': 'Enter street name',
+            'group': 'address',
+            'db_field': 'StreetName'
+        },
+        {
+            'name': 'zone',
+            'label': 'Zone',
+            'type': 'text',
+            'required': False,
+            'width': '33.33%',
+            'placeholder': 'Enter zone',
+            'group': 'address',
+            'db_field': 'Zone'
+        },
+        {
+            'name': 'area',
+            'label': 'Area',
+            'type': 'text',
+            'required': False,
+            'width': '33.33%',
+            'placeholder': 'Enter area',
+            'group': 'address',
+            'db_field': 'Area'
+        },
+        {
+            'name': 'city',
+            'label': 'City',
+            'type': 'text',
+            'required': False,
+            'width': '33.33%',
+            'placeholder': 'Enter city',
+            'group': 'address',
+            'db_field': 'City'
+        },
+        {
+            'name': 'state',
+            'label': 'State/Province',
+            'type': 'text',
+            'required': False,
+            'width': '33.33%',
+            'placeholder': 'Enter state',
+            'group': 'address',
+            'db_field': 'State'
+        },
+        {
+            'name': 'district',
+            'label': 'District',
+            'type': 'text',
+            'required': False,
+            'width': '33.33%',
+            'placeholder': 'Enter district',
+            'group': 'address',
+            'db_field': 'District'
+        },
+        {
+            'name': 'po_box',
+            'label': 'PO Box',
+            'type': 'text',
+            'required': False,
+            'width': '33.33%',
+            'placeholder': 'Enter PO Box',
+            'group': 'address',
+            'db_field': 'PoBox'
+        },
+        {
+            'name': 'plot_identification',
+            'label': 'Plot Identification',
+            'type': 'text',
+            'required': False,
+            'width': '33.33%',
+            'placeholder': 'Enter plot identification',
+            'group': 'address',
+            'db_field': 'PlotIdentification'
+        },
+        
+        # Contact Information Group
+        {
+            'name': 'phone',
+            'label': 'Phone',
+            'type': 'text',
+            'required': False,
+            'width': '50%',
+            'placeholder': 'Enter phone number',
+            'group': 'contact',
+            'db_field': 'Phone'
+        },
+        {
+            'name': 'mobile',
+            'label': 'Mobile',
+            'type': 'text',
+            'required': False,
+            'width': '50%',
+            'placeholder': 'Enter mobile number',
+            'group': 'contact',
+            'db_field': 'Mobile'
+        },
+        {
+            'name': 'email',
+            'label': 'Email',
+            'type': 'email',
+            'required': False,
+            'width': '50%',
+            'placeholder': 'Start typing email...',
+            'group': 'contact',
+            'db_field': 'Email',
+            'autocomplete': True,  # Enable autocomplete
+        },
+        {
+            'name': 'website',
+            'label': 'Website',
+            'type': 'text',
+            'required': False,
+            'width': '50%',
+            'placeholder': 'Enter website URL',
+            'group': 'contact',
+            'db_field': 'Url'
+        },
+        
+        # Financial Information Group
+        {
+            'name': 'tinno',
+            'label': 'TIN No',
+            'type': 'text',
+            'required': False,
+            'width': '50%',
+            'placeholder': 'Enter TIN No',
+            'group': 'financial',
+            'db_field': 'TinNo'
+        },
+        {
+            'name': 'account_number',
+            'label': 'Account Number',
+            'type': 'text',
+            'required': False,
+            'width': '50%',
+            'placeholder': 'Enter Account Number',
+            'group': 'financial',
+            'db_field': 'AccountNumber'
+        },
+        {
+            'name': 'account_name',
+            'label': 'Account Name',
+            'type': 'text',
+            'required': False,
+            'width': '50%',
+            'placeholder': 'Enter Account Name',
+            'group': 'financial',
+            'db_field': 'AccountName'
+        },
+        {
+            'name': 'branch',
+            'label': 'Branch',
+            'type': 'text',
+            'required': False,
+            'width': '50%',
+            'placeholder': 'Enter Branch Name',
+            'group': 'financial',
+            'db_field': 'Branch'
+        },
+        {
+            'name': 'ifsc',
+            'label': 'IFSC',
+            'type': 'text',
+            'required': False,
+            'width': '50%',
+            'placeholder': 'Enter IFSC',
+            'group': 'financial',
+            'db_field': 'Ifsc'
+        },
+        {
+            'name': 'payer_id',
+            'label': 'Payer ID',
+            'type': 'text',
+            'required': False,
+            'width': '33.33%',
+            'placeholder': 'Enter Payer ID',
+            'group': 'financial',
+            'db_field': 'PayerId'
+        },
+        {
+            'name': 'payer_bank',
+            'label': 'Payer Bank',
+            'type': 'text',
+            'required': False,
+            'width': '33.33%',
+            'placeholder': 'Enter Payer Bank',
+            'group': 'financial',
+            'db_field': 'PayerBank'
+        },
+        {
+            'name': 'payer_iban',
+            'label': 'Payer IBAN',
+            'type': 'text',
+            'required': False,
+            'width': '33.33%',
+            'placeholder': 'Enter Payer IBAN',
+            'group': 'financial',
+            'db_field': 'PayerIban'
+        },
+        
+        # Options Group
+        {
+            'name': 'default_db',
+            'label': 'Set as Default Database',
+            'type': 'checkbox',
+            'required': False,
+            'width': '100%',
+            'group': 'options',
+            'db_field': 'DefaultDb'
+        },
+    ]
+}
+
+
+CUSTOMER_FORM = {
+    'form_id': 'customer-form',
+    'title': 'Customer Information',
+    'icon': '👤',
+    'action': '/common/customer/save/',
+    'footer_status': 'Ready',
+    'background': 'blue',
+    
+    'buttons': [
+        {
+            'label': 'New',
+            'icon': '➕',
+            'type': 'primary',
+            'onclick': "newCustomer()"
+        },
+        {
+            'label': 'Save',
+            'icon': '💾',
+            'type': 'success',
+            'onclick': "saveCustomer()"
+        },
+        {
+            'label': 'Delete',
+            'icon': '🗑️',
+            'type': 'danger',
+            'onclick': "deleteCustomer()"
+        },
+    ],
+    
+    'menu_items': [
+        {'label': 'Print', 'icon': '🖨️', 'onclick': "printCustomer()"},
+        {'label': 'Export', 'icon': '📤', 'onclick': "exportCustomer()"},
+        {'label': 'Import', 'icon': '📥', 'onclick': "importCustomer()"},
+        {'label': 'Settings', 'icon': '⚙️', 'onclick': "openSettings()"},
+    ],
+    
+    'groups': [
+        {'id': 'contact', 'title': 'Contact Information', 'icon': '📞'},
+        {'id': 'shipping', 'title': 'Shipping Address', 'icon': '🚚'},
+        {'id': 'billing', 'title': 'Billing Address', 'icon': '📄'},
+        {'id': 'preferences', 'title': 'Customer Preferences', 'icon': '⚙️'},
+    ],
+    
+    'fields': [
+        # Basic fields (no group)
+        {
+            'name': 'customer_code',
+            'label': 'Customer Code',
+            'type': 'text',
+            'required': True,
+            'width': '32.5%',
+            'placeholder': 'Auto-generated',
+            'group': None
+        },
+        {
+            'name': 'first_name',
+            'label': 'First Name',
+            'type': 'text',
+            'required': True,
+            'width': '32.5%',
+            'placeholder': 'Enter first name',
+            'group': None
+        },
+        {
+            'name': 'last_name',
+            'label': 'Last Name',
+            'type': 'text',
+            'required': True,
+            'width': '32%',
+            'placeholder': 'Enter last name',
+            'group': None
+        },
+        {
+            'name': 'company_name',
+            'label': 'Company Name',
+            'type': 'text',
+            'required': False,
+            'width': '50%',
+            'placeholder': 'Enter company name',
+            'group': None
+        },
+        {
+            'name': 'customer_type',
+            'label': 'Customer Type',
+            'type': 'select',
+            'required': True,
+            'width': '50%',
+            'group': None,
+            'options': [
+                {'value': 'individual', 'label': 'Individual'},
+                {'value': 'business', 'label': 'Business'},
+                {'value': 'vip', 'label': 'VIP'},
+            ]
+        },
+        
+        # Contact group
+        {
+            'name': 'email',
+            'label': 'Email',
+            'type': 'email',
+            'required': True,
+            'width': '50%',
+            'placeholder': 'customer@example.com',
+            'group': 'contact'
+        },
+        {
+            'name': 'phone',
+            'label': 'Phone',
+            'type': 'text',
+            'required': True,
+            'width': '50%',
+            'placeholder': '+974 XXXX XXXX',
+            'group': 'contact'
+        },
+        
+        # Shipping group
+        {
+            'name': 'ship_address1',
+            'label': 'Address Line 1',
+            'type': 'text',
+            'required': False,
+            'width': '100%',
+            'placeholder': 'Street address',
+            'group': 'shipping'
+        },
+        {
+            'name': 'ship_city',
+            'label': 'City',
+            'type': 'text',
+            'required': False,
+            'width': '50%',
+            'placeholder': 'City',
+            'group': 'shipping'
+        },
+        
+        # Billing group
+        {
+            'name': 'bill_address1',
+            'label': 'Address Line 1',
+            'type': 'text',
+            'required': False,
+            'width': '100%',
+            'placeholder': 'Street address',
+            'group': 'billing'
+        },
+        
+        # Preferences group
+        {
+            'name': 'preferred_language',
+            'label': 'Preferred Language',
+            'type': 'select',
+            'required': False,
+            'width': '50%',
+            'group': 'preferences',
+            'options': [
+                {'value': 'en', 'label': 'English'},
+                {'value': 'ar', 'label': 'Arabic'},
+            ]
+        },
+    ]
+}
+
+
+DATABASE_CONFIG_FORM = {
+    'form_id': 'database-config-form',
+    'title': 'PostgreSQL Database Connection',
+    'icon': '🗄️',
+    'action': '/settings/save-database/',
+    'footer_status': 'Ready',
+    'background': 'soft-pink',
+    
+    # Buttons configuration
+    'buttons': [
+        {
+            'label': 'Test Connection',
+            'icon': '🔌',
+            'type': 'primary',
+            'onclick': "testConnection()"
+        },
+        {
+            'label': 'Save',
+            'icon': '💾',
+            'type': 'success',
+            'onclick': "saveDatabase()"
+        },
+    ],
+    
+    # Menu items (optional)
+    'menu_items': [],
+    
+    # No groups - all fields in main area
+    'groups': [],
+    
+    # Fields configuration
+    'fields': [
+        {
+            'name': 'db_host',
+            'label': 'Database Host',
+            'type': 'text',
+            'required': True,
+            'width': '50%',
+            'placeholder': 'e.g., localhost or 192.168.1.100',
+            'group': None
+        },
+        {
+            'name': 'db_port',
+            'label': 'Port',
+            'type': 'number',
+            'required': True,
+            'width': '50%',
+            'placeholder': '5432',
+            'group': None
+        },
+        {
+            'name': 'db_name',
+            'label': 'Database Name',
+            'type': 'text',
+            'required': True,
+            'width': '100%',
+            'placeholder': 'Enter database name',
+            'group': None
+        },
+        {
+            'name': 'db_user',
+            'label': 'Username',
+            'type': 'text',
+            'required': True,
+            'width': '50%',
+            'placeholder': 'postgres',
+            'group': None
+        },
+        {
+            'name': 'db_password',
+            'label': 'Password',
+            'type': 'password',
+            'required': True,
+            'width': '50%',
+            'placeholder': 'Enter password',
+            'group': None
+        },
+    ]
+}
+
+
+register_form('company', COMPANY_FORM)
+register_form('customer', CUSTOMER_FORM)
+register_form('database_config', DATABASE_CONFIG_FORM)
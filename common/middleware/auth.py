@@ -3,8 +3,11 @@
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib import messages
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 import logging
 
+from common.middleware.request_context import get_request_context
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,32 +18,45 @@ class AuthenticationMiddleware:
     Also stores the next URL for redirect after login
     """
     
+    sync_capable = True
+    async_capable = True
+    
     def __init__(self, get_response):
         self.get_response = get_response
         
-        # URLs that don't require authentication (public URLs)
-        self.public_paths = [
-            '/login/',
-            '/admin/',
-            '/static/',
-            '/media/',
-        ]
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
     
     def __call__(self, request):
-        # Get the current path
-        path = request.path
+        if self.async_mode:
+            return self.__acall__(request)
         
-        # Check if this is a public URL that doesn't require authentication
-        is_public = False
-        for public_path in self.public_paths:
-            if path.startswith(public_path):
-                is_public = True
-                break
+        response = self.check_authentication(request)
+        if response is None:
+            response = self.get_response(request)
+        return response
+    
+    async def __acall__(self, request):
+        # Session reads hit the database, so run the check in a worker thread
+        response = await sync_to_async(self.check_authentication)(request)
+        if response is None:
+            response = await self.get_response(request)
+        return response
+    
+    def check_authentication(self, request):
+        """
+        Returns a redirect response if the request must not proceed, else None
+        """
+        # Public paths (settings.PUBLIC_PATH_PREFIXES) are classified once
+        # by RequestClassificationMiddleware
+        context = get_request_context(request)
+        path = context.path
         
         # If not a public URL, check authentication
-        if not is_public:
+        if not context.is_public:
             # Check if user is authenticated
-            if not request.session.get('is_authenticated'):
+            if not context.is_authenticated:
                 logger.warning(f"Unauthenticated access attempt to: {path}")
                 
                 # Store the URL they were trying to access
@@ -53,14 +69,13 @@ class AuthenticationMiddleware:
                 return redirect('common:login')
             
             # Check if session has required data
-            required_keys = ['username', 'custid', 'db_host', 'db_name', 'db_user', 'db_password']
-            missing_keys = [key for key in required_keys if not request.session.get(key)]
+            # (customer database credentials are resolved from custid)
+            missing_keys = [key for key in ('username', 'custid') if not getattr(context, key)]
             
             if missing_keys:
-                logger.error(f"Session missing required keys: {missing_keys} for user: {request.session.get('username')}")
+                logger.error(f"Session missing required keys: {missing_keys} for user: {context.username}")
                 messages.error(request, 'Your session is incomplete. Please login again.')
                 request.session.flush()
                 return redirect('common:login')
         
-        response = self.get_response(request)
-        return response
\ No newline at end of file
+        return None
\ No newline at end of file
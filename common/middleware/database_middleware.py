@@ -4,27 +4,184 @@ from django.db import connections
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 from django.db.utils import OperationalError, ProgrammingError
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+import contextvars
+import random
 import threading
-import os
-from dotenv import load_dotenv
 
-# Thread-local storage for customer database alias
-_thread_locals = threading.local()
+from core.env_config import env_config_changed, get_env_config
+from common.middleware.request_context import get_request_context
+from common.utils.tenant_pool import get_tenant_pool
+from common.utils.tenant_registry import get_tenant_registry
+
+# Context-local storage for the customer database alias or the request's
+# TenantBinding (follows both worker threads and async tasks)
+_customer_db = contextvars.ContextVar('customer_db', default='customer_db')
+
+# Whether database routing decisions of the current request are traced
+_router_trace = contextvars.ContextVar('router_trace', default=False)
+
+# Guards registration of per-tenant connection aliases
+_alias_lock = threading.Lock()
+
+# Alias used when no tenant is logged in
+DEFAULT_CUSTOMER_DB = 'customer_db'
+
+
+class TenantBinding:
+    """
+    Tenant identity recorded by the middleware for one request
+    
+    The connection alias is only materialized (registered and backed by a
+    pooled connection) the first time a customer database is needed, so
+    requests that only touch sessions or the MAIN database never open a
+    tenant connection.
+    
+    Only the custid is known up front; the customer database credentials
+    are resolved from the tenant registry when the alias is materialized.
+    """
+    
+    def __init__(self, custid=None):
+        self.custid = custid
+        self.alias = tenant_alias(custid) if custid else DEFAULT_CUSTOMER_DB
+        self.wrapper = None
+    
+    @property
+    def is_bound(self):
+        return self.wrapper is not None
+    
+    def resolve_config(self):
+        """
+        Get the database configuration for this tenant
+        Falls back to the default customer database if the tenant is unknown
+        """
+        if self.custid:
+            tenant = get_tenant_registry().get(self.custid)
+            if tenant and all([tenant.db_host, tenant.db_name, tenant.db_user, tenant.db_password]):
+                return get_complete_db_config(
+                    tenant.db_host, '5432', tenant.db_name, tenant.db_user, tenant.db_password
+                )
+            print(f"[MIDDLEWARE] No customer credentials for custid {self.custid} - using default database")
+            self.alias = DEFAULT_CUSTOMER_DB
+        return get_default_customer_db_config()
+    
+    def materialize(self):
+        """Register the alias and install a pooled connection under it"""
+        if self.wrapper is None:
+            db_config = self.resolve_config()
+            if self.alias != DEFAULT_CUSTOMER_DB:
+                register_tenant_database(self.alias, db_config)
+            self.wrapper = get_tenant_pool().acquire(db_config, self.alias)
+            connections[self.alias] = self.wrapper
+        return self.alias
+    
+    def detach(self):
+        """
+        Hand the connection over to a new binding, leaving this one unbound
+        
+        Used to keep the connection until a streaming response is consumed
+        """
+        held = TenantBinding(self.custid)
+        held.alias = self.alias
+        held.wrapper, self.wrapper = self.wrapper, None
+        return held
+    
+    def release(self):
+        """Uninstall the connection and return it to the pool"""
+        wrapper, self.wrapper = self.wrapper, None
+        if wrapper is None:
+            return
+        try:
+            del connections[self.alias]
+        except AttributeError:
+            pass
+        get_tenant_pool().release(wrapper)
 
 
 def get_customer_db():
     """
-    Get the current customer database alias from thread-local storage
+    Get the current customer database alias from the request context
     Returns 'customer_db' by default
+    
+    Materializes the request's tenant connection on first use
     """
-    return getattr(_thread_locals, 'customer_db', 'customer_db')
+    current = _customer_db.get()
+    if isinstance(current, TenantBinding):
+        return current.materialize()
+    return current
+
+
+def get_tenant_binding():
+    """
+    Get the current request's TenantBinding without materializing it
+    Returns None outside of a request
+    """
+    current = _customer_db.get()
+    return current if isinstance(current, TenantBinding) else None
 
 
 def set_customer_db(db_alias):
     """
-    Set the customer database alias in thread-local storage
+    Set the customer database alias in the request context
+    Returns a token that can be passed to reset_customer_db()
+    """
+    return _customer_db.set(db_alias)
+
+
+def reset_customer_db(token):
+    """
+    Restore the customer database alias that was active before set_customer_db()
+    """
+    _customer_db.reset(token)
+
+
+def is_router_trace_enabled():
+    """
+    Check if routing decisions of the current request should be traced
+    """
+    return _router_trace.get()
+
+
+def should_trace_request(request):
+    """
+    Decide whether to trace database routing for a request
+    
+    Traced when the trace header is present, or for a random sample of
+    requests (DB_ROUTER_TRACE['SAMPLE_RATE'], 0 disables sampling)
+    """
+    trace_settings = getattr(settings, 'DB_ROUTER_TRACE', {})
+    header = trace_settings.get('HEADER')
+    if header and request.META.get(header):
+        return True
+    
+    sample_rate = trace_settings.get('SAMPLE_RATE', 0)
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def tenant_alias(custid):
+    """
+    Get the connection alias for a tenant, e.g. 'tenant_1042'
     """
-    _thread_locals.customer_db = db_alias
+    return f'tenant_{custid}'
+
+
+def register_tenant_database(alias, db_config):
+    """
+    Register a per-tenant connection alias at runtime
+    
+    Each tenant gets its own entry in DATABASES so concurrent requests for
+    different tenants never rewrite a shared configuration. The entry is
+    only replaced when the tenant's credentials change.
+    """
+    databases = connections.settings
+    if databases.get(alias) == db_config:
+        return alias
+    
+    with _alias_lock:
+        if databases.get(alias) != db_config:
+            # Replace the whole dict so readers see either old or new config
+            databases[alias] = db_config
+    return alias
 
 
 def get_complete_db_config(host, port, name, user, password):
@@ -41,7 +198,7 @@ def get_complete_db_config(host, port, name, user, password):
         'PORT': port,
         'ATOMIC_REQUESTS': False,
         'AUTOCOMMIT': True,
-        'CONN_MAX_AGE': 0,  # Don't persist connections
+        'CONN_MAX_AGE': None,  # Lifetime is managed by the tenant connection pool
         'CONN_HEALTH_CHECKS': False,  # Required by Django 4.1+
         'OPTIONS': {
             'connect_timeout': 10,
@@ -56,23 +213,42 @@ def get_complete_db_config(host, port, name, user, password):
     }
 
 
+# (EnvConfig, config dict) for the default customer database
+_default_config_cache = None
+
+
 def get_default_customer_db_config():
     """
     Get default customer database configuration from environment
     This is used as a fallback when user is not logged in
+    
+    Built once per EnvConfig, so the request path does no .env file I/O
     """
-    # Load environment variables
-    env_path = os.path.join(settings.BASE_DIR, '.env')
-    load_dotenv(env_path)
+    global _default_config_cache
+    env = get_env_config()
     
-    # Use main database credentials as default for customer_db
-    db_host = os.getenv('DB_HOST', 'localhost')
-    db_port = os.getenv('PORT', '5432')
-    db_name = os.getenv('DB_NAME', 'postgres')
-    db_user = os.getenv('DB_USER', 'postgres')
-    db_password = os.getenv('DB_PASSWORD', '')
+    cached = _default_config_cache
+    if cached is not None and cached[0] is env:
+        return cached[1]
     
-    return get_complete_db_config(db_host, db_port, db_name, db_user, db_password)
+    # Use main database credentials as default for customer_db
+    config = get_complete_db_config(
+        env.db_host or 'localhost',
+        env.db_port or '5432',
+        env.db_name or 'postgres',
+        env.db_user or 'postgres',
+        env.db_password,
+    )
+    _default_config_cache = (env, config)
+    return config
+
+
+def _clear_default_config(sender, **kwargs):
+    global _default_config_cache
+    _default_config_cache = None
+
+
+env_config_changed.connect(_clear_default_config)
 
 
 class DynamicDatabaseMiddleware:
@@ -83,140 +259,119 @@ class DynamicDatabaseMiddleware:
     to ensure customer database is configured before sessions are accessed
     """
     
+    sync_capable = True
+    async_capable = True
+    
     def __init__(self, get_response):
         self.get_response = get_response
         
-        # Paths that should use default database (no session required)
-        self.no_session_paths = [
-            '/login/',
-            '/static/',
-            '/media/',
-            '/favicon.ico',
-            '/admin/',
-        ]
+        # Serve async views without blocking a thread per request
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
     
     def __call__(self, request):
-        path = request.path
+        if self.async_mode:
+            return self.__acall__(request)
         
-        # Check if this path requires session access
-        needs_session = True
-        for no_session_path in self.no_session_paths:
-            if path.startswith(no_session_path):
-                needs_session = False
-                break
+        binding = self.bind(request, self.resolve_tenant(request))
+        try:
+            response = self.get_response(request)
+            response = self.hold_for_streaming(response, binding[0])
+        finally:
+            self.unbind(binding)
         
-        # Configure default database first
-        default_config = get_default_customer_db_config()
+        return response
+    
+    async def __acall__(self, request):
+        # Already classified upstream; otherwise session access blocks,
+        # so run it in a worker thread
+        if getattr(request, 'erp_context', None) is not None:
+            custid = self.resolve_tenant(request)
+        else:
+            custid = await sync_to_async(self.resolve_tenant)(request)
+        binding = self.bind(request, custid)
+        try:
+            response = await self.get_response(request)
+            response = self.hold_for_streaming(response, binding[0])
+        finally:
+            tenant = binding[0]
+            if tenant.is_bound:
+                await sync_to_async(tenant.release)()
+            self.unbind(binding)
         
-        # If path doesn't need session, use default database config
-        if not needs_session:
-            settings.DATABASES['customer_db'] = default_config
-            
-            # Close existing connection
-            if 'customer_db' in connections:
-                try:
-                    connections['customer_db'].close()
-                except Exception:
-                    pass
-            
-            set_customer_db('customer_db')
-            request._customer_db_configured = True
-            print(f"[MIDDLEWARE] Using default database for: {path}")
+        return response
+    
+    def resolve_tenant(self, request):
+        """
+        Work out which tenant the request belongs to
+        
+        Returns:
+            custid, or None to use the default customer database
+        """
+        # Paths without a session (settings.NO_SESSION_PATH_PREFIXES) and the
+        # session's custid are resolved once by RequestClassificationMiddleware;
+        # only the tenant id is kept in the session, credentials are resolved
+        # server-side when the tenant database is first used
+        context = get_request_context(request)
+        custid = context.custid
+        
+        if context.needs_session and not custid:
+            print("[MIDDLEWARE] No tenant in session - using default database")
+        
+        return custid
+    
+    def bind(self, request, custid):
+        """
+        Record the tenant for this request
         
+        No connection is opened here; a warm pooled connection is checked
+        out the first time a customer model is routed (see TenantBinding)
+        
+        Returns:
+            tuple: binding state to pass to unbind()
+        """
+        tenant = TenantBinding(custid)
+        token = set_customer_db(tenant)
+        trace_token = _router_trace.set(should_trace_request(request))
+        request._customer_db_configured = True
+        return tenant, token, trace_token
+    
+    def hold_for_streaming(self, response, tenant):
+        """
+        Keep the tenant connection of a streaming response until its content
+        has been sent (e.g. a CSV export reading rows as it streams)
+        """
+        if not getattr(response, 'streaming', False) or not tenant.is_bound:
+            return response
+        
+        held = tenant.detach()
+        content = response.streaming_content
+        
+        if response.is_async:
+            async def release_after():
+                try:
+                    async for chunk in content:
+                        yield chunk
+                finally:
+                    await sync_to_async(held.release)()
         else:
-            # Try to get customer database credentials from session
-            try:
-                db_host = request.session.get('db_host')
-                db_name = request.session.get('db_name')
-                db_user = request.session.get('db_user')
-                db_password = request.session.get('db_password')
-                
-                # If we have customer database credentials in session
-                if all([db_host, db_name, db_user, db_password]):
-                    # Configure the customer_db connection with complete settings
-                    customer_db_config = get_complete_db_config(
-                        db_host, '5432', db_name, db_user, db_password
-                    )
-                    
-                    # Update the database configuration
-                    settings.DATABASES['customer_db'] = customer_db_config
-                    
-                    # Close existing connection
-                    if 'customer_db' in connections:
-                        try:
-                            connections['customer_db'].close()
-                        except Exception:
-                            pass
-                    
-                    set_customer_db('customer_db')
-                    request._customer_db_configured = True
-                    print(f"[MIDDLEWARE] Configured customer_db: {db_host}/{db_name}")
-                
-                else:
-                    # No customer credentials in session - use default
-                    settings.DATABASES['customer_db'] = default_config
-                    
-                    # Close existing connection
-                    if 'customer_db' in connections:
-                        try:
-                            connections['customer_db'].close()
-                        except Exception:
-                            pass
-                    
-                    set_customer_db('customer_db')
-                    request._customer_db_configured = True
-                    print("[MIDDLEWARE] No customer credentials - using default database")
-                    
-            except (ProgrammingError, OperationalError) as e:
-                # If we can't access session (table doesn't exist), use default
-                print(f"[MIDDLEWARE] Database not migrated, using default database")
-                print(f"[MIDDLEWARE] Please run: python manage.py migrate --database=customer_db")
-                
-                settings.DATABASES['customer_db'] = default_config
-                
-                # Close existing connection
-                if 'customer_db' in connections:
-                    try:
-                        connections['customer_db'].close()
-                    except Exception:
-                        pass
-                
-                set_customer_db('customer_db')
-                request._customer_db_configured = True
-                
-            except KeyError as e:
-                # Handle settings KeyError
-                print(f"[MIDDLEWARE] Settings error: {e}, using default database")
-                settings.DATABASES['customer_db'] = default_config
-                
-                # Close existing connection
-                if 'customer_db' in connections:
-                    try:
-                        connections['customer_db'].close()
-                    except Exception:
-                        pass
-                
-                set_customer_db('customer_db')
-                request._customer_db_configured = True
-                
-            except Exception as e:
-                # If we can't access session for any other reason, use default
-                print(f"[MIDDLEWARE] Session access error: {e}, using default database")
-                settings.DATABASES['customer_db'] = default_config
-                
-                # Close existing connection
-                if 'customer_db' in connections:
-                    try:
-                        connections['customer_db'].close()
-                    except Exception:
-                        pass
-                
-                set_customer_db('customer_db')
-                request._customer_db_configured = True
+            def release_after():
+                try:
+                    yield from content
+                finally:
+                    held.release()
         
-        response = self.get_response(request)
+        response.streaming_content = release_after()
         return response
     
+    def unbind(self, binding):
+        """Return the request's connection to the pool, if one was used"""
+        tenant, token, trace_token = binding
+        tenant.release()
+        reset_customer_db(token)
+        _router_trace.reset(trace_token)
+    
     def process_exception(self, request, exception):
         """
         Handle database connection exceptions
@@ -227,9 +382,10 @@ class DynamicDatabaseMiddleware:
             print(f"[MIDDLEWARE] Database error: {str(exception)}")
             
             # If it's a connection error, try to close the connection
-            if 'customer_db' in connections:
+            tenant = get_tenant_binding()
+            if tenant is not None and tenant.is_bound:
                 try:
-                    connections['customer_db'].close()
+                    tenant.wrapper.close()
                 except Exception:
                     pass
         
@@ -0,0 +1,69 @@
+# common/middleware/query_inspector.py
+"""
+Per-request query inspection (see common.utils.query_inspector)
+
+Only active when settings.QUERY_INSPECTOR['ENABLED'] is on; otherwise the
+middleware removes itself at startup.
+"""
+
+from django.core.exceptions import MiddlewareNotUsed
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from common.utils.query_inspector import (
+    finish_inspection, get_inspector_settings, is_enabled, start_inspection,
+)
+
+
+class QueryInspectorMiddleware:
+    """
+    Count the queries of each request and report N+1 shapes and views
+    that exceed their @query_budget
+
+    Place it first so session and auth queries are counted as well.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not is_enabled():
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        options = get_inspector_settings()
+        self.default_budget = options.get('DEFAULT_BUDGET')
+        self.header = options.get('HEADER', True)
+
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        inspection, token = start_inspection(request.path, self.default_budget)
+        try:
+            response = self.get_response(request)
+        finally:
+            finish_inspection(token)
+        return self.finish(request, response, inspection)
+
+    async def __acall__(self, request):
+        inspection, token = start_inspection(request.path, self.default_budget)
+        try:
+            response = await self.get_response(request)
+        finally:
+            finish_inspection(token)
+        return self.finish(request, response, inspection)
+
+    def finish(self, request, response, inspection):
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            inspection.label = f'{match._func_path} ({request.path})'
+            inspection.budget = getattr(match.func, 'query_budget', inspection.budget)
+
+        inspection.report()
+        if self.header:
+            response['X-Query-Count'] = str(inspection.count)
+        return response
@@ -0,0 +1,178 @@
+# common/middleware/request_context.py
+"""
+Single-pass request classification shared by the auth and database middleware
+
+The path is matched against precompiled prefix regexes and the result,
+together with the tenant identity from the session, is attached to the
+request as an immutable RequestContext (request.erp_context).
+"""
+
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.utils import OperationalError, ProgrammingError
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+import logging
+
+logger = logging.getLogger(__name__)
+
+RequestContext = namedtuple('RequestContext', [
+    'path',
+    'is_public',          # No login required
+    'needs_session',      # Tenant database is taken from the session
+    'is_authenticated',
+    'username',
+    'custid',
+    'business_type',      # 'laundry', 'restaurant' or 'common'
+])
+
+# URLs that don't require authentication (public URLs)
+DEFAULT_PUBLIC_PATH_PREFIXES = (
+    '/login/',
+    '/admin/',
+    '/static/',
+    '/media/',
+)
+
+# Paths that should use default database (no session required)
+DEFAULT_NO_SESSION_PATH_PREFIXES = (
+    '/login/',
+    '/static/',
+    '/media/',
+    '/favicon.ico',
+    '/admin/',
+)
+
+# software_id (softwares table) -> business module
+BUSINESS_TYPES = {
+    4: 'laundry',
+    5: 'restaurant',
+}
+
+
+class PathClassifier:
+    """
+    Classify request paths with precompiled regexes
+
+    Each prefix list becomes one anchored alternation, so a path is public
+    if any public prefix matches and needs a session unless any no-session
+    prefix matches, whatever the other list contains.
+    """
+
+    def __init__(self, public_prefixes, no_session_prefixes):
+        self.public_pattern = self.compile(public_prefixes)
+        self.no_session_pattern = self.compile(no_session_prefixes)
+
+    @staticmethod
+    def compile(prefixes):
+        """One anchored regex matching any of the prefixes, or None"""
+        prefixes = sorted(set(prefixes), key=len, reverse=True)
+        if not prefixes:
+            return None
+        return re.compile('^(?:' + '|'.join(re.escape(prefix) for prefix in prefixes) + ')')
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            getattr(settings, 'PUBLIC_PATH_PREFIXES', DEFAULT_PUBLIC_PATH_PREFIXES),
+            getattr(settings, 'NO_SESSION_PATH_PREFIXES', DEFAULT_NO_SESSION_PATH_PREFIXES),
+        )
+
+    def classify(self, path):
+        """
+        Returns:
+            tuple: (is_public, needs_session)
+        """
+        is_public = bool(self.public_pattern and self.public_pattern.match(path))
+        needs_session = not (self.no_session_pattern and self.no_session_pattern.match(path))
+        return is_public, needs_session
+
+
+_classifier = None
+
+
+def get_path_classifier():
+    """Return the classifier built from settings (compiled once)"""
+    global _classifier
+    if _classifier is None:
+        _classifier = PathClassifier.from_settings()
+    return _classifier
+
+
+def classify_request(request):
+    """
+    Build the RequestContext for a request
+
+    Reads the session at most once, and only for non-public or
+    session-backed paths
+    """
+    is_public, needs_session = get_path_classifier().classify(request.path)
+
+    session = {}
+    if needs_session or not is_public:
+        try:
+            session = request.session
+            # Force the session to load once, here
+            session.get('custid')
+        except (ProgrammingError, OperationalError):
+            # If we can't access session (table doesn't exist), use default
+            print(f"[MIDDLEWARE] Database not migrated, using default database")
+            print(f"[MIDDLEWARE] Please run: python manage.py migrate --database=customer_db")
+            session = {}
+
+    return RequestContext(
+        path=request.path,
+        is_public=is_public,
+        needs_session=needs_session,
+        is_authenticated=bool(session.get('is_authenticated')),
+        username=session.get('username'),
+        custid=session.get('custid') if needs_session else None,
+        business_type=BUSINESS_TYPES.get(session.get('software_id'), 'common'),
+    )
+
+
+def get_request_context(request):
+    """
+    Get the request's RequestContext, classifying it on first use
+    (works even if RequestClassificationMiddleware is not installed)
+    """
+    context = getattr(request, 'erp_context', None)
+    if context is None:
+        context = classify_request(request)
+        request.erp_context = context
+    return context
+
+
+class RequestClassificationMiddleware:
+    """
+    Attach request.erp_context for AuthenticationMiddleware and
+    DynamicDatabaseMiddleware
+
+    Must run after SessionMiddleware and before both of them
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+        # Compile the prefix table at startup
+        get_path_classifier()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        get_request_context(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Loading the session blocks, so classify in a worker thread
+        await sync_to_async(get_request_context)(request)
+        return await self.get_response(request)
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+# Columns searched by the company autocomplete (see common.utils.search_backends)
+SEARCH_COLUMNS = ['CompanyName', 'Email']
+TABLE = 'Organization'
+
+
+def index_name(column, suffix):
+    return f'organization_{column.lower()}_{suffix}'
+
+
+def create_search_indexes(apps, schema_editor):
+    """
+    PostgreSQL: pg_trgm GIN indexes on UPPER(column), matching the
+                UPPER(col::text) LIKE UPPER('%term%') that icontains renders
+    SQLite: COLLATE NOCASE indexes for case-insensitive prefix search
+    """
+    qn = schema_editor.quote_name
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for column in SEARCH_COLUMNS:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {qn(index_name(column, "trgm"))} '
+                f'ON {qn(TABLE)} USING gin ((UPPER({qn(column)}::text)) gin_trgm_ops)'
+            )
+    elif vendor == 'sqlite':
+        for column in SEARCH_COLUMNS:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {qn(index_name(column, "nocase"))} '
+                f'ON {qn(TABLE)} ({qn(column)} COLLATE NOCASE)'
+            )
+
+
+def drop_search_indexes(apps, schema_editor):
+    qn = schema_editor.quote_name
+    suffix = {'postgresql': 'trgm', 'sqlite': 'nocase'}.get(schema_editor.connection.vendor)
+    if suffix is None:
+        return
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {qn(index_name(column, suffix))}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,126 @@
+from django.db import migrations
+
+# Frozen copy of the search document definition (common.utils.full_text)
+TABLE = 'Organization'
+PK_COLUMN = 'CompanyId'
+FIELDS = ['CompanyName', 'ArabicName', 'Email', 'City']  # Weight classes A, B, C, D
+PG_COLUMN = 'search_document'
+FTS_TABLE = 'organization_fts'
+
+# Arabic letter variants folded to one form, '@' and '.' to spaces
+FOLD_MAP = [
+    ('أ', 'ا'), ('إ', 'ا'), ('آ', 'ا'), ('ٱ', 'ا'),
+    ('ة', 'ه'),
+    ('ى', 'ي'), ('ئ', 'ي'),
+    ('ؤ', 'و'),
+    ('@', ' '), ('.', ' '),
+]
+# Tatweel, tashkeel and superscript alef are dropped
+STRIP_CHARS = 'ـًٌٍَُِّْٰ'
+
+
+def pg_normalize(column_sql):
+    # translate() drops characters of the first list that have no counterpart
+    source = ''.join(char for char, _ in FOLD_MAP) + STRIP_CHARS
+    target = ''.join(folded for _, folded in FOLD_MAP)
+    return f"translate(coalesce({column_sql}, ''), '{source}', '{target}')"
+
+
+def sqlite_normalize(column_sql):
+    expression = f"coalesce({column_sql}, '')"
+    for char, folded in FOLD_MAP:
+        expression = f"replace({expression}, '{char}', '{folded}')"
+    for char in STRIP_CHARS:
+        expression = f"replace({expression}, '{char}', '')"
+    return expression
+
+
+def create_postgresql(schema_editor):
+    qn = schema_editor.quote_name
+    document = ' || '.join(
+        f"setweight(to_tsvector('simple'::regconfig, {pg_normalize(qn(field))}), '{weight}')"
+        for field, weight in zip(FIELDS, 'ABCD')
+    )
+    schema_editor.execute(
+        f'ALTER TABLE {qn(TABLE)} ADD COLUMN IF NOT EXISTS {qn(PG_COLUMN)} tsvector '
+        f'GENERATED ALWAYS AS ({document}) STORED'
+    )
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {qn(PG_COLUMN + "_gin")} '
+        f'ON {qn(TABLE)} USING gin ({qn(PG_COLUMN)})'
+    )
+
+
+def create_sqlite(schema_editor):
+    qn = schema_editor.quote_name
+    columns = ', '.join(qn(field) for field in FIELDS)
+
+    def values(row):
+        return ', '.join(sqlite_normalize(f'{row}.{qn(field)}') for field in FIELDS)
+
+    delete_old = (
+        f'INSERT INTO {qn(FTS_TABLE)}({qn(FTS_TABLE)}, rowid, {columns}) '
+        f"VALUES ('delete', old.{qn(PK_COLUMN)}, {values('old')});"
+    )
+    insert_new = (
+        f'INSERT INTO {qn(FTS_TABLE)}(rowid, {columns}) '
+        f'VALUES (new.{qn(PK_COLUMN)}, {values("new")});'
+    )
+
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {qn(FTS_TABLE)} USING fts5({columns}, '
+        f"content='{TABLE}', content_rowid='{PK_COLUMN}', "
+        f"tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS {qn(FTS_TABLE + "_ai")} AFTER INSERT ON {qn(TABLE)} '
+        f'BEGIN {insert_new} END'
+    )
+    schema_editor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS {qn(FTS_TABLE + "_ad")} AFTER DELETE ON {qn(TABLE)} '
+        f'BEGIN {delete_old} END'
+    )
+    schema_editor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS {qn(FTS_TABLE + "_au")} AFTER UPDATE ON {qn(TABLE)} '
+        f'BEGIN {delete_old} {insert_new} END'
+    )
+    # Index the rows that already exist
+    schema_editor.execute(
+        f'INSERT INTO {qn(FTS_TABLE)}(rowid, {columns}) '
+        f'SELECT {qn(PK_COLUMN)}, {values(qn(TABLE))} FROM {qn(TABLE)}'
+    )
+
+
+def create_search_document(apps, schema_editor):
+    """
+    PostgreSQL: generated, weighted tsvector column with a GIN index
+    SQLite: FTS5 table kept in sync by triggers
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        create_postgresql(schema_editor)
+    elif vendor == 'sqlite':
+        create_sqlite(schema_editor)
+
+
+def drop_search_document(apps, schema_editor):
+    qn = schema_editor.quote_name
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {qn(PG_COLUMN + "_gin")}')
+        schema_editor.execute(f'ALTER TABLE {qn(TABLE)} DROP COLUMN IF EXISTS {qn(PG_COLUMN)}')
+    elif vendor == 'sqlite':
+        for suffix in ('_ai', '_ad', '_au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {qn(FTS_TABLE + suffix)}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {qn(FTS_TABLE)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0002_organization_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_document, drop_search_document),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updatedat(apps, schema_editor):
+    """Existing rows start at their creation time"""
+    Organization = apps.get_model('common', 'Organization')
+    (Organization.objects.using(schema_editor.connection.alias)
+     .filter(UpdatedAt__isnull=True)
+     .update(UpdatedAt=F('CreatedAt')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0003_organization_search_document'),
+    ]
+
+    operations = [
+        # The schema editor gives auto_now fields a default of now(), and
+        # SQLite rebuilds the table to add a column with a default, dropping
+        # the FTS triggers of 0003 and the NOCASE indexes of 0002. Add a
+        # plain nullable column (ALTER TABLE ADD COLUMN) and keep auto_now
+        # in the model state only: it has no database side.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.AddField(
+                    model_name='organization',
+                    name='UpdatedAt',
+                    field=models.DateTimeField(null=True),
+                ),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name='organization',
+                    name='UpdatedAt',
+                    field=models.DateTimeField(auto_now=True, null=True),
+                ),
+            ],
+        ),
+        migrations.RunPython(backfill_updatedat, migrations.RunPython.noop),
+    ]
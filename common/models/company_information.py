@@ -53,6 +53,8 @@ class Organization(models.Model):
     BusinessType = models.SmallIntegerField(choices=BUSINESS_TYPES)
 
     CreatedAt = models.DateTimeField(auto_now_add=True)
+    # Row version for conditional GET (common.utils.record_versions)
+    UpdatedAt = models.DateTimeField(auto_now=True, null=True)
 
     class Meta:
         db_table = 'Organization'
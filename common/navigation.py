@@ -0,0 +1,32 @@
+# common/navigation.py
+"""
+Sidebar menu of the common module (companies without a business module)
+
+Discovered at startup; see common.utils.navigation.
+"""
+
+from common.utils.navigation import register_menu
+
+COMMON_MENU = [
+    {
+        'id': 'masters',
+        'label': 'Masters',
+        'icon': '📊',
+        'active': True,
+        'items': [
+            {'label': 'Company Info', 'url': 'common:company_form', 'active': False},
+            {'label': 'Customers', 'url': 'common:customer'},
+        ]
+    },
+    {
+        'id': 'settings',
+        'label': 'Settings',
+        'icon': '⚙️',
+        'items': [
+            {'label': 'Database Config', 'url': 'common:database_config'},
+            {'label': 'Logout', 'url': 'common:logout'},
+        ]
+    },
+]
+
+register_menu('common', COMMON_MENU)
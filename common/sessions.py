@@ -0,0 +1,251 @@
+# common/sessions.py
+"""
+Cache-backed session engine (SESSION_ENGINE = 'common.sessions')
+
+Sessions live in an in-process LRU backed by a shared Redis-compatible
+tier, so every worker sees the same sessions. Reading a session on a warm
+worker does not touch the MAIN database at all.
+
+Sessions only carry the tenant's custid; customer database credentials
+are resolved server-side from the tenant registry.
+
+A worker trusts its local copy for at most LOCAL_TTL seconds. delete()
+and flush() (logout) only clear the local copy of the worker handling the
+request and the shared tier, so other workers may keep serving the session
+for up to LOCAL_TTL seconds; set LOCAL_TTL to 0 to read every request from
+the shared tier.
+
+The shared tier is required: with per-worker copies only, a user would be
+logged out whenever a request reached another worker. CommonConfig.ready()
+raises ImproperlyConfigured at startup when it is missing.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError, SessionBase, UpdateError
+from django.core.exceptions import ImproperlyConfigured
+import logging
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'common.sessions.'
+
+DEFAULT_SESSION_CACHE_SETTINGS = {
+    'LOCAL_MAX_ENTRIES': 10000,  # Sessions kept in each worker's LRU
+    'LOCAL_TTL': 30,             # Seconds a worker trusts its local copy
+    'REDIS_URL': '',             # Shared tier (required); 'memory://' for a local stand-in
+}
+
+
+class LocalLRU:
+    """Thread-safe LRU of session dicts with per-entry expiry"""
+
+    def __init__(self, max_entries=10000, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return dict(value)
+
+    def set(self, key, value, timeout):
+        if self.ttl is not None:
+            timeout = min(timeout, self.ttl)
+        with self._lock:
+            self._data[key] = (dict(value), time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class LocalSharedStore:
+    """
+    Process-local stand-in for the Redis tier (get/set/delete/exists)
+
+    Used with REDIS_URL = 'memory://' in development and tests
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            return entry[0] if entry else None
+
+    def set(self, key, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._live(key) is not None:
+                return None
+            self._data[key] = (value, time.monotonic() + ex if ex else None)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            return 1 if self._data.pop(key, None) else 0
+
+    def exists(self, key):
+        with self._lock:
+            return 1 if self._live(key) is not None else 0
+
+
+def connect_shared_tier(url):
+    """
+    Connect to the shared session tier
+
+    Returns:
+        Redis-compatible client
+
+    Raises:
+        ImproperlyConfigured: no URL, or redis is not installed
+    """
+    if not url:
+        raise ImproperlyConfigured(
+            "SESSION_ENGINE 'common.sessions' needs a shared tier: set "
+            "SESSION_CACHE['REDIS_URL'] (SESSION_REDIS_URL), or use SESSION_MODE=db"
+        )
+    if url.startswith('memory://'):
+        return LocalSharedStore()
+    try:
+        import redis
+    except ImportError as e:
+        raise ImproperlyConfigured(
+            f"SESSION_CACHE['REDIS_URL'] is {url!r} but redis is not installed"
+        ) from e
+    return redis.Redis.from_url(url)
+
+
+_tiers = None
+_tiers_lock = threading.Lock()
+
+
+def get_session_tiers():
+    """Return the process-wide (local LRU, shared tier) pair"""
+    global _tiers
+    if _tiers is None:
+        with _tiers_lock:
+            if _tiers is None:
+                cache_settings = dict(DEFAULT_SESSION_CACHE_SETTINGS)
+                cache_settings.update(getattr(settings, 'SESSION_CACHE', {}))
+                shared = connect_shared_tier(cache_settings['REDIS_URL'])
+                _tiers = (
+                    LocalLRU(cache_settings['LOCAL_MAX_ENTRIES'], cache_settings['LOCAL_TTL']),
+                    shared,
+                )
+    return _tiers
+
+
+class SessionStore(SessionBase):
+    """
+    Two-tier session store: in-process LRU in front of a Redis-compatible
+    shared tier
+    """
+
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._local, self._shared = get_session_tiers()
+        super().__init__(session_key)
+
+    @property
+    def cache_key(self):
+        return self.cache_key_prefix + self._get_or_create_session_key()
+
+    def _get(self, key):
+        data = self._local.get(key)
+        if data is None:
+            raw = self._shared.get(key)
+            if raw is not None:
+                if isinstance(raw, bytes):
+                    raw = raw.decode('utf-8')
+                data = self.decode(raw)
+                self._local.set(key, data, self.get_expiry_age(expiry=data.get('_session_expiry')))
+        return data
+
+    def _put(self, key, data, must_create=False):
+        timeout = self.get_expiry_age()
+        if not self._shared.set(key, self.encode(data), ex=timeout, nx=must_create):
+            return False
+        self._local.set(key, data, timeout)
+        return True
+
+    def load(self):
+        session_data = self._get(self.cache_key)
+        if session_data is not None:
+            return session_data
+        self._session_key = None
+        return {}
+
+    def create(self):
+        for i in range(10000):
+            self._session_key = self._get_new_session_key()
+            try:
+                self.save(must_create=True)
+            except CreateError:
+                continue
+            self.modified = True
+            return
+        raise RuntimeError(
+            "Unable to create a new session key. "
+            "It is likely that the session store is unavailable."
+        )
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        if not must_create and not self.exists(self.session_key):
+            raise UpdateError
+        if not self._put(self.cache_key, self._get_session(no_load=must_create), must_create):
+            raise CreateError
+
+    def exists(self, session_key):
+        if not session_key:
+            return False
+        key = self.cache_key_prefix + session_key
+        if self._local.get(key) is not None:
+            return True
+        return bool(self._shared.exists(key))
+
+    def delete(self, session_key=None):
+        # Other workers' local copies stay valid for up to LOCAL_TTL seconds
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        key = self.cache_key_prefix + session_key
+        self._local.delete(key)
+        self._shared.delete(key)
+
+    @classmethod
+    def clear_expired(cls):
+        # Both tiers expire entries on their own
+        pass
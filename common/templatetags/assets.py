@@ -0,0 +1,33 @@
+# common/templatetags/assets.py
+"""
+Stylesheet bundle tags
+
+    {% load assets %}
+    {% css_bundle 'forms' %}
+"""
+
+from django import template
+from django.utils.html import format_html_join
+
+from common.utils.assets import bundle_urls
+
+register = template.Library()
+
+
+@register.simple_tag
+def css_bundle(name):
+    """
+    <link> to a CSS bundle (see ASSETS['BUNDLES'])
+
+    Falls back to one <link> per source file until build_assets has run.
+    """
+    return format_html_join(
+        '\n', '<link rel="stylesheet" href="{}">',
+        ((url,) for url in bundle_urls(name)),
+    )
+
+
+@register.simple_tag
+def css_bundle_url(name):
+    """URL of a bundle (the first source file if it is not built)"""
+    return bundle_urls(name)[0]
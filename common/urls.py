@@ -20,13 +20,19 @@ urlpatterns = [
     
     # Lookup & Search endpoints
     path('company/lookup/', company_info.lookup_company, name='lookup_company'),  # Exact lookup
+    path('company/batch/', company_info.batch_company, name='batch_company'),  # Several lookups/searches
     path('company/search/name/', company_info.search_company_by_name, name='search_company_name'),  # Autocomplete
     path('company/search/email/', company_info.search_company_by_email, name='search_company_email'),  # Autocomplete
+    path('company/list/', company_info.list_companies, name='list_companies'),  # Keyset pages
     
     # CRUD operations
     path('company/save/', company_info.save_company, name='save_company'),
     path('company/get/<int:company_id>/', company_info.get_company, name='get_company'),
     path('company/delete/<int:company_id>/', company_info.delete_company, name='delete_company'),
+    
+    # Bulk transfer
+    path('company/export/', company_info.export_companies, name='export_companies'),  # Streamed CSV/XLSX
+    path('company/import/', company_info.import_companies, name='import_companies'),  # CSV/XLSX upload
 
 
     # Settings URLs
@@ -0,0 +1,194 @@
+# common/utils/assets.py
+"""
+Named CSS bundles
+
+ASSETS['BUNDLES'] maps a bundle name to the stylesheets it replaces, in
+cascade order. `python manage.py build_assets` concatenates each into a
+single file named after its content hash (forms.3f2a9c01b7e4.css) and
+writes .gz and .br siblings next to it. bundles/manifest.json maps the
+bundle name to the bundle path.
+
+WhiteNoise serves the precompressed siblings to clients that accept them
+and marks fingerprinted names immutable (WHITENOISE_IMMUTABLE_FILE_TEST),
+so a bundle is downloaded once per deploy. The {% css_bundle 'name' %} tag
+(common/templatetags/assets.py) goes where a page used to link the source
+files, so the cascade is unchanged; it links the individual source files
+while no bundle has been built.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # Optional: only .gz siblings are written without it
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+
+DEFAULT_ASSET_SETTINGS = {
+    'OUTPUT_DIR': None,       # Defaults to <first STATICFILES_DIRS>/bundles
+    'PREFIX': 'bundles',      # Static path of OUTPUT_DIR
+    'BUNDLES': {},            # name -> [static path, ...] in cascade order
+}
+
+
+def get_asset_settings():
+    options = dict(DEFAULT_ASSET_SETTINGS)
+    options.update(getattr(settings, 'ASSETS', {}))
+    if options['OUTPUT_DIR'] is None:
+        options['OUTPUT_DIR'] = os.path.join(settings.STATICFILES_DIRS[0], options['PREFIX'])
+    return options
+
+
+def bundle_sources(name, options=None):
+    """
+    Static paths of one bundle, in cascade order
+
+    Raises:
+        KeyError: unknown bundle name
+    """
+    options = options or get_asset_settings()
+    return list(options['BUNDLES'][name])
+
+
+def read_source(path):
+    """Contents of a static file, found like collectstatic finds it"""
+    absolute = finders.find(path)
+    if absolute is None:
+        raise FileNotFoundError(f'Static file not found: {path}')
+    with open(absolute, encoding='utf-8') as f:
+        return f.read()
+
+
+def concatenate(sources):
+    """One stylesheet from several, each headed by its source path"""
+    parts = []
+    for path in sources:
+        parts.append(f'/* {path} */\n{read_source(path).strip()}\n')
+    return '\n'.join(parts)
+
+
+def write_compressed(path, data):
+    """
+    Write .gz (and .br with brotli installed) siblings when they are smaller
+
+    Returns:
+        list: written file paths
+    """
+    written = []
+    # mtime=0 keeps the output byte-identical across builds
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data):
+        with open(path + '.gz', 'wb') as f:
+            f.write(compressed)
+        written.append(path + '.gz')
+
+    if brotli is not None:
+        compressed = brotli.compress(data, mode=brotli.MODE_TEXT)
+        if len(compressed) < len(data):
+            with open(path + '.br', 'wb') as f:
+                f.write(compressed)
+            written.append(path + '.br')
+    return written
+
+
+def build_bundles(options=None, clean=True):
+    """
+    Build every bundle and the manifest
+
+    Args:
+        clean: Remove bundles of previous builds from the output directory
+
+    Returns:
+        dict: bundle name -> static path of the bundle
+    """
+    options = options or get_asset_settings()
+    output_dir = options['OUTPUT_DIR']
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = {}
+    keep = {MANIFEST_NAME}
+    for name in options['BUNDLES']:
+        data = concatenate(bundle_sources(name, options)).encode('utf-8')
+        digest = hashlib.md5(data, usedforsecurity=False).hexdigest()[:12]
+        filename = f'{name}.{digest}.css'
+        path = os.path.join(output_dir, filename)
+
+        with open(path, 'wb') as f:
+            f.write(data)
+        written = write_compressed(path, data)
+
+        keep.add(filename)
+        keep.update(os.path.basename(written_path) for written_path in written)
+        manifest[name] = f"{options['PREFIX']}/{filename}"
+
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    if clean:
+        for filename in os.listdir(output_dir):
+            if filename not in keep:
+                os.remove(os.path.join(output_dir, filename))
+
+    _manifest.reset()
+    return manifest
+
+
+class BundleManifest:
+    """bundles/manifest.json, reloaded when the file changes"""
+
+    def __init__(self):
+        self._data = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._data = None
+            self._mtime = None
+
+    def get(self, key):
+        path = os.path.join(get_asset_settings()['OUTPUT_DIR'], MANIFEST_NAME)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    try:
+                        with open(path, encoding='utf-8') as f:
+                            self._data = json.load(f)
+                    except (OSError, ValueError) as e:
+                        logger.warning(f'Cannot read {path}: {str(e)}')
+                        self._data = {}
+                    self._mtime = mtime
+        return self._data.get(key)
+
+
+_manifest = BundleManifest()
+
+
+def bundle_urls(name):
+    """
+    Stylesheet URLs of a bundle
+
+    Returns:
+        list: the bundle URL, or the source file URLs if it is not built
+    """
+    path = _manifest.get(name)
+    if path is not None:
+        return [static(path)]
+    return [static(source) for source in bundle_sources(name)]
@@ -0,0 +1,358 @@
+# common/utils/autocomplete_index.py
+"""
+In-process autocomplete index per (tenant database, model, field)
+
+Opt-in through settings.AUTOCOMPLETE_INDEX. An index is built lazily on the
+first search of a field in a tenant database and then answers keystroke
+searches from memory with a binary search over the sorted values. Like
+the SQLite PrefixSearchBackend it matches values starting with the term
+(istartswith) and ranks shorter values first, ties by pk, so paging through
+the index or the database gives the same results. Databases with another
+search backend (PostgreSQL trigram substring matching) are always searched
+in the database.
+
+post_save / post_delete keep the indexes of this process current; writes
+that bypass signals (bulk updates, other workers) are picked up when the
+index expires (TTL). Indexes are kept within a memory budget, evicting the
+least recently searched first.
+"""
+
+import bisect
+import heapq
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connections
+from django.db.models.signals import post_delete, post_save
+
+from common.utils.search_backends import PrefixSearchBackend, get_search_backend
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AUTOCOMPLETE_SETTINGS = {
+    'ENABLED': False,
+    'FIELDS': {},                    # {'app_label.Model': ['Field', ...]}
+    'MAX_BYTES': 64 * 1024 * 1024,   # Budget shared by all indexes
+    'MAX_ROWS': 50000,               # Larger tables are searched in the database
+    'TTL': 600,                      # Seconds before an index is rebuilt
+}
+
+# Rough cost of one sorted-list entry (tuple + list slot)
+ENTRY_BYTES = 80
+
+
+def normalize(value):
+    return str(value).casefold() if value is not None else ''
+
+
+def row_attrs(model_class):
+    return [field.attname for field in model_class._meta.concrete_fields]
+
+
+class AutocompleteIndex:
+    """
+    Searchable snapshot of one field of one table
+
+    Rows are kept as raw .values() dicts of every concrete field, so the
+    caller serializes them exactly like rows read from the database.
+    """
+
+    def __init__(self, field_name):
+        self.field_name = field_name
+        self.built_at = time.monotonic()
+        self.size_bytes = 0
+        self._rows = {}        # pk (native type) -> raw row dict
+        self._keys = {}        # pk -> normalized field value
+        self._sorted = []      # [(normalized value, pk)] for prefix search
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, pk, row):
+        """Add or replace one row"""
+        with self._lock:
+            if pk in self._rows:
+                self.remove(pk)
+            key = self._insert(pk, row)
+            bisect.insort(self._sorted, (key, pk))
+
+    def extend(self, items):
+        """Bulk load (pk, row) pairs into an empty index, sorting once"""
+        with self._lock:
+            for pk, row in items:
+                self._sorted.append((self._insert(pk, row), pk))
+            self._sorted.sort()
+
+    def _insert(self, pk, row):
+        key = normalize(row.get(self.field_name))
+        self._rows[pk] = row
+        self._keys[pk] = key
+        self.size_bytes += self._row_size(row, key)
+        return key
+
+    def get(self, pk):
+        """Raw row of pk, or None if it is not indexed"""
+        return self._rows.get(pk)
+
+    def remove(self, pk):
+        """Remove one row (no-op if it is not indexed)"""
+        with self._lock:
+            row = self._rows.pop(pk, None)
+            if row is None:
+                return
+            key = self._keys.pop(pk)
+            position = bisect.bisect_left(self._sorted, (key, pk))
+            if position < len(self._sorted) and self._sorted[position] == (key, pk):
+                del self._sorted[position]
+            self.size_bytes -= self._row_size(row, key)
+
+    def search(self, search_term, limit=10, after=None):
+        """
+        Rows whose value starts with the term, shorter values first
+
+        Args:
+            after: (rank, pk) of the last row of the previous page
+
+        Returns:
+            list: (rank, pk, raw row) tuples in (rank, pk) order, the rank
+                  being the length of the value
+        """
+        term = normalize(search_term)
+        with self._lock:
+            # Values starting with the term are one slice of the sorted list
+            values = self._sorted
+            start = bisect.bisect_left(values, (term,))
+            stop = bisect.bisect_left(values, (term + '\U0010ffff',), start)
+            # Length of the stored value, like Length() in the database
+            candidates = (
+                (len(str(self._rows[pk][self.field_name])), pk)
+                for key, pk in values[start:stop]
+            )
+            if after is not None:
+                after = tuple(after)
+                candidates = (ranked for ranked in candidates if ranked > after)
+            ranked = heapq.nsmallest(limit, candidates)
+            return [(rank, pk, self._rows[pk]) for rank, pk in ranked]
+
+    @staticmethod
+    def _row_size(row, key):
+        return (
+            sys.getsizeof(row)
+            + sum(sys.getsizeof(value) for value in row.values())
+            + 2 * sys.getsizeof(key)
+            + ENTRY_BYTES
+        )
+
+
+class AutocompleteRegistry:
+    """
+    LRU of AutocompleteIndex keyed by (database alias, model label, field)
+
+    Database aliases are per tenant ('tenant_<custid>'), so each tenant gets
+    its own indexes; cold tenants are evicted first when over budget.
+    """
+
+    def __init__(self, fields=None, max_bytes=64 * 1024 * 1024, max_rows=50000, ttl=600):
+        self.fields = {label: set(names) for label, names in (fields or {}).items()}
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self._indexes = OrderedDict()
+        self._building = set()
+        self._skipped = {}     # key -> when a too large table was last counted
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        index_settings = dict(DEFAULT_AUTOCOMPLETE_SETTINGS)
+        index_settings.update(getattr(settings, 'AUTOCOMPLETE_INDEX', {}))
+        return cls(
+            fields=index_settings['FIELDS'],
+            max_bytes=index_settings['MAX_BYTES'],
+            max_rows=index_settings['MAX_ROWS'],
+            ttl=index_settings['TTL'],
+        )
+
+    def is_indexed(self, model_class, field_name):
+        return field_name in self.fields.get(model_class._meta.label, ())
+
+    def search(self, model_class, field_name, search_term, database, limit=10, after=None):
+        """
+        Search from memory
+
+        Returns:
+            list of (rank, pk, raw row), or None if the caller should search
+            the database (field not indexed, not a prefix-search database,
+            table too large, index being built)
+        """
+        if not self.is_indexed(model_class, field_name):
+            return None
+        if not isinstance(get_search_backend(connections[database]), PrefixSearchBackend):
+            # The index cannot reproduce substring / similarity matching
+            return None
+        index = self.get_index(model_class, field_name, database)
+        if index is None:
+            return None
+        return index.search(search_term, limit, after)
+
+    def get_index(self, model_class, field_name, database):
+        key = (database, model_class._meta.label, field_name)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None and time.monotonic() - index.built_at < self.ttl:
+                self._indexes.move_to_end(key)
+                return index
+            skipped_at = self._skipped.get(key)
+            if skipped_at is not None and time.monotonic() - skipped_at < self.ttl:
+                return None
+            if key in self._building:
+                # Another request is building it; use the database meanwhile
+                return None
+            self._building.add(key)
+
+        try:
+            index = self.build(model_class, field_name, database)
+        except Exception as e:
+            logger.error(f"Error building autocomplete index {key}: {str(e)}", exc_info=True)
+            index = None
+        finally:
+            with self._lock:
+                self._building.discard(key)
+
+        with self._lock:
+            if index is None:
+                self._indexes.pop(key, None)
+                self._skipped[key] = time.monotonic()
+            else:
+                self._indexes[key] = index
+                self._indexes.move_to_end(key)
+                self._evict()
+        return index
+
+    def build(self, model_class, field_name, database):
+        """Load one field's rows from the tenant database"""
+        queryset = model_class.objects.using(database)
+        if queryset.count() > self.max_rows:
+            logger.info(f"{model_class._meta.label} in {database} has more than "
+                        f"{self.max_rows} rows, not indexing {field_name}")
+            return None
+
+        index = AutocompleteIndex(field_name)
+        attrs = row_attrs(model_class)
+        pk_attr = model_class._meta.pk.attname
+        index.extend(
+            (row[pk_attr], row)
+            for row in queryset.values(*attrs).iterator()
+        )
+        logger.info(f"Built autocomplete index {database}/{model_class._meta.label}.{field_name}: "
+                    f"{len(index)} rows, ~{index.size_bytes // 1024} KB")
+        return index
+
+    def update(self, instance, database, update_fields=None):
+        """
+        Apply a saved instance to the indexes that are loaded
+
+        Args:
+            update_fields: Fields the save wrote (None: every field); only
+                those are taken from the instance. An index not holding the
+                row is dropped, as the other stored values are unknown.
+        """
+        model_class = instance.__class__
+        pk = model_class._meta.pk.to_python(instance.pk)
+        row = None
+        for key, index in self._loaded(model_class, database):
+            if update_fields is None:
+                if row is None:
+                    row = {attr: getattr(instance, attr) for attr in row_attrs(model_class)}
+                index.add(pk, row)
+                continue
+
+            stored = index.get(pk)
+            if stored is None:
+                # Possibly inserted by an upsert; rebuilt at the next search
+                with self._lock:
+                    if self._indexes.get(key) is index:
+                        del self._indexes[key]
+                continue
+            merged = dict(stored)
+            for name in update_fields:
+                attr = model_class._meta.get_field(name).attname
+                merged[attr] = getattr(instance, attr)
+            index.add(pk, merged)
+        with self._lock:
+            self._evict()
+
+    def remove(self, instance, database):
+        """Drop a deleted instance from the indexes that are loaded"""
+        model_class = instance.__class__
+        for key, index in self._loaded(model_class, database):
+            index.remove(model_class._meta.pk.to_python(instance.pk))
+
+    def clear(self, database=None):
+        """Forget every index (or every index of one tenant database)"""
+        with self._lock:
+            for key in list(self._indexes):
+                if database is None or key[0] == database:
+                    del self._indexes[key]
+
+    def _loaded(self, model_class, database):
+        label = model_class._meta.label
+        with self._lock:
+            return [
+                (key, index) for key, index in self._indexes.items()
+                if key[0] == database and key[1] == label
+            ]
+
+    def _evict(self):
+        # Caller holds self._lock
+        total = sum(index.size_bytes for index in self._indexes.values())
+        while total > self.max_bytes and len(self._indexes) > 1:
+            key, index = self._indexes.popitem(last=False)
+            total -= index.size_bytes
+            logger.info(f"Evicted autocomplete index {key}")
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_autocomplete_registry():
+    """
+    Return the process-wide autocomplete registry
+    Returns None when AUTOCOMPLETE_INDEX['ENABLED'] is off
+    """
+    global _registry
+    if not getattr(settings, 'AUTOCOMPLETE_INDEX', {}).get('ENABLED', False):
+        return None
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = AutocompleteRegistry.from_settings()
+    return _registry
+
+
+def _on_save(sender, instance, using, update_fields=None, **kwargs):
+    registry = get_autocomplete_registry()
+    if registry is not None:
+        registry.update(instance, using, update_fields)
+
+
+def _on_delete(sender, instance, using, **kwargs):
+    registry = get_autocomplete_registry()
+    if registry is not None:
+        registry.remove(instance, using)
+
+
+def connect_signals():
+    """Keep indexes current for every model listed in AUTOCOMPLETE_INDEX['FIELDS']"""
+    for label in getattr(settings, 'AUTOCOMPLETE_INDEX', {}).get('FIELDS', {}):
+        # Lazy 'app_label.Model' senders: connected once the model is loaded
+        post_save.connect(_on_save, sender=label,
+                          dispatch_uid=f'autocomplete_index_save_{label}')
+        post_delete.connect(_on_delete, sender=label,
+                            dispatch_uid=f'autocomplete_index_delete_{label}')
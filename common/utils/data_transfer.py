@@ -0,0 +1,311 @@
+# common/utils/data_transfer.py
+"""
+Streaming bulk export and chunked bulk import of master records
+
+Export reads the table with a server-side cursor (QuerySet.iterator) and
+streams CSV rows as they are produced, so memory stays constant whatever
+the table size. XLSX is written row by row by a write-only workbook into
+a temporary file, then streamed from disk.
+
+Import reads the uploaded CSV/XLSX row by row, converts and validates each
+row, and upserts valid rows in chunks with bulk_create (one INSERT ...
+ON CONFLICT DO UPDATE per chunk). Rows that fail are reported with their
+line number instead of aborting the import.
+"""
+
+import codecs
+import csv
+import tempfile
+from itertools import chain, islice
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+
+from common.middleware.database_middleware import get_customer_db
+from common.utils.autocomplete_index import get_autocomplete_registry
+from common.utils.record_versions import invalidate_versions
+from common.utils.serializers import get_serializer_plan
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import openpyxl
+except ImportError:  # Optional: XLSX import/export is unavailable without it
+    openpyxl = None
+
+EXPORT_CHUNK_SIZE = 2000
+IMPORT_CHUNK_SIZE = 1000
+
+# Most row errors listed in an import report (all are counted)
+MAX_REPORTED_ERRORS = 500
+
+CSV_CONTENT_TYPE = 'text/csv'
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class Echo:
+    """File-like object whose write() returns the value (for csv.writer)"""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, plan):
+    """
+    Serialized rows of a queryset, read in chunks through a server-side cursor
+
+    Yields:
+        list: values in plan order
+    """
+    keys = [key for attr, key, convert in plan.steps]
+    for row in queryset.order_by('pk').values(*plan.attrs).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        data = plan.serialize_row(row)
+        yield [data[key] for key in keys]
+
+
+def csv_export_response(queryset, plan, filename):
+    """StreamingHttpResponse producing the CSV as the rows are read"""
+    writer = csv.writer(Echo())
+
+    def generate():
+        # BOM so Excel opens UTF-8 (Arabic names) correctly
+        yield codecs.BOM_UTF8.decode('utf-8')
+        yield writer.writerow([key for attr, key, convert in plan.steps])
+        for values in export_rows(queryset, plan):
+            yield writer.writerow(['' if value is None else value for value in values])
+
+    response = StreamingHttpResponse(generate(), content_type=f'{CSV_CONTENT_TYPE}; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def xlsx_export_response(queryset, plan, filename):
+    """Write-only workbook spooled to a temporary file, streamed from disk"""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=filename[:31])
+    sheet.append([key for attr, key, convert in plan.steps])
+    for values in export_rows(queryset, plan):
+        sheet.append(values)
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output, as_attachment=True, filename=f'{filename}.xlsx', content_type=XLSX_CONTENT_TYPE
+    )
+
+
+def export_records_view(request, model_class, field_mapping=None, filename=None):
+    """
+    Generic view function for a bulk export
+
+    Expected GET parameters:
+        format: 'csv' (default) or 'xlsx'
+    """
+    try:
+        db = get_customer_db()
+        export_format = request.GET.get('format', 'csv').lower()
+        plan = get_serializer_plan(model_class, field_mapping)
+        queryset = model_class.objects.using(db)
+        filename = filename or model_class._meta.model_name
+
+        if export_format == 'csv':
+            return csv_export_response(queryset, plan, filename)
+        if export_format == 'xlsx':
+            if openpyxl is None:
+                return JsonResponse({'success': False, 'error': 'XLSX export requires openpyxl'})
+            return xlsx_export_response(queryset, plan, filename)
+        return JsonResponse({'success': False, 'error': f'Unsupported format: {export_format}'})
+
+    except Exception as e:
+        logger.error(f'Error in export_records_view: {str(e)}', exc_info=True)
+        return JsonResponse({'success': False, 'error': str(e)})
+
+
+def read_csv_rows(uploaded_file):
+    """
+    Rows of an uploaded CSV, read lazily
+
+    Yields:
+        tuple: (line number, dict of header -> value)
+    """
+    lines = codecs.iterdecode(uploaded_file, 'utf-8-sig')
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def cell_text(value):
+    """XLSX cell value as the text a form would submit"""
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()[:10]
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def read_xlsx_rows(uploaded_file):
+    """
+    Rows of the first sheet of an uploaded XLSX, read lazily
+
+    Yields:
+        tuple: (row number, dict of header -> value)
+    """
+    workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [cell_text(value) for value in next(rows, ())]
+        for number, values in enumerate(rows, start=2):
+            if any(value is not None for value in values):
+                yield number, dict(zip(header, (cell_text(value) for value in values)))
+    finally:
+        workbook.close()
+
+
+def import_records(model_class, rows, parse_row, unique_field, database=None,
+                   field_mapping=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Validate and upsert rows in chunks
+
+    Each chunk is written in its own transaction; a chunk the database
+    rejects is rolled back and all of its rows are reported as errors, and
+    the import continues with the next chunk.
+
+    Args:
+        model_class: Django model class
+        rows: Iterable of (row number, dict) from read_csv_rows/read_xlsx_rows
+        parse_row: Callable turning a row dict into a dict of model values;
+                   raises ValueError with a message for invalid rows
+        unique_field: Conflict key; existing records are updated
+        database: Database alias to use
+        field_mapping: Optional dict of database field -> column header; only
+                       the columns present in the file are updated on
+                       existing records (defaults to every field)
+        chunk_size: Rows per INSERT statement
+
+    Returns:
+        dict: {'success': bool, 'imported': int, 'error_count': int,
+               'errors': [{'row': int, 'error': str}], 'error': str or None}
+    """
+    db = database or get_customer_db()
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return {'success': True, 'imported': 0, 'error_count': 0, 'errors': [], 'error': None}
+    rows = chain([first], rows)
+
+    update_fields = [
+        field.name for field in model_class._meta.concrete_fields
+        if not field.primary_key and field.name != unique_field
+        and not getattr(field, 'auto_now_add', False)
+        and (field_mapping is None or getattr(field, 'auto_now', False)
+             or field_mapping.get(field.name) in first[1])
+    ]
+    imported = 0
+    error_count = 0
+    errors = []
+
+    def report(number, message):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'row': number, 'error': message})
+
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            # key -> (row number, instance); a key repeated in a chunk keeps the last row
+            records = {}
+            for number, row in chunk:
+                try:
+                    record = model_class(**parse_row(row))
+                    record.full_clean(validate_unique=False, validate_constraints=False)
+                except ValidationError as e:
+                    report(number, '; '.join(
+                        f'{field}: {" ".join(messages)}' for field, messages in e.message_dict.items()
+                    ))
+                    continue
+                except (ValueError, TypeError) as e:
+                    report(number, str(e))
+                    continue
+
+                key = getattr(record, unique_field)
+                if key in records:
+                    report(records[key][0], f'Duplicate {unique_field} {key}, replaced by row {number}')
+                records[key] = (number, record)
+
+            if not records:
+                continue
+            try:
+                with transaction.atomic(using=db):
+                    model_class.objects.using(db).bulk_create(
+                        [record for number, record in records.values()],
+                        update_conflicts=bool(update_fields),
+                        ignore_conflicts=not update_fields,
+                        unique_fields=[unique_field] if update_fields else None,
+                        update_fields=update_fields or None,
+                    )
+            except DatabaseError as e:
+                logger.warning(f'{model_class.__name__} import: chunk rejected: {str(e)}')
+                for number, record in records.values():
+                    report(number, f'Not imported: {str(e)}')
+                continue
+
+            imported += len(records)
+            if unique_field == model_class._meta.pk.name:
+                # bulk_create sends no post_save; other keys expire with the TTL
+                invalidate_versions(model_class, db, records)
+    finally:
+        # bulk_create sends no post_save; reload the autocomplete indexes
+        # (also after an error, for the chunks already written)
+        registry = get_autocomplete_registry()
+        if registry is not None and imported:
+            registry.clear(db)
+
+    return {
+        'success': True,
+        'imported': imported,
+        'error_count': error_count,
+        'errors': errors,
+        'error': None
+    }
+
+
+def import_records_view(request, model_class, parse_row, unique_field, field_mapping=None):
+    """
+    Generic view function for a bulk import
+
+    Expected POST data:
+        file: Uploaded .csv or .xlsx file
+    """
+    try:
+        uploaded_file = request.FILES.get('file')
+        if uploaded_file is None:
+            return JsonResponse({'success': False, 'error': 'No file uploaded'})
+
+        name = uploaded_file.name.lower()
+        if name.endswith('.csv'):
+            rows = read_csv_rows(uploaded_file)
+        elif name.endswith('.xlsx'):
+            if openpyxl is None:
+                return JsonResponse({'success': False, 'error': 'XLSX import requires openpyxl'})
+            rows = read_xlsx_rows(uploaded_file)
+        else:
+            return JsonResponse({'success': False, 'error': 'Upload a .csv or .xlsx file'})
+
+        result = import_records(model_class, rows, parse_row, unique_field,
+                                field_mapping=field_mapping)
+        logger.info(f'{model_class.__name__} import: {result["imported"]} rows, '
+                    f'{result["error_count"]} errors')
+        return JsonResponse(result)
+
+    except Exception as e:
+        logger.error(f'Error in import_records_view: {str(e)}', exc_info=True)
+        return JsonResponse({'success': False, 'error': str(e)})
@@ -4,24 +4,58 @@ Common utility functions for form handling and database operations
 """
 
 from django.http import JsonResponse
-from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
-from django.db import connection
+from django.db import DatabaseError, connection, connections
 from django.db.models import Q
+from django.db.models.functions import Least
+from django.db.models.signals import post_save
 from common.middleware.database_middleware import get_customer_db
+from common.utils.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from common.utils.search_backends import DEFAULT_BACKEND as DEFAULT_SEARCH_BACKEND
+from common.utils.search_backends import RANK_FIELD, get_search_backend
+from common.utils.autocomplete_index import get_autocomplete_registry
+from common.utils.full_text import (
+    FULL_TEXT_CURSOR, get_full_text_backend, get_search_document, search_tokens,
+)
+from common.utils.record_versions import (
+    add_version_headers, get_record_version, get_version_field, is_conditional,
+    not_modified, record_etag, remember_version,
+)
+from common.utils.serializers import fast_json_response, get_serializer_plan
+from functools import lru_cache
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Cursor sources (see common.utils.pagination)
+CURSOR_DATABASE = 'db'
+CURSOR_INDEX = 'index'
+CURSOR_LIST = 'list'
 
-def fetch_record_by_field(model_class, field_name, field_value, database=None):
+# Largest page a client may ask for
+MAX_PAGE_SIZE = 200
+
+# Most operations accepted by batch_records_view()
+MAX_BATCH_OPERATIONS = 20
+
+
+def fetch_record_by_field(model_class, field_name, field_value, database=None, field_mapping=None,
+                          with_version=False):
     """
     Generic function to fetch a record by any field and return its data
     
+    Only the mapped columns are selected, in a single LIMIT 1 query.
+    
     Args:
         model_class: Django model class (e.g., Organization)
         field_name: Field name to search by (e.g., 'CompanyId', 'Email')
         field_value: Value to search for
         database: Database alias to use (defaults to customer_db)
+        field_mapping: Optional dict of database field -> frontend field;
+                       the returned data uses the frontend names
+        with_version: Also select the primary key and row version (see
+                      common.utils.record_versions) and return them as
+                      'pk' and 'version' (None if the model has none)
         
     Returns:
         dict: {'success': bool, 'data': dict or None, 'error': str or None}
@@ -44,42 +78,48 @@ def fetch_record_by_field(model_class, field_name, field_value, database=None):
                 'error': f'Field "{field_name}" does not exist in {model_class.__name__}'
             }
         
+        # Columns to select, and the key each one is returned under
+        plan = get_serializer_plan(model_class, field_mapping)
+        
         # Build query filter
         filter_kwargs = {field_name: field_value}
         
-        # Query with optimization (select all fields at once)
-        queryset = model_class.objects.using(db).filter(**filter_kwargs)
+        # Version columns ride along in the same query
+        version_field = get_version_field(model_class) if with_version else None
+        extra = [
+            attr for attr in ('pk', version_field)
+            if attr and attr not in plan.attrs
+        ] if with_version else []
+        
+        # One round trip: SELECT <mapped columns> ... LIMIT 1
+        rows = list(
+            model_class.objects.using(db)
+            .filter(**filter_kwargs)
+            .values(*plan.attrs, *extra)[:1]
+        )
         
-        # Check if record exists
-        if not queryset.exists():
+        if not rows:
             return {
                 'success': False,
                 'data': None,
                 'error': f'No record found with {field_name}={field_value}'
             }
         
-        # Get the record
-        try:
-            record = queryset.first()
-        except MultipleObjectsReturned:
-            logger.warning(f'Multiple records found for {field_name}={field_value}, returning first')
-            record = queryset.first()
-        
-        # Convert model instance to dictionary
-        data = model_to_dict_with_dates(record)
-        
-        return {
+        result = {
             'success': True,
-            'data': data,
+            'data': plan.serialize_row(rows[0]),
             'error': None
         }
+        if with_version:
+            row = rows[0]
+            pk = row['pk'] if 'pk' in row else row[model_class._meta.pk.attname]
+            result['pk'] = pk
+            result['version'] = (
+                remember_version(model_class, db, pk, row[version_field])
+                if version_field and row[version_field] is not None else None
+            )
+        return result
         
-    except ObjectDoesNotExist:
-        return {
-            'success': False,
-            'data': None,
-            'error': f'Record not found'
-        }
     except Exception as e:
         logger.error(f'Error fetching record: {str(e)}', exc_info=True)
         return {
@@ -89,9 +129,14 @@ def fetch_record_by_field(model_class, field_name, field_value, database=None):
         }
 
 
-def search_records_by_field(model_class, field_name, search_term, database=None, limit=10):
+def search_records_by_field(model_class, field_name, search_term, database=None, limit=10,
+                            field_mapping=None, cursor=None):
     """
-    Search for records where field contains the search term (case-insensitive)
+    Search for records matching the search term (case-insensitive)
+    
+    Uses the database's indexed search backend (trigram on PostgreSQL,
+    prefix on SQLite); results are ordered best match first and paged by
+    keyset on (rank, pk).
     
     Args:
         model_class: Django model class
@@ -99,13 +144,19 @@ def search_records_by_field(model_class, field_name, search_term, database=None,
         search_term: Text to search for
         database: Database alias to use
         limit: Maximum number of results to return
+        field_mapping: Optional dict of database field -> frontend field;
+                       results use the frontend names
+        cursor: next_cursor of the previous page, or None for the first page
         
     Returns:
-        dict: {'success': bool, 'results': list, 'count': int, 'error': str or None}
+        dict: {'success': bool, 'results': list, 'count': int,
+               'next_cursor': str or None, 'error': str or None}
         
     Example:
         result = search_records_by_field(Organization, 'CompanyName', 'Nep')
-        # Returns companies with names containing 'Nep' (Neptune, Nepton, etc.)
+        # Returns companies with names matching 'Nep' (Neptune, Nepton, etc.)
+        more = search_records_by_field(Organization, 'CompanyName', 'Nep',
+                                       cursor=result['next_cursor'])
     """
     
     try:
@@ -114,64 +165,75 @@ def search_records_by_field(model_class, field_name, search_term, database=None,
         
         # Validate field exists
         if not hasattr(model_class, field_name):
-            return {
-                'success': False,
-                'results': [],
-                'count': 0,
-                'error': f'Field "{field_name}" does not exist in {model_class.__name__}'
-            }
+            return search_error(f'Field "{field_name}" does not exist in {model_class.__name__}')
         
         # Don't search for empty strings
         if not search_term or not search_term.strip():
-            return {
-                'success': True,
-                'results': [],
-                'count': 0,
-                'error': None
-            }
-        
-        # Build case-insensitive search query
-        filter_kwargs = {f'{field_name}__icontains': search_term}
-        
-        # Query with limit
-        queryset = model_class.objects.using(db).filter(**filter_kwargs)[:limit]
+            return search_result([], None)
+        
+        search_term = search_term.strip()
+        plan = get_serializer_plan(model_class, field_mapping)
+        source, after = parse_cursor(cursor, CURSOR_INDEX, CURSOR_DATABASE)
+        
+        # In-memory index, when enabled for this field
+        if source in (None, CURSOR_INDEX):
+            registry = get_autocomplete_registry()
+            matches = None
+            if registry is not None:
+                matches = registry.search(model_class, field_name, search_term, db, limit + 1, after)
+            
+            if matches is not None:
+                next_cursor = None
+                if len(matches) > limit:
+                    matches = matches[:limit]
+                    rank, pk, row = matches[-1]
+                    next_cursor = encode_cursor(CURSOR_INDEX, rank, pk)
+                return search_result([plan.serialize_row(row) for rank, pk, row in matches], next_cursor)
+            
+            if source == CURSOR_INDEX:
+                # The index that produced the cursor is not available
+                return search_error('Search results expired, please search again')
+        
+        # Indexed, ranked search for this database
+        backend = get_search_backend(connections[db])
+        queryset = backend.search(model_class.objects.using(db), field_name, search_term)
+        rows, next_cursor = keyset_page(
+            queryset, plan.attrs, limit, CURSOR_DATABASE, rank_field=RANK_FIELD, after=after
+        )
         
         # Convert to list of dictionaries
-        results = []
-        for record in queryset:
-            record_dict = model_to_dict_with_dates(record)
-            results.append(record_dict)
-        
-        return {
-            'success': True,
-            'results': results,
-            'count': len(results),
-            'error': None
-        }
+        return search_result([plan.serialize_row(row) for row in rows], next_cursor)
         
+    except InvalidCursor as e:
+        return search_error(str(e))
     except Exception as e:
         logger.error(f'Error searching records: {str(e)}', exc_info=True)
-        return {
-            'success': False,
-            'results': [],
-            'count': 0,
-            'error': str(e)
-        }
+        return search_error(str(e))
 
 
-def search_records_multi_field(model_class, search_fields, search_term, database=None, limit=10):
+def search_records_multi_field(model_class, search_fields, search_term, database=None, limit=10,
+                               field_mapping=None, cursor=None):
     """
     Search for records across multiple fields (OR search)
     
+    When the model has a search document (common.utils.full_text) covering
+    every search field, every word of the term is matched as a prefix in one
+    full-text index scan and rows are ranked by the weighted field matches.
+    Otherwise rows matching any field by prefix rank first. Either way pages
+    are keyed on (rank, pk) like search_records_by_field()
+    
     Args:
         model_class: Django model class
         search_fields: List of field names to search in
         search_term: Text to search for
         database: Database alias to use
         limit: Maximum number of results
+        field_mapping: Optional dict of database field -> frontend field
+        cursor: next_cursor of the previous page, or None for the first page
         
     Returns:
-        dict: {'success': bool, 'results': list, 'count': int, 'error': str or None}
+        dict: {'success': bool, 'results': list, 'count': int,
+               'next_cursor': str or None, 'error': str or None}
         
     Example:
         # Search in both company name and email
@@ -186,45 +248,229 @@ def search_records_multi_field(model_class, search_fields, search_term, database
         db = database or get_customer_db()
         
         if not search_term or not search_term.strip():
-            return {
-                'success': True,
-                'results': [],
-                'count': 0,
-                'error': None
-            }
-        
-        # Build OR query
+            return search_result([], None)
+        
+        search_term = search_term.strip()
+        search_fields = [name for name in search_fields if hasattr(model_class, name)]
+        if not search_fields:
+            return search_error(f'No searchable fields in {model_class.__name__}')
+        
+        plan = get_serializer_plan(model_class, field_mapping)
+        source, after = parse_cursor(cursor, CURSOR_DATABASE, FULL_TEXT_CURSOR)
+        
+        document = get_search_document(model_class)
+        backend = get_full_text_backend(connections[db])
+        if document and backend and set(search_fields) <= set(document.fields):
+            tokens = search_tokens(search_term)
+            if not tokens:
+                return search_result([], None)
+            if source != CURSOR_DATABASE:
+                try:
+                    rows, next_cursor = backend.page(
+                        model_class, db, document, tokens, search_fields, plan.attrs, limit, after
+                    )
+                    return search_result([plan.serialize_row(row) for row in rows], next_cursor)
+                except DatabaseError as e:
+                    # Search document migration not applied on this database
+                    logger.warning(f'Full-text search unavailable on {db}: {e}')
+                    if source == FULL_TEXT_CURSOR:
+                        return search_error('Search results expired')
+        elif source == FULL_TEXT_CURSOR:
+            return search_error('Search results expired')
+        
+        # Build OR query; a single table never yields duplicate rows, so no
+        # DISTINCT is needed
+        backend = DEFAULT_SEARCH_BACKEND
         q_objects = Q()
         for field_name in search_fields:
-            if hasattr(model_class, field_name):
-                q_objects |= Q(**{f'{field_name}__icontains': search_term})
+            q_objects |= Q(**{f'{field_name}__icontains': search_term})
+        
+        ranks = [backend.rank(field_name, search_term) for field_name in search_fields]
+        queryset = (
+            model_class.objects.using(db)
+            .filter(q_objects)
+            .annotate(**{RANK_FIELD: Least(*ranks) if len(ranks) > 1 else ranks[0]})
+            .order_by(RANK_FIELD, 'pk')
+        )
+        rows, next_cursor = keyset_page(
+            queryset, plan.attrs, limit, CURSOR_DATABASE, rank_field=RANK_FIELD, after=after
+        )
+        
+        return search_result([plan.serialize_row(row) for row in rows], next_cursor)
+        
+    except InvalidCursor as e:
+        return search_error(str(e))
+    except Exception as e:
+        logger.error(f'Error in multi-field search: {str(e)}', exc_info=True)
+        return search_error(str(e))
+
+
+def list_records(model_class, database=None, limit=50, field_mapping=None, cursor=None):
+    """
+    List records in primary key order, one keyset page at a time
+    
+    Constant cost per page: no OFFSET and no COUNT(*)
+    
+    Returns:
+        dict: {'success': bool, 'results': list, 'count': int,
+               'next_cursor': str or None, 'error': str or None}
+    """
+    
+    try:
+        db = database or get_customer_db()
+        plan = get_serializer_plan(model_class, field_mapping)
+        source, after = parse_cursor(cursor, CURSOR_LIST)
+        
+        queryset = model_class.objects.using(db).order_by('pk')
+        rows, next_cursor = keyset_page(queryset, plan.attrs, limit, CURSOR_LIST, after=after)
+        
+        return search_result([plan.serialize_row(row) for row in rows], next_cursor)
         
-        # Execute query
-        queryset = model_class.objects.using(db).filter(q_objects).distinct()[:limit]
+    except InvalidCursor as e:
+        return search_error(str(e))
+    except Exception as e:
+        logger.error(f'Error listing records: {str(e)}', exc_info=True)
+        return search_error(str(e))
+
+
+def changed_fields(data, original, unique_field):
+    """
+    Fields of data whose value differs from the client's snapshot
+    
+    Args:
+        data: dict of database field -> submitted value
+        original: dict of database field -> value the client loaded,
+                  or None when the client loaded nothing (all fields count)
+        unique_field: Conflict key, never updated
+    
+    Returns:
+        list: changed database field names, in data order
+    """
+    return [
+        field for field, value in data.items()
+        if field != unique_field and (original is None or original.get(field) != value)
+    ]
+
+
+def auto_now_fields(model_class, exclude=()):
+    """Names of the model's auto_now fields (e.g. UpdatedAt) not in exclude"""
+    return [
+        field.name for field in model_class._meta.concrete_fields
+        if getattr(field, 'auto_now', False) and field.name not in exclude
+    ]
+
+
+def upsert_record(model_class, data, unique_field, database=None, original=None):
+    """
+    Insert or update one record in a single statement
+    
+    Runs INSERT ... ON CONFLICT (unique_field) DO UPDATE SET <changed columns>
+    (PostgreSQL and SQLite), so there is no read before the write and only
+    the columns that differ from the client's snapshot are rewritten. With
+    nothing changed the row is only inserted if it has disappeared.
+    post_save is sent by hand, as bulk_create() does not send it: instance
+    holds the submitted values, update_fields names the columns written to
+    an existing row, and created is always False because the statement does
+    not tell an insert from an update.
+    
+    Args:
+        model_class: Django model class
+        data: dict of database field -> value for every submitted field
+        unique_field: Field the conflict is detected on (e.g. 'CompanyId')
+        database: Database alias to use
+        original: Optional dict of database field -> value the client loaded
+    
+    Returns:
+        dict: {'success': bool, 'record': instance or None,
+               'action': 'saved' | 'updated' | 'unchanged',
+               'changed_fields': list, 'error': str or None}
+    """
+    try:
+        db = database or get_customer_db()
+        changed = changed_fields(data, original, unique_field)
+        # auto_now columns (row versions) move with every real update
+        update_fields = changed + auto_now_fields(model_class, changed) if changed else []
+        record = model_class(**data)
+        
+        if changed:
+            model_class.objects.using(db).bulk_create(
+                [record],
+                update_conflicts=True,
+                unique_fields=[unique_field],
+                update_fields=update_fields,
+            )
+        else:
+            model_class.objects.using(db).bulk_create([record], ignore_conflicts=True)
+        
+        # Whether the row was inserted is unknown, so receivers get
+        # created=False; only update_fields of an existing row were written,
+        # the rest of record is the submitted form, not the stored row
+        record._state.adding = False
+        record._state.db = db
+        post_save.send(
+            sender=model_class, instance=record, created=False, raw=False,
+            using=db, update_fields=frozenset(update_fields),
+        )
         
-        # Convert to list
-        results = []
-        for record in queryset:
-            record_dict = model_to_dict_with_dates(record)
-            results.append(record_dict)
+        if original is None:
+            action = 'saved'
+        else:
+            action = 'updated' if changed else 'unchanged'
         
         return {
             'success': True,
-            'results': results,
-            'count': len(results),
+            'record': record,
+            'action': action,
+            'changed_fields': changed,
             'error': None
         }
         
     except Exception as e:
-        logger.error(f'Error in multi-field search: {str(e)}', exc_info=True)
+        logger.error(f'Error upserting {model_class.__name__}: {str(e)}', exc_info=True)
         return {
             'success': False,
-            'results': [],
-            'count': 0,
+            'record': None,
+            'action': None,
+            'changed_fields': [],
             'error': str(e)
         }
 
 
+def parse_cursor(cursor, *sources):
+    """
+    Decode a client cursor issued by one of the given sources
+    
+    Returns:
+        tuple: (source, (rank, pk)) or (None, None) for the first page
+    """
+    if not cursor:
+        return None, None
+    source, rank, pk = decode_cursor(cursor)
+    if source not in sources:
+        raise InvalidCursor(f'Invalid cursor: {cursor}')
+    return source, (rank, pk)
+
+
+def search_result(results, next_cursor):
+    return {
+        'success': True,
+        'results': results,
+        'count': len(results),
+        'next_cursor': next_cursor,
+        'error': None
+    }
+
+
+def search_error(error):
+    return {
+        'success': False,
+        'results': [],
+        'count': 0,
+        'next_cursor': None,
+        'error': error
+    }
+
+
 def model_to_dict_with_dates(record):
     """
     Convert model instance to dictionary with proper date/datetime handling
@@ -235,22 +481,7 @@ def model_to_dict_with_dates(record):
     Returns:
         dict: Model data with properly formatted dates
     """
-    data = {}
-    for field in record._meta.fields:
-        field_name = field.name
-        value = getattr(record, field_name)
-        
-        # Handle special field types
-        if value is None:
-            data[field_name] = None
-        elif hasattr(value, 'strftime'):  # Date/DateTime fields
-            data[field_name] = value.strftime('%Y-%m-%d')
-        elif isinstance(value, bool):
-            data[field_name] = value
-        else:
-            data[field_name] = str(value)
-    
-    return data
+    return get_serializer_plan(type(record)).serialize(record)
 
 
 def fetch_record_by_field_view(request, model_class, field_mapping=None):
@@ -277,18 +508,41 @@ def fetch_record_by_field_view(request, model_class, field_mapping=None):
                 'error': 'Missing field or value parameter'
             })
         
-        # Fetch record
-        result = fetch_record_by_field(model_class, field_name, field_value)
-        
-        if result['success'] and result['data'] and field_mapping:
-            # Apply field mapping if provided
-            mapped_data = {}
-            for db_field, frontend_field in field_mapping.items():
-                if db_field in result['data']:
-                    mapped_data[frontend_field] = result['data'][db_field]
-            result['data'] = mapped_data
+        db = get_customer_db()
+        versioned = get_version_field(model_class) is not None
+        # Same record, other mapping: different body, different ETag
+        variant = f'lookup:{sorted((field_mapping or {}).items())}'
+        
+        # Revalidation by primary key: answer from the version cache,
+        # without reading the row
+        pk_field = model_class._meta.pk
+        if versioned and field_name in (pk_field.name, pk_field.attname) and is_conditional(request):
+            try:
+                pk = pk_field.to_python(field_value)
+            except Exception:
+                pk = None
+            stamp = get_record_version(model_class, db, pk) if pk is not None else None
+            if stamp is not None:
+                etag = record_etag(model_class, db, pk, stamp, variant)
+                response = not_modified(request, etag, stamp)
+                if response is not None:
+                    return response
+        
+        # Fetch only the mapped fields, already under their frontend names
+        result = fetch_record_by_field(
+            model_class, field_name, field_value, database=db,
+            field_mapping=field_mapping, with_version=versioned
+        )
+        pk = result.pop('pk', None)
+        stamp = result.pop('version', None)
+        if stamp is None:
+            return fast_json_response(result)
         
-        return JsonResponse(result)
+        etag = record_etag(model_class, db, pk, stamp, variant)
+        response = not_modified(request, etag, stamp)
+        if response is None:
+            response = fast_json_response(result)
+        return add_version_headers(response, etag, stamp)
         
     except Exception as e:
         logger.error(f'Error in fetch_record_by_field_view: {str(e)}', exc_info=True)
@@ -314,66 +568,203 @@ def search_records_view(request, model_class, field_name, field_mapping=None, di
         
     Example:
         GET /company/search/?q=Nep&limit=10
+        GET /company/search/?q=Nep&limit=10&cursor=<next_cursor>
     """
     
     try:
         search_term = request.GET.get('q', '')
-        limit = int(request.GET.get('limit', 10))
-        
-        # Perform search
-        result = search_records_by_field(model_class, field_name, search_term, limit=limit)
-        
-        if result['success'] and field_mapping:
-            # Apply field mapping to all results
-            mapped_results = []
-            for record_data in result['results']:
-                mapped_record = {}
-                for db_field, frontend_field in field_mapping.items():
-                    if db_field in record_data:
-                        mapped_record[frontend_field] = record_data[db_field]
-                
-                # Add display text for dropdown
-                if display_fields:
-                    display_parts = []
-                    for display_field in display_fields:
-                        if display_field in mapped_record and mapped_record[display_field]:
-                            display_parts.append(str(mapped_record[display_field]))
-                    mapped_record['_display'] = ' - '.join(display_parts)
-                
-                mapped_results.append(mapped_record)
-            
-            result['results'] = mapped_results
+        limit = clamp_limit(request.GET.get('limit'), 10)
+        
+        # Perform search (results already use the frontend field names)
+        result = search_records_by_field(
+            model_class, field_name, search_term, limit=limit,
+            field_mapping=field_mapping, cursor=request.GET.get('cursor')
+        )
         
-        return JsonResponse(result)
+        if result['success'] and field_mapping and display_fields:
+            add_display_text(result['results'], display_fields)
+        
+        return fast_json_response(result)
         
     except Exception as e:
         logger.error(f'Error in search_records_view: {str(e)}', exc_info=True)
+        return JsonResponse(search_error(str(e)))
+
+
+def add_display_text(results, display_fields):
+    """Add '_display' (dropdown text) to mapped search results"""
+    for mapped_record in results:
+        display_parts = []
+        for display_field in display_fields:
+            if mapped_record.get(display_field):
+                display_parts.append(str(mapped_record[display_field]))
+        mapped_record['_display'] = ' - '.join(display_parts)
+
+
+def batch_records_view(request, models):
+    """
+    Django view function running several lookups/searches in one request
+    
+    All operations run one after another on the request's tenant
+    connection, so a form pays for one middleware/session/connection cycle
+    instead of one per field.
+    
+    Args:
+        request: Django request object (POST, JSON body)
+        models: dict of model name -> (model_class, field_mapping, display_fields)
+                where display_fields maps a searched field to its dropdown fields
+        
+    Returns:
+        JsonResponse: {'success': bool, 'results': {id: result}, 'error': str or None}
+        
+    Example:
+        POST /company/batch/
+        {"operations": [
+            {"id": "code", "model": "company", "op": "lookup", "field": "CompanyId", "value": "1"},
+            {"id": "name", "model": "company", "op": "search", "field": "CompanyName", "q": "Nep"}
+        ]}
+    """
+    
+    try:
+        try:
+            operations = json.loads(request.body or b'{}').get('operations')
+        except (ValueError, AttributeError):
+            operations = None
+        
+        if not isinstance(operations, list) or not operations:
+            return JsonResponse({
+                'success': False,
+                'results': {},
+                'error': 'Expected a JSON body with a non-empty "operations" list'
+            })
+        
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return JsonResponse({
+                'success': False,
+                'results': {},
+                'error': f'At most {MAX_BATCH_OPERATIONS} operations per batch'
+            })
+        
+        # One tenant connection for the whole batch
+        db = get_customer_db()
+        
+        results = {}
+        for position, operation in enumerate(operations):
+            if not isinstance(operation, dict):
+                results[str(position)] = search_error('Operation must be an object')
+                continue
+            results[str(operation.get('id', position))] = run_batch_operation(operation, models, db)
+        
+        return fast_json_response({
+            'success': True,
+            'results': results,
+            'error': None
+        })
+        
+    except Exception as e:
+        logger.error(f'Error in batch_records_view: {str(e)}', exc_info=True)
         return JsonResponse({
             'success': False,
-            'results': [],
-            'count': 0,
+            'results': {},
             'error': str(e)
         })
 
 
-def optimize_query(queryset):
+def run_batch_operation(operation, models, db):
+    """Run one batch operation ('lookup' or 'search') on database db"""
+    entry = models.get(operation.get('model'))
+    if entry is None:
+        return search_error(f'Unknown model "{operation.get("model")}"')
+    model_class, field_mapping, display_fields = entry
+    
+    field_name = operation.get('field')
+    if not field_name:
+        return search_error('Missing field parameter')
+    
+    if operation.get('op') == 'lookup':
+        field_value = operation.get('value')
+        if field_value in (None, ''):
+            return {'success': False, 'data': None, 'error': 'Missing field or value parameter'}
+        return fetch_record_by_field(
+            model_class, field_name, field_value, database=db, field_mapping=field_mapping
+        )
+    
+    if operation.get('op') == 'search':
+        result = search_records_by_field(
+            model_class, field_name, str(operation.get('q', '')), database=db,
+            limit=clamp_limit(operation.get('limit'), 10),
+            field_mapping=field_mapping, cursor=operation.get('cursor')
+        )
+        fields_for_display = (display_fields or {}).get(field_name)
+        if result['success'] and field_mapping and fields_for_display:
+            add_display_text(result['results'], fields_for_display)
+        return result
+    
+    return search_error(f'Unknown operation "{operation.get("op")}"')
+
+
+def list_records_view(request, model_class, field_mapping=None):
+    """
+    Django view function for infinite-scroll listing screens
+    
+    Example:
+        GET /company/list/?limit=50
+        GET /company/list/?limit=50&cursor=<next_cursor>
+    """
+    
+    try:
+        limit = clamp_limit(request.GET.get('limit'), 50)
+        result = list_records(
+            model_class, limit=limit, field_mapping=field_mapping,
+            cursor=request.GET.get('cursor')
+        )
+        return fast_json_response(result)
+        
+    except Exception as e:
+        logger.error(f'Error in list_records_view: {str(e)}', exc_info=True)
+        return JsonResponse(search_error(str(e)))
+
+
+def clamp_limit(value, default, maximum=MAX_PAGE_SIZE):
+    """Parse a ?limit= parameter, keeping it between 1 and maximum"""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, maximum))
+
+
+@lru_cache(maxsize=None)
+def get_relation_plan(model):
+    """
+    Relations optimize_query() can load for a model, worked out once
+
+    Returns:
+        tuple: (foreign key names for select_related,
+                many-to-many names for prefetch_related)
+    """
+    fields = model._meta.get_fields()
+    fk_fields = tuple(f.name for f in fields if f.many_to_one and f.concrete)
+    m2m_fields = tuple(f.name for f in fields if f.many_to_many and not f.auto_created)
+    return fk_fields, m2m_fields
+
+
+def optimize_query(queryset, relations=None):
     """
     Optimize a queryset by adding select_related and prefetch_related
     based on the model's foreign keys and many-to-many relationships
-    """
-    model = queryset.model
     
-    # Get all foreign key fields
-    fk_fields = [
-        f.name for f in model._meta.get_fields()
-        if f.many_to_one and f.concrete
-    ]
+    Args:
+        queryset: QuerySet to optimize
+        relations: Optional names of the relations the caller will read;
+                   defaults to every relation of the model
+    """
+    fk_fields, m2m_fields = get_relation_plan(queryset.model)
     
-    # Get all many-to-many fields
-    m2m_fields = [
-        f.name for f in model._meta.get_fields()
-        if f.many_to_many and not f.auto_created
-    ]
+    if relations is not None:
+        wanted = set(relations)
+        fk_fields = [name for name in fk_fields if name in wanted]
+        m2m_fields = [name for name in m2m_fields if name in wanted]
     
     # Apply optimizations
     if fk_fields:
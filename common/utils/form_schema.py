@@ -0,0 +1,239 @@
+# common/utils/form_schema.py
+"""
+Form schema registry for the universal form system
+
+Each form's configuration is declared once (common/forms/schemas.py) and
+compiled at startup into a FormSchema: immutable tuples of namedtuples,
+fields already split into the ungrouped section and their groups, and the
+form action reversed on first use. Views no longer rebuild the config dict
+on every request.
+
+The rendered field markup of universal_form.html is cached per
+(form, schema version, business type, language); see form_context().
+"""
+
+import hashlib
+import json
+import threading
+from collections import namedtuple
+from functools import cached_property
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import NoReverseMatch, reverse
+from django.utils import translation
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+FieldSchema = namedtuple('FieldSchema', [
+    'name',
+    'label',
+    'type',
+    'required',
+    'width',
+    'placeholder',
+    'group',          # Group id, or None for the ungrouped section
+    'db_field',       # Model field the value is saved to
+    'lookup',         # Exact lookup on change
+    'autocomplete',   # Autocomplete dropdown
+    'options',        # OptionSchema tuple for select fields
+    'default',        # Value or zero-argument callable
+], defaults=('text', False, '100%', '', None, None, False, False, (), None))
+
+OptionSchema = namedtuple('OptionSchema', ['value', 'label'])
+ButtonSchema = namedtuple('ButtonSchema', ['label', 'icon', 'type', 'onclick'],
+                          defaults=('', 'secondary', ''))
+MenuItemSchema = namedtuple('MenuItemSchema', ['label', 'icon', 'onclick'], defaults=('', ''))
+GroupSchema = namedtuple('GroupSchema', ['id', 'title', 'icon', 'fields'])
+
+FORM_KEYS = {
+    'form_id', 'title', 'icon', 'action', 'footer_status', 'background',
+    'buttons', 'menu_items', 'groups', 'fields',
+}
+
+
+class FormSchema:
+    """Compiled, read-only form configuration"""
+
+    def __init__(self, name, version, form_id, title, icon, action, footer_status,
+                 background, buttons, menu_items, groups, ungrouped_fields, fields):
+        self.name = name
+        self.version = version
+        self.form_id = form_id
+        self.title = title
+        self.icon = icon
+        self.action_target = action
+        self.footer_status = footer_status
+        self.background = background
+        self.buttons = buttons
+        self.menu_items = menu_items
+        self.groups = groups
+        self.ungrouped_fields = ungrouped_fields
+        self.fields = fields
+
+    @cached_property
+    def action(self):
+        """Form action; URL names ('app:name') are reversed once"""
+        target = self.action_target
+        if not target or target.startswith('/') or ':' not in target:
+            return target
+        try:
+            return reverse(target)
+        except NoReverseMatch:
+            logger.warning(f'Form {self.name}: cannot reverse action {target}')
+            return '#'
+
+    @cached_property
+    def field_mapping(self):
+        """Database field -> form field name"""
+        return {field.db_field: field.name for field in self.fields if field.db_field}
+
+    def initial(self):
+        """Default values of the fields that have one (callables are called)"""
+        return {
+            field.name: field.default() if callable(field.default) else field.default
+            for field in self.fields
+            if field.default is not None
+        }
+
+    def __repr__(self):
+        return f'<FormSchema {self.name} v{self.version}>'
+
+
+def schema_version(config):
+    """Stable hash of a declaration (callables by qualified name)"""
+    raw = json.dumps(
+        config, sort_keys=True,
+        default=lambda value: getattr(value, '__qualname__', repr(value)),
+    )
+    prefix = getattr(settings, 'FORM_SCHEMAS', {}).get('VERSION', 0)
+    return f"{prefix}.{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:12]}"
+
+
+def compile_schema(name, config):
+    """
+    Compile a form declaration
+
+    Raises:
+        ImproperlyConfigured: unknown keys or fields in an undeclared group
+    """
+    unknown = set(config) - FORM_KEYS
+    if unknown:
+        raise ImproperlyConfigured(f'Form {name}: unknown keys {sorted(unknown)}')
+
+    fields = []
+    for field in config.get('fields', ()):
+        try:
+            fields.append(FieldSchema(**dict(
+                field,
+                options=tuple(OptionSchema(**option) for option in field.get('options', ())),
+            )))
+        except TypeError as e:
+            raise ImproperlyConfigured(f'Form {name}: field {field.get("name")}: {e}') from e
+    fields = tuple(fields)
+
+    group_ids = [group['id'] for group in config.get('groups', ())]
+    for field in fields:
+        if field.group is not None and field.group not in group_ids:
+            raise ImproperlyConfigured(f'Form {name}: field {field.name} is in unknown group {field.group}')
+
+    groups = tuple(
+        GroupSchema(
+            id=group['id'],
+            title=group.get('title', ''),
+            icon=group.get('icon', ''),
+            fields=tuple(field for field in fields if field.group == group['id']),
+        )
+        for group in config.get('groups', ())
+    )
+
+    return FormSchema(
+        name=name,
+        version=schema_version(config),
+        form_id=config.get('form_id', name),
+        title=config.get('title', ''),
+        icon=config.get('icon', '📝'),
+        action=config.get('action', ''),
+        footer_status=config.get('footer_status', 'Ready'),
+        background=config.get('background', 'white'),
+        buttons=tuple(ButtonSchema(**button) for button in config.get('buttons', ())),
+        menu_items=tuple(MenuItemSchema(**item) for item in config.get('menu_items', ())),
+        groups=groups,
+        ungrouped_fields=tuple(field for field in fields if field.group is None),
+        fields=fields,
+    )
+
+
+class FormSchemaRegistry:
+    """Declared forms, compiled once"""
+
+    def __init__(self):
+        self._declarations = {}
+        self._schemas = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, config):
+        with self._lock:
+            self._declarations[name] = config
+            self._schemas.pop(name, None)
+
+    def get(self, name):
+        """
+        Compiled schema of a registered form
+
+        Raises:
+            KeyError: if no form of that name is registered
+        """
+        schema = self._schemas.get(name)
+        if schema is None:
+            with self._lock:
+                schema = self._schemas.get(name)
+                if schema is None:
+                    schema = compile_schema(name, self._declarations[name])
+                    self._schemas[name] = schema
+        return schema
+
+    def compile_all(self):
+        """Compile every registered form (at startup, so errors surface early)"""
+        for name in list(self._declarations):
+            self.get(name)
+        return len(self._schemas)
+
+
+_registry = FormSchemaRegistry()
+
+
+def register_form(name, config):
+    """Declare a form; config uses the universal form dict layout"""
+    _registry.register(name, config)
+
+
+def get_form_schema(name):
+    return _registry.get(name)
+
+
+def get_form_registry():
+    return _registry
+
+
+def form_context(request, name, context_name='form_config', **extra):
+    """
+    Template context for a universal form page
+
+    Adds the compiled schema under context_name plus the fragment cache
+    variables used by universal_form.html (business type, language and
+    timeout).
+    """
+    options = getattr(settings, 'FORM_SCHEMAS', {})
+    # Set by RequestClassificationMiddleware
+    request_context = getattr(request, 'erp_context', None)
+    context = {
+        context_name: get_form_schema(name),
+        'form_business_type': request_context.business_type if request_context else 'common',
+        'form_language': translation.get_language(),
+        'form_cache_timeout': options.get('FRAGMENT_CACHE_TIMEOUT', 3600),
+    }
+    context.update(extra)
+    return context
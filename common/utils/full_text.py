@@ -0,0 +1,180 @@
+# common/utils/full_text.py
+"""
+Full-text search over a per-model search document
+
+Each searchable model has a search document (migration 0003 for
+Organization) kept up to date by the database itself:
+
+- PostgreSQL: generated tsvector column, one weight class (A-D) per field,
+  with a GIN index
+- SQLite: FTS5 table maintained by triggers, one FTS column per field
+
+Field weights are applied at query time (ts_rank weights / bm25 column
+weights), so they can be tuned in settings.FULL_TEXT_SEARCH without a
+migration. Arabic text is folded (alef/ya/ta marbuta variants, tashkeel
+and tatweel removed) on both the indexed and the query side.
+"""
+
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from common.utils.pagination import encode_cursor, keyset_page
+from common.utils.search_backends import RANK_FIELD
+
+SearchDocument = namedtuple('SearchDocument', [
+    'table',        # Model table
+    'pk_column',
+    'fields',       # Document fields, in weight class order A, B, C, D
+    'column',       # PostgreSQL tsvector column
+    'fts_table',    # SQLite FTS5 table
+])
+
+# Must match the columns created by the migrations
+SEARCH_DOCUMENTS = {
+    'common.Organization': SearchDocument(
+        table='Organization',
+        pk_column='CompanyId',
+        fields=('CompanyName', 'ArabicName', 'Email', 'City'),
+        column='search_document',
+        fts_table='organization_fts',
+    ),
+}
+
+DEFAULT_FIELD_WEIGHT = 0.5
+
+# Cursor source of full-text pages (see common.utils.pagination)
+FULL_TEXT_CURSOR = 'fts'
+
+WEIGHT_CLASSES = 'ABCD'
+
+# Arabic letter variants folded to one form; '@' and '.' split emails and
+# domains into words
+FOLD_MAP = {
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ة': 'ه',
+    'ى': 'ي', 'ئ': 'ي',
+    'ؤ': 'و',
+    '@': ' ', '.': ' ',
+}
+
+# Tatweel, tashkeel (fathatan .. sukun) and superscript alef are dropped
+STRIP_CHARS = 'ـًٌٍَُِّْٰ'
+
+TRANSLATION = str.maketrans({**FOLD_MAP, **{char: None for char in STRIP_CHARS}})
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize_search_text(text):
+    """Fold text the same way the search documents are folded"""
+    return str(text).translate(TRANSLATION).casefold()
+
+
+def search_tokens(text):
+    """Words of a search term, normalized (safe to embed in a query)"""
+    return TOKEN_RE.findall(normalize_search_text(text))
+
+
+def get_search_document(model_class):
+    return SEARCH_DOCUMENTS.get(model_class._meta.label)
+
+
+def get_field_weights(model_class, document):
+    """
+    Weight per document field from settings.FULL_TEXT_SEARCH
+
+    Returns:
+        list: weights in document field order
+    """
+    configured = getattr(settings, 'FULL_TEXT_SEARCH', {}).get(model_class._meta.label, {})
+    return [float(configured.get(field, DEFAULT_FIELD_WEIGHT)) for field in document.fields]
+
+
+class PostgresFullText:
+    """tsvector @@ prefix tsquery, ranked by weighted ts_rank"""
+
+    vendor = 'postgresql'
+
+    def build_query(self, document, tokens, fields):
+        # 'word':*AC matches prefixes of word in weight classes A and C only
+        classes = ''.join(WEIGHT_CLASSES[document.fields.index(field)] for field in fields)
+        return ' & '.join(f"'{token}':*{classes}" for token in tokens)
+
+    def page(self, model_class, database, document, tokens, fields, columns, limit, after):
+        weights = get_field_weights(model_class, document)
+        query = self.build_query(document, tokens, fields)
+        column = connections[database].ops.quote_name(document.column)
+
+        queryset = model_class.objects.using(database).filter(
+            RawSQL(f"{column} @@ to_tsquery('simple', %s)", [query], output_field=BooleanField())
+        ).annotate(**{
+            # ts_rank takes weights in {D, C, B, A} order; negated so lower is better
+            RANK_FIELD: RawSQL(
+                f"(-ts_rank(%s::float4[], {column}, to_tsquery('simple', %s)))::float8",
+                [list(reversed(weights + [0.0] * (4 - len(weights)))), query],
+                output_field=FloatField(),
+            )
+        }).order_by(RANK_FIELD, 'pk')
+
+        return keyset_page(queryset, columns, limit, FULL_TEXT_CURSOR,
+                           rank_field=RANK_FIELD, after=after)
+
+
+class SqliteFullText:
+    """FTS5 MATCH of prefix terms, ranked by bm25 with column weights"""
+
+    vendor = 'sqlite'
+
+    def build_query(self, document, tokens, fields):
+        # {col1 col2} : "word"* "word"*  (all words, as prefixes, in those columns)
+        terms = ' '.join(f'"{token}"*' for token in tokens)
+        return f"{{{' '.join(fields)}}} : {terms}"
+
+    def page(self, model_class, database, document, tokens, fields, columns, limit, after):
+        connection = connections[database]
+        qn = connection.ops.quote_name
+        opts = model_class._meta
+        weights = get_field_weights(model_class, document)
+
+        select = ', '.join(f'o.{qn(opts.get_field(attr).column)}' for attr in columns)
+        sql = (
+            f'SELECT {select}, m.pk, m.rank FROM ('
+            f'  SELECT rowid AS pk, bm25({qn(document.fts_table)}, {", ".join(["%s"] * len(weights))}) AS rank'
+            f'  FROM {qn(document.fts_table)} WHERE {qn(document.fts_table)} MATCH %s'
+            f') m JOIN {qn(document.table)} o ON o.{qn(document.pk_column)} = m.pk'
+        )
+        params = weights + [self.build_query(document, tokens, fields)]
+        if after is not None:
+            sql += ' WHERE (m.rank > %s OR (m.rank = %s AND m.pk > %s))'
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY m.rank, m.pk LIMIT %s'
+        params.append(limit + 1)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = [
+                dict(zip(columns + ('pk', RANK_FIELD), values))
+                for values in cursor.fetchall()
+            ]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(FULL_TEXT_CURSOR, rows[-1][RANK_FIELD], rows[-1]['pk'])
+        return rows, next_cursor
+
+
+BACKENDS = {
+    backend.vendor: backend
+    for backend in (PostgresFullText(), SqliteFullText())
+}
+
+
+def get_full_text_backend(connection):
+    """Full-text backend for a connection, or None if the vendor has none"""
+    return BACKENDS.get(connection.vendor)
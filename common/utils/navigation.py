@@ -0,0 +1,260 @@
+# common/utils/navigation.py
+"""
+Navigation registry for the sidebar menus
+
+Each business module declares its menu once in <app>/navigation.py
+(discovered at startup by CommonConfig.ready). Declarations are compiled
+into a Menu of immutable namedtuples; URL names are reversed once, on
+first use, and unknown names fall back to '#'. Menus are looked up by
+business type ('common', 'laundry', 'restaurant').
+
+Badge counts come from counters: callables registered by name that take
+the tenant database alias and return an int. Results are cached per
+(database, counter) for NAVIGATION['COUNTER_TTL'] seconds, so rendering
+a menu costs one cache lookup for its badges.
+"""
+
+import threading
+from collections import namedtuple
+from functools import cached_property
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import NoReverseMatch, reverse
+import logging
+
+logger = logging.getLogger(__name__)
+
+NavItem = namedtuple('NavItem', [
+    'label',
+    'url',          # Reversed URL, or '#' when there is no page
+    'url_name',     # Declared URL name ('laundry:new_order') or '#'
+    'active',
+    'status',       # Text tag (e.g. 'Draft')
+    'counter',      # Counter name for the badge, or None
+    'count',        # Badge value, filled per request from the counter
+], defaults=('#', '#', False, None, None, None))
+
+NavSection = namedtuple('NavSection', ['id', 'label', 'icon', 'active', 'items'])
+
+DEFAULT_MENU = 'common'
+
+DEFAULT_NAVIGATION_SETTINGS = {
+    'CACHE': 'default',
+    'COUNTER_TTL': 60,
+}
+
+SECTION_KEYS = {'id', 'label', 'icon', 'active', 'items'}
+ITEM_KEYS = {'label', 'url', 'active', 'status', 'counter'}
+
+
+def reverse_or_placeholder(url_name):
+    """Reversed URL name, or '#' if it does not resolve"""
+    if not url_name or url_name == '#' or url_name.startswith('/'):
+        return url_name or '#'
+    try:
+        return reverse(url_name)
+    except NoReverseMatch:
+        logger.debug(f'Navigation: no URL named {url_name}')
+        return '#'
+
+
+class Menu:
+    """Compiled, read-only menu of one business type"""
+
+    def __init__(self, business_type, sections):
+        self.business_type = business_type
+        # Declared structure; URLs are reversed by the sections property
+        self._declared = sections
+        self.counters = tuple(
+            item.counter
+            for section in sections for item in section.items
+            if item.counter
+        )
+
+    @cached_property
+    def sections(self):
+        """Sections with every URL name reversed (once)"""
+        return tuple(
+            section._replace(items=tuple(
+                item._replace(url=reverse_or_placeholder(item.url_name))
+                for item in section.items
+            ))
+            for section in self._declared
+        )
+
+    def with_counts(self, counts):
+        """
+        Sections with the badge counts filled in
+
+        Sections without counters are shared, not copied.
+
+        Args:
+            counts: dict of counter name -> int (missing names show no badge)
+        """
+        if not self.counters:
+            return self.sections
+        return tuple(
+            section._replace(items=tuple(
+                item._replace(count=counts.get(item.counter)) if item.counter else item
+                for item in section.items
+            )) if any(item.counter for item in section.items) else section
+            for section in self.sections
+        )
+
+    def __repr__(self):
+        return f'<Menu {self.business_type}>'
+
+
+def compile_menu(business_type, sections):
+    """
+    Compile a menu declaration
+
+    Raises:
+        ImproperlyConfigured: unknown keys in a section or item
+    """
+    compiled = []
+    for section in sections:
+        unknown = set(section) - SECTION_KEYS
+        if unknown:
+            raise ImproperlyConfigured(
+                f'Menu {business_type}: section {section.get("id")}: unknown keys {sorted(unknown)}'
+            )
+        items = []
+        for item in section.get('items', ()):
+            unknown = set(item) - ITEM_KEYS
+            if unknown:
+                raise ImproperlyConfigured(
+                    f'Menu {business_type}: item {item.get("label")}: unknown keys {sorted(unknown)}'
+                )
+            items.append(NavItem(
+                label=item['label'],
+                url_name=item.get('url', '#'),
+                active=item.get('active', False),
+                status=item.get('status'),
+                counter=item.get('counter'),
+            ))
+        compiled.append(NavSection(
+            id=section['id'],
+            label=section.get('label', ''),
+            icon=section.get('icon', ''),
+            active=section.get('active', False),
+            items=tuple(items),
+        ))
+    return Menu(business_type, tuple(compiled))
+
+
+class NavigationRegistry:
+    """Declared menus (compiled once) and badge counters"""
+
+    def __init__(self, options=None):
+        self.options = {**DEFAULT_NAVIGATION_SETTINGS, **(options or {})}
+        self._declarations = {}
+        self._menus = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def register_menu(self, business_type, sections):
+        with self._lock:
+            self._declarations[business_type] = sections
+            self._menus.pop(business_type, None)
+
+    def register_counter(self, name, func):
+        self._counters[name] = func
+
+    def get_menu(self, business_type):
+        """Compiled menu of a business type, the common menu if it has none"""
+        menu = self._menus.get(business_type)
+        if menu is None:
+            if business_type not in self._declarations:
+                business_type = DEFAULT_MENU
+                menu = self._menus.get(business_type)
+                if menu is not None:
+                    return menu
+            with self._lock:
+                menu = self._menus.get(business_type)
+                if menu is None:
+                    menu = compile_menu(business_type, self._declarations[business_type])
+                    self._menus[business_type] = menu
+        return menu
+
+    def compile_all(self):
+        """Compile every declared menu (at startup, so errors surface early)"""
+        for business_type in list(self._declarations):
+            self.get_menu(business_type)
+        return len(self._menus)
+
+    def get_counts(self, menu, database):
+        """
+        Badge counts of a menu for one tenant database
+
+        Args:
+            database: Tenant database alias, or a callable returning it
+                      (only called when the menu has a registered counter)
+
+        Returns:
+            dict: counter name -> int, for the counters that are registered
+        """
+        names = [name for name in menu.counters if name in self._counters]
+        if not names:
+            return {}
+        if callable(database):
+            database = database()
+        if not database:
+            return {}
+
+        cache = caches[self.options['CACHE']]
+        keys = {name: f'navcount:{database}:{name}' for name in names}
+        cached = cache.get_many(keys.values())
+        counts = {}
+        for name in names:
+            value = cached.get(keys[name])
+            if value is None:
+                try:
+                    value = self._counters[name](database)
+                except Exception as e:
+                    logger.warning(f'Navigation counter {name} failed: {str(e)}')
+                    continue
+                cache.set(keys[name], value, self.options['COUNTER_TTL'])
+            counts[name] = value
+        return counts
+
+
+_registry = None
+
+
+def get_navigation_registry():
+    global _registry
+    if _registry is None:
+        _registry = NavigationRegistry(getattr(settings, 'NAVIGATION', None))
+    return _registry
+
+
+def register_menu(business_type, sections):
+    """Declare the menu of a business type; sections use the navbar dict layout"""
+    get_navigation_registry().register_menu(business_type, sections)
+
+
+def register_counter(name, func):
+    """Register a badge counter: func(database alias) -> int"""
+    get_navigation_registry().register_counter(name, func)
+
+
+def navbar_context(request, database=None):
+    """
+    navbar_config for the sidebar of the current business type
+
+    Args:
+        request: Django request (business type from request.erp_context)
+        database: Tenant database alias for the badge counts, or a callable
+                  returning it (e.g. get_customer_db), so menus without
+                  counters never resolve the tenant database
+    """
+    registry = get_navigation_registry()
+    # Set by RequestClassificationMiddleware
+    request_context = getattr(request, 'erp_context', None)
+    menu = registry.get_menu(request_context.business_type if request_context else DEFAULT_MENU)
+
+    counts = registry.get_counts(menu, database) if database and menu.counters else {}
+    return {'sections': menu.with_counts(counts)}
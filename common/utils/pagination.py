@@ -0,0 +1,105 @@
+# common/utils/pagination.py
+"""
+Keyset (cursor) pagination
+
+Pages are fetched with WHERE (rank, pk) > (last rank, last pk) instead of
+OFFSET, and one extra row is read to know whether another page exists, so
+every page costs the same and no COUNT(*) is needed.
+
+The cursor handed to the client is an opaque token holding the source of
+the page (database or in-memory index), the last rank and the last pk.
+"""
+
+import base64
+import json
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded"""
+
+
+def encode_cursor(source, rank, pk):
+    """
+    Encode the position after the last row of a page
+
+    Returns:
+        str: URL-safe token
+    """
+    raw = json.dumps([source, rank, pk], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(token):
+    """
+    Decode a cursor token
+
+    Returns:
+        tuple: (source, rank, pk); list ranks come back as tuples
+
+    Raises:
+        InvalidCursor: if the token is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        position = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {token}') from e
+
+    # Anything that decodes but was not written by encode_cursor (a string
+    # or object of three items would unpack too) is rejected here
+    if not isinstance(position, list) or len(position) != 3:
+        raise InvalidCursor(f'Invalid cursor: {token}')
+    source, rank, pk = position
+    if isinstance(rank, list):
+        rank = tuple(rank)
+    if (not isinstance(source, str)
+            or not is_scalar(pk) or pk is None
+            or not (is_scalar(rank) or isinstance(rank, tuple) and all(map(is_scalar, rank)))):
+        raise InvalidCursor(f'Invalid cursor: {token}')
+    return source, rank, pk
+
+
+def is_scalar(value):
+    return value is None or isinstance(value, (str, int, float))
+
+
+def keyset_filter(rank_field, rank, pk):
+    """
+    Q for rows after (rank, pk) in ORDER BY rank_field, pk
+
+    rank_field may be None to paginate on the primary key alone
+    """
+    if rank_field is None:
+        return Q(pk__gt=pk)
+    return Q(**{f'{rank_field}__gt': rank}) | Q(**{rank_field: rank, 'pk__gt': pk})
+
+
+def keyset_page(queryset, columns, limit, source, rank_field=None, after=None):
+    """
+    Fetch one page of an ordered queryset
+
+    Args:
+        queryset: QuerySet ordered by (rank_field, pk), or by pk alone
+        columns: Columns to select (passed to .values())
+        limit: Page size
+        source: Cursor source tag for this kind of page
+        rank_field: Annotation the queryset is ordered by, or None
+        after: (rank, pk) from the previous page's cursor, or None
+
+    Returns:
+        tuple: (rows, next_cursor); next_cursor is None on the last page
+    """
+    if after is not None:
+        queryset = queryset.filter(keyset_filter(rank_field, *after))
+
+    extra = ('pk',) if rank_field is None else ('pk', rank_field)
+    rows = list(queryset.values(*columns, *extra)[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(source, last[rank_field] if rank_field else None, last['pk'])
+    return rows, next_cursor
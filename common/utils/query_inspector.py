@@ -0,0 +1,227 @@
+# common/utils/query_inspector.py
+"""
+Opt-in query inspection: query counts, N+1 detection and query budgets
+
+When settings.QUERY_INSPECTOR['ENABLED'] is on, every database connection
+gets an execute wrapper (installed on connection_created, so tenant
+connections opened later are covered too). The wrapper only records while
+an inspection is active in the current context, i.e. inside
+QueryInspectorMiddleware or an inspect_queries() block.
+
+Statements are grouped by shape (literals and IN lists collapsed); a shape
+executed N_PLUS_ONE_THRESHOLD times or more in one inspection is reported
+as a likely N+1, with the project file and line that issued it.
+"""
+
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+
+# Inspection of the current request / block, None when not inspecting
+_active_inspection = ContextVar('query_inspection', default=None)
+
+SHAPE_RULES = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),            # String literals
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),         # Numbers
+    (re.compile(r'%s'), '?'),                        # Placeholders
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),  # IN lists of any length
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def sql_shape(sql):
+    """SQL with literals, placeholders and IN lists collapsed"""
+    for pattern, replacement in SHAPE_RULES:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def get_inspector_settings():
+    return getattr(settings, 'QUERY_INSPECTOR', {})
+
+
+def is_enabled():
+    return bool(get_inspector_settings().get('ENABLED', False))
+
+
+_project_root = None
+
+
+def find_caller():
+    """
+    First project frame (outside Django, site-packages and this module)
+    on the current stack
+
+    Returns:
+        str: 'path/to/file.py:123 in function', or None
+    """
+    global _project_root
+    if _project_root is None:
+        _project_root = str(settings.BASE_DIR) + os.sep
+
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(_project_root)
+                and filename != __file__
+                and 'site-packages' not in filename):
+            relative = filename[len(_project_root):]
+            return f'{relative}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+class QueryInspection:
+    """Queries recorded for one request or inspect_queries() block"""
+
+    def __init__(self, label, budget=None, threshold=None):
+        self.label = label
+        self.budget = budget
+        self.threshold = threshold or get_inspector_settings().get(
+            'N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD
+        )
+        self.count = 0
+        self.duration = 0.0
+        # (alias, shape) -> [count, first caller]
+        self.shapes = {}
+
+    def record(self, alias, sql, duration, caller):
+        self.count += 1
+        self.duration += duration
+        key = (alias, sql_shape(sql))
+        entry = self.shapes.get(key)
+        if entry is None:
+            self.shapes[key] = [1, caller]
+        else:
+            entry[0] += 1
+
+    @property
+    def repeated(self):
+        """
+        Shapes executed at least threshold times
+
+        Returns:
+            list: (alias, shape, count, caller), most repeated first
+        """
+        found = [
+            (alias, shape, count, caller)
+            for (alias, shape), (count, caller) in self.shapes.items()
+            if count >= self.threshold
+        ]
+        found.sort(key=lambda item: -item[2])
+        return found
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.count > self.budget
+
+    def report(self):
+        """Log the inspection; warnings for N+1 shapes and budget overruns"""
+        repeated = self.repeated
+        if not repeated and not self.over_budget:
+            logger.debug(f'{self.label}: {self.count} queries in {self.duration * 1000:.1f} ms')
+            return
+
+        lines = [f'{self.label}: {self.count} queries in {self.duration * 1000:.1f} ms']
+        if self.over_budget:
+            lines.append(f'  over budget ({self.budget} queries)')
+        for alias, shape, count, caller in repeated:
+            lines.append(f'  possible N+1: {count}x on {alias} from {caller or "unknown"}')
+            lines.append(f'    {shape[:300]}')
+        logger.warning('\n'.join(lines))
+
+
+def inspector_wrapper(execute, sql, params, many, context):
+    """Execute wrapper recording into the active inspection, if any"""
+    inspection = _active_inspection.get()
+    if inspection is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        inspection.record(
+            context['connection'].alias, sql, time.perf_counter() - start, find_caller()
+        )
+
+
+def install_wrapper(sender, connection, **kwargs):
+    """connection_created receiver: add the wrapper once per connection"""
+    if inspector_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(inspector_wrapper)
+
+
+def hook_connections():
+    """Install the wrapper on open connections and on every new one"""
+    connection_created.connect(install_wrapper, dispatch_uid='query_inspector')
+    for connection in connections.all(initialized_only=True):
+        install_wrapper(None, connection)
+
+
+def connect_signals():
+    """Hook database connections when the inspector is enabled"""
+    if is_enabled():
+        hook_connections()
+
+
+@contextmanager
+def inspect_queries(label='queries', budget=None, report=True):
+    """
+    Record the queries run inside the block (works with the inspector
+    disabled, e.g. from a shell or a test)
+
+    Example:
+        with inspect_queries('laundry order list', budget=10) as inspection:
+            list(orders)
+        assert not inspection.repeated
+    """
+    hook_connections()
+    inspection = QueryInspection(label, budget)
+    token = _active_inspection.set(inspection)
+    try:
+        yield inspection
+    finally:
+        _active_inspection.reset(token)
+        if report:
+            inspection.report()
+
+
+def query_budget(max_queries):
+    """
+    View decorator declaring how many queries the view may run
+
+    Checked by QueryInspectorMiddleware when the inspector is enabled;
+    no effect otherwise.
+    """
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+def start_inspection(label, budget=None):
+    """
+    Begin inspecting the current context (used by the middleware)
+
+    Returns:
+        tuple: (QueryInspection, token for finish_inspection())
+    """
+    inspection = QueryInspection(label, budget)
+    return inspection, _active_inspection.set(inspection)
+
+
+def finish_inspection(token):
+    _active_inspection.reset(token)
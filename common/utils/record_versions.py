@@ -0,0 +1,195 @@
+# common/utils/record_versions.py
+"""
+Per-row versions and conditional GET for record fetch endpoints
+
+Models with an UpdatedAt (auto_now) field carry a row version. Fetch views
+send a strong ETag derived from (database, model, pk, version, response
+shape) plus Last-Modified, and answer If-None-Match / If-Modified-Since
+with 304 Not Modified.
+
+Row versions are kept in Django's cache (RecordVersionCache) so a
+revalidation by primary key can be answered without loading the row:
+
+- post_save / post_delete (and upsert_record, which sends post_save)
+  refresh or drop the entry
+- bulk writes that send no signals call invalidate_versions()
+- entries expire after RECORD_VERSIONS['TTL'] seconds, which bounds how
+  stale a per-process cache (LocMem) can be when another worker wrote the
+  row; with a shared cache (Redis) the signals keep every worker current
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+import logging
+
+logger = logging.getLogger(__name__)
+
+VERSION_FIELD = 'UpdatedAt'
+
+DEFAULT_RECORD_VERSION_SETTINGS = {
+    'CACHE': 'default',
+    'TTL': 30,
+}
+
+# Models whose version is tracked (lazy signal senders, see connect_signals)
+VERSIONED_MODELS = ['common.Organization']
+
+
+def get_version_field(model_class):
+    """Name of the model's row version field, or None if it has none"""
+    try:
+        model_class._meta.get_field(VERSION_FIELD)
+    except Exception:
+        return None
+    return VERSION_FIELD
+
+
+def version_stamp(value):
+    """Row version (datetime) as integer microseconds since the epoch"""
+    if timezone.is_naive(value):
+        # USE_TZ = False stores local time of settings.TIME_ZONE
+        value = timezone.make_aware(value)
+    return int(value.timestamp() * 1_000_000)
+
+
+def record_etag(model_class, database, pk, stamp, variant=''):
+    """
+    Strong ETag for one version of one record
+
+    Args:
+        variant: Identifies the response shape (e.g. the field mapping),
+                 so differently shaped responses never share an ETag
+    """
+    raw = f'{database}:{model_class._meta.label}:{pk}:{stamp}:{variant}'
+    return '"' + hashlib.sha1(raw.encode('utf-8')).hexdigest()[:24] + '"'
+
+
+class RecordVersionCache:
+    """Row versions (microsecond stamps) in Django's cache framework"""
+
+    def __init__(self, options=None):
+        options = {**DEFAULT_RECORD_VERSION_SETTINGS, **(options or {})}
+        self.cache = caches[options['CACHE']]
+        self.ttl = options['TTL']
+
+    @staticmethod
+    def key(model_class, database, pk):
+        return f'recver:{database}:{model_class._meta.label_lower}:{pk}'
+
+    def get(self, model_class, database, pk):
+        return self.cache.get(self.key(model_class, database, pk))
+
+    def set(self, model_class, database, pk, stamp):
+        self.cache.set(self.key(model_class, database, pk), stamp, self.ttl)
+
+    def delete(self, model_class, database, pk):
+        self.cache.delete(self.key(model_class, database, pk))
+
+    def delete_many(self, model_class, database, pks):
+        self.cache.delete_many([self.key(model_class, database, pk) for pk in pks])
+
+
+_version_cache = None
+
+
+def get_version_cache():
+    global _version_cache
+    if _version_cache is None:
+        _version_cache = RecordVersionCache(getattr(settings, 'RECORD_VERSIONS', None))
+    return _version_cache
+
+
+def get_record_version(model_class, database, pk):
+    """
+    Current version stamp of a row, from the cache or one narrow query
+
+    Returns:
+        int or None: None if the row does not exist
+    """
+    cache = get_version_cache()
+    stamp = cache.get(model_class, database, pk)
+    if stamp is not None:
+        return stamp
+
+    field = get_version_field(model_class)
+    value = (
+        model_class.objects.using(database)
+        .filter(pk=pk)
+        .values_list(field, flat=True)
+        .first()
+    )
+    if value is None:
+        return None
+    return remember_version(model_class, database, pk, value)
+
+
+def invalidate_versions(model_class, database, pks):
+    """Forget cached versions after writes that send no signals"""
+    if get_version_field(model_class):
+        get_version_cache().delete_many(model_class, database, pks)
+
+
+def is_conditional(request):
+    """Whether the request revalidates a copy it already has"""
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+
+def remember_version(model_class, database, pk, value):
+    """
+    Cache the version of a row just read
+
+    Returns:
+        int: the version stamp
+    """
+    stamp = version_stamp(value)
+    get_version_cache().set(model_class, database, pk, stamp)
+    return stamp
+
+
+def not_modified(request, etag, stamp):
+    """
+    304 response if the client already has this version, else None
+
+    Honors If-None-Match and If-Modified-Since as Django's
+    ConditionalGetMiddleware does.
+    """
+    response = get_conditional_response(
+        request, etag=etag, last_modified=stamp // 1_000_000
+    )
+    if response is not None:
+        add_version_headers(response, etag, stamp)
+    return response
+
+
+def add_version_headers(response, etag, stamp):
+    """ETag / Last-Modified, and make browsers revalidate before reuse"""
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stamp // 1_000_000)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _on_save(sender, instance, using, update_fields=None, **kwargs):
+    value = getattr(instance, VERSION_FIELD, None)
+    if value is None or (update_fields is not None and VERSION_FIELD not in update_fields):
+        # The stored version is unknown here (e.g. an upsert that changed nothing)
+        get_version_cache().delete(sender, using, instance.pk)
+    else:
+        get_version_cache().set(sender, using, instance.pk, version_stamp(value))
+
+
+def _on_delete(sender, instance, using, **kwargs):
+    get_version_cache().delete(sender, using, instance.pk)
+
+
+def connect_signals():
+    """Keep cached versions current on save/delete"""
+    for label in VERSIONED_MODELS:
+        post_save.connect(_on_save, sender=label, dispatch_uid=f'record_versions_save_{label}')
+        post_delete.connect(_on_delete, sender=label, dispatch_uid=f'record_versions_delete_{label}')
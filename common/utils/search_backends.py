@@ -0,0 +1,109 @@
+# common/utils/search_backends.py
+"""
+Autocomplete search backends
+
+Each backend filters a queryset by a search term using a strategy its
+database can answer from an index, annotates every row with a search_rank
+(lower is better) and orders the results by (search_rank, pk).
+
+- PostgreSQL: pg_trgm GIN index on UPPER(column) (migration 0002) for
+  icontains, ranked by trigram similarity, prefix matches first
+- SQLite: prefix match on a NOCASE index (migration 0002), shortest first
+- Anything else: plain icontains, prefix matches first
+"""
+
+from django.db.models import Case, FloatField, IntegerField, Value, When
+from django.db.models.functions import Cast, Length
+import logging
+
+logger = logging.getLogger(__name__)
+
+RANK_FIELD = 'search_rank'
+
+
+class SearchBackend:
+    """Base search backend: case-insensitive contains, prefix matches first"""
+
+    vendor = None
+
+    def filter(self, queryset, field_name, search_term):
+        return queryset.filter(**{f'{field_name}__icontains': search_term})
+
+    def rank(self, field_name, search_term):
+        """Expression for the search_rank annotation (lower is better)"""
+        return Case(
+            When(**{f'{field_name}__istartswith': search_term}, then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+
+    def search(self, queryset, field_name, search_term):
+        """
+        Filter and rank a queryset
+
+        Returns:
+            QuerySet annotated with search_rank, ordered by (search_rank, pk)
+        """
+        queryset = self.filter(queryset, field_name, search_term)
+        return queryset.annotate(
+            **{RANK_FIELD: self.rank(field_name, search_term)}
+        ).order_by(RANK_FIELD, 'pk')
+
+
+class TrigramSearchBackend(SearchBackend):
+    """
+    PostgreSQL pg_trgm search
+
+    icontains (UPPER(col) LIKE UPPER('%term%')) is answered by the
+    gin_trgm_ops index on UPPER(col); rows are ranked
+    prefix matches first, then by trigram similarity to the term.
+    """
+
+    vendor = 'postgresql'
+
+    def rank(self, field_name, search_term):
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        # 0..1 for prefix matches, 1..2 for other matches; double precision
+        # so the rank round-trips exactly through pagination cursors
+        return Cast(
+            super().rank(field_name, search_term)
+            + Value(1.0)
+            - TrigramSimilarity(field_name, search_term),
+            FloatField(),
+        )
+
+
+class PrefixSearchBackend(SearchBackend):
+    """
+    SQLite prefix search
+
+    LIKE 'term%' on a column with a COLLATE NOCASE index is answered with an
+    index range scan; shorter values rank first (closest to an exact match).
+    """
+
+    vendor = 'sqlite'
+
+    def filter(self, queryset, field_name, search_term):
+        return queryset.filter(**{f'{field_name}__istartswith': search_term})
+
+    def rank(self, field_name, search_term):
+        return Length(field_name, output_field=FloatField())
+
+
+BACKENDS = {
+    backend.vendor: backend
+    for backend in (TrigramSearchBackend(), PrefixSearchBackend())
+}
+
+DEFAULT_BACKEND = SearchBackend()
+
+
+def get_search_backend(connection):
+    """
+    Get the search backend for a database connection
+
+    Args:
+        connection: Django database connection (connections[alias])
+    """
+    return BACKENDS.get(connection.vendor, DEFAULT_BACKEND)
@@ -0,0 +1,141 @@
+# common/utils/serializers.py
+"""
+Compiled serializer plans and fast JSON responses
+
+A SerializerPlan is built once per (model, field mapping): a flat tuple of
+(attribute, output key, converter) steps, with the converter chosen from
+the field type up front. Serializing a record is then one loop over the
+steps, with no _meta walking or per-value type checks.
+"""
+
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.http import HttpResponse, JsonResponse
+
+try:
+    import orjson
+except ImportError:  # Optional: falls back to Django's JsonResponse
+    orjson = None
+
+
+def identity(value):
+    return value
+
+
+def to_date_string(value):
+    """Dates and datetimes as 'YYYY-MM-DD' (isoformat is ~10x faster than strftime)"""
+    try:
+        return value.isoformat()[:10]
+    except AttributeError:
+        return str(value)
+
+
+def to_flag(value):
+    """Integer flags (e.g. DefaultDb) as booleans"""
+    return value == 1 if isinstance(value, int) else value
+
+
+STRING_FIELDS = (models.CharField, models.TextField)
+DATE_FIELDS = (models.DateField, models.DateTimeField)
+BOOLEAN_FIELDS = (models.BooleanField,)
+
+
+def converter_for(field):
+    """Pick the converter for a model field (None is handled by the plan)"""
+    if isinstance(field, DATE_FIELDS):
+        return to_date_string
+    if isinstance(field, BOOLEAN_FIELDS + STRING_FIELDS):
+        return identity
+    return str
+
+
+class SerializerPlan:
+    """
+    Flat list of (attr, key, converter) steps for one model and mapping
+
+    serialize() reads attributes from a model instance, serialize_row()
+    reads the same attributes from a .values() dict.
+    """
+
+    __slots__ = ('steps', 'attrs', '_keyed', '_get_attrs', '_get_items')
+
+    def __init__(self, steps):
+        self.steps = tuple(steps)
+        self.attrs = tuple(attr for attr, key, convert in self.steps)
+        self._keyed = tuple((key, convert) for attr, key, convert in self.steps)
+        # Fetch every value in one C-level call, always as a tuple
+        self._get_attrs = attrgetter(*self.attrs, *self.attrs[:1]) if self.attrs else None
+        self._get_items = itemgetter(*self.attrs, *self.attrs[:1]) if self.attrs else None
+
+    def serialize(self, record):
+        if self._get_attrs is None:
+            return {}
+        return self._build(self._get_attrs(record))
+
+    def serialize_row(self, row):
+        if self._get_items is None:
+            return {}
+        return self._build(self._get_items(row))
+
+    def _build(self, values):
+        return {
+            key: value if value is None or convert is identity else convert(value)
+            for (key, convert), value in zip(self._keyed, values)
+        }
+
+
+@lru_cache(maxsize=None)
+def _compile_plan(model_class, mapping_items, converter_items):
+    fields = {field.name: field for field in model_class._meta.concrete_fields}
+    converters = dict(converter_items)
+
+    if mapping_items is None:
+        mapping_items = tuple((name, name) for name in fields)
+
+    steps = []
+    for db_field, output_key in mapping_items:
+        field = fields.get(db_field)
+        if field is None:
+            continue
+        steps.append((field.attname, output_key, converters.get(db_field) or converter_for(field)))
+    return SerializerPlan(steps)
+
+
+def get_serializer_plan(model_class, field_mapping=None, converters=None):
+    """
+    Get the (cached) serializer plan for a model
+
+    Args:
+        model_class: Django model class
+        field_mapping: Optional dict of database field -> output key; fields
+                       not on the model are skipped. Defaults to every field
+                       under its own name.
+        converters: Optional dict of database field -> converter overriding
+                    the one picked from the field type
+
+    Returns:
+        SerializerPlan
+    """
+    mapping_items = tuple(field_mapping.items()) if field_mapping else None
+    converter_items = tuple(sorted(converters.items())) if converters else ()
+    return _compile_plan(model_class, mapping_items, converter_items)
+
+
+def fast_json_response(data, status=200):
+    """
+    JSON response encoded with orjson when it is installed
+
+    Falls back to JsonResponse (DjangoJSONEncoder) when orjson is missing or
+    the data holds a type orjson does not encode (e.g. Decimal).
+    """
+    if orjson is not None:
+        try:
+            content = orjson.dumps(data)
+        except TypeError:
+            pass
+        else:
+            return HttpResponse(content, status=status, content_type='application/json')
+    return JsonResponse(data, status=status, encoder=DjangoJSONEncoder)
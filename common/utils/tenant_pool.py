@@ -0,0 +1,298 @@
+# common/utils/tenant_pool.py
+"""
+Persistent connection pool for customer (tenant) databases
+
+Keeps warm Django DatabaseWrapper objects per tenant so repeat requests from
+the same tenant reuse an open PostgreSQL connection instead of paying a full
+TCP + authentication handshake on every page view.
+"""
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.db.utils import OperationalError, load_backend
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Connections are pooled per (host, port, database, user)
+TenantKey = namedtuple('TenantKey', ['host', 'port', 'name', 'user'])
+
+DEFAULT_POOL_SETTINGS = {
+    'MAX_PER_TENANT': 4,          # Open connections allowed per tenant
+    'MAX_TOTAL': 64,              # Open connections allowed across all tenants
+    'IDLE_TIMEOUT': 300,          # Seconds an idle connection is kept warm
+    'HEALTH_CHECK_INTERVAL': 30,  # Ping idle connections older than this on checkout
+    'CHECKOUT_TIMEOUT': 10,       # Seconds to wait for a free slot
+}
+
+
+class PoolExhausted(OperationalError):
+    """Raised when no tenant connection could be checked out in time"""
+
+
+def tenant_key_for(db_config):
+    """Build the pool key for a complete database configuration dict"""
+    return TenantKey(
+        db_config.get('HOST'),
+        str(db_config.get('PORT')),
+        db_config.get('NAME'),
+        db_config.get('USER'),
+    )
+
+
+class TenantConnectionPool:
+    """
+    Pool of DatabaseWrapper objects keyed by TenantKey
+
+    - Idle connections are reused most-recently-released first (warmest)
+    - Idle connections older than IDLE_TIMEOUT are closed
+    - When MAX_TOTAL is reached the least recently used idle connection
+      of any tenant is evicted to make room
+    - Connections idle longer than HEALTH_CHECK_INTERVAL are pinged
+      before being handed out
+    """
+
+    def __init__(self, max_per_tenant=4, max_total=64, idle_timeout=300,
+                 health_check_interval=30, checkout_timeout=10):
+        self.max_per_tenant = max_per_tenant
+        self.max_total = max_total
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+
+        self._cond = threading.Condition(threading.Lock())
+        # key -> list of idle wrappers (last item is the warmest)
+        self._idle = {}
+        # wrapper -> (key, released_at), oldest first (LRU order)
+        self._idle_lru = OrderedDict()
+        # key -> open connection count (idle + checked out)
+        self._open = {}
+        self._total = 0
+        # wrapper -> key for checked out connections
+        self._in_use = {}
+
+    @classmethod
+    def from_settings(cls):
+        pool_settings = dict(DEFAULT_POOL_SETTINGS)
+        pool_settings.update(getattr(settings, 'TENANT_DB_POOL', {}))
+        return cls(
+            max_per_tenant=pool_settings['MAX_PER_TENANT'],
+            max_total=pool_settings['MAX_TOTAL'],
+            idle_timeout=pool_settings['IDLE_TIMEOUT'],
+            health_check_interval=pool_settings['HEALTH_CHECK_INTERVAL'],
+            checkout_timeout=pool_settings['CHECKOUT_TIMEOUT'],
+        )
+
+    def acquire(self, db_config, alias):
+        """
+        Check out a connection for the given database configuration
+
+        Args:
+            db_config: Complete Django database settings dict
+            alias: Connection alias the wrapper will be installed under
+
+        Returns:
+            DatabaseWrapper owned by the caller until release()
+        """
+        key = tenant_key_for(db_config)
+        deadline = time.monotonic() + self.checkout_timeout
+        to_close = []
+
+        with self._cond:
+            while True:
+                to_close.extend(self._pop_expired())
+
+                wrapper, idle_since = self._pop_idle(key)
+                if wrapper is not None:
+                    break
+
+                if self._open.get(key, 0) < self.max_per_tenant:
+                    if self._total >= self.max_total:
+                        evicted = self._pop_lru_idle()
+                        if evicted is not None:
+                            to_close.append(evicted)
+                    if self._total < self.max_total:
+                        self._open[key] = self._open.get(key, 0) + 1
+                        self._total += 1
+                        break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._close_all(to_close)
+                    raise PoolExhausted(
+                        f'No tenant connection available for {key.host}/{key.name} '
+                        f'within {self.checkout_timeout}s'
+                    )
+                self._cond.wait(remaining)
+
+        self._close_all(to_close)
+
+        if wrapper is None:
+            wrapper = self._create_wrapper(db_config, alias)
+        else:
+            # Tenants sharing credentials share warm connections
+            wrapper.alias = alias
+        if idle_since is not None and self._needs_health_check(wrapper, idle_since) \
+                and not wrapper.is_usable():
+            logger.info(f"Discarding stale tenant connection to {key.host}/{key.name}")
+            # The wrapper reconnects lazily on next use
+            wrapper.close()
+
+        with self._cond:
+            self._in_use[wrapper] = key
+        return wrapper
+
+    def release(self, wrapper):
+        """Return a checked out connection to the pool"""
+        with self._cond:
+            key = self._in_use.pop(wrapper, None)
+        if key is None:
+            return
+
+        try:
+            if wrapper.in_atomic_block:
+                # Inside atomic() close() only marks the transaction for
+                # rollback; never pool a connection mid-transaction
+                logger.warning("Tenant connection released inside a transaction, discarding it")
+                self._discard(wrapper)
+            else:
+                wrapper.close_if_unusable_or_obsolete()
+        except Exception:
+            logger.warning("Error while returning tenant connection to pool", exc_info=True)
+            self._discard(wrapper)
+
+        with self._cond:
+            if wrapper.connection is None:
+                self._forget(key)
+            else:
+                self._idle.setdefault(key, []).append(wrapper)
+                self._idle_lru[wrapper] = (key, time.monotonic())
+            self._cond.notify()
+
+    def evict_idle(self):
+        """Close idle connections that outlived IDLE_TIMEOUT"""
+        with self._cond:
+            expired = self._pop_expired()
+        self._close_all(expired)
+        return len(expired)
+
+    def close_all(self):
+        """Close every idle connection (checked out ones are closed on release)"""
+        with self._cond:
+            idle = list(self._idle_lru)
+            for wrapper in idle:
+                key, _ = self._idle_lru.pop(wrapper)
+                self._forget(key)
+            self._idle.clear()
+            self._cond.notify_all()
+        self._close_all(idle)
+
+    def stats(self):
+        """Snapshot of pool usage for debugging"""
+        with self._cond:
+            return {
+                'total': self._total,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle_lru),
+                'tenants': len(self._open),
+            }
+
+    # ------------------------------------------------------------------
+    # Internal helpers (call with the lock held unless noted)
+    # ------------------------------------------------------------------
+
+    def _create_wrapper(self, db_config, alias):
+        """Create a new DatabaseWrapper (called without the lock)"""
+        try:
+            backend = load_backend(db_config['ENGINE'])
+            wrapper = backend.DatabaseWrapper(db_config, alias)
+        except Exception:
+            with self._cond:
+                self._forget(tenant_key_for(db_config))
+                self._cond.notify()
+            raise
+        # Pooled wrappers move between worker threads; the pool guarantees
+        # that only one thread holds a wrapper at a time.
+        wrapper.inc_thread_sharing()
+        return wrapper
+
+    def _pop_idle(self, key):
+        stack = self._idle.get(key)
+        if not stack:
+            return None, None
+        wrapper = stack.pop()
+        if not stack:
+            del self._idle[key]
+        _, released_at = self._idle_lru.pop(wrapper)
+        return wrapper, released_at
+
+    def _pop_lru_idle(self):
+        if not self._idle_lru:
+            return None
+        wrapper, (key, _) = self._idle_lru.popitem(last=False)
+        self._idle[key].remove(wrapper)
+        if not self._idle[key]:
+            del self._idle[key]
+        self._forget(key)
+        return wrapper
+
+    def _pop_expired(self):
+        if self.idle_timeout is None:
+            return []
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = []
+        while self._idle_lru:
+            wrapper, (key, released_at) = next(iter(self._idle_lru.items()))
+            if released_at > cutoff:
+                break
+            expired.append(self._pop_lru_idle())
+        return expired
+
+    def _forget(self, key):
+        remaining = self._open.get(key, 0) - 1
+        if remaining > 0:
+            self._open[key] = remaining
+        else:
+            self._open.pop(key, None)
+        self._total -= 1
+
+    def _needs_health_check(self, wrapper, idle_since):
+        if wrapper.connection is None or self.health_check_interval is None:
+            return False
+        return time.monotonic() - idle_since >= self.health_check_interval
+
+    @staticmethod
+    def _discard(wrapper):
+        """Close the underlying connection whatever the wrapper's state"""
+        try:
+            if wrapper.connection is not None:
+                wrapper.connection.close()
+        except Exception:
+            pass
+        wrapper.connection = None
+
+    @staticmethod
+    def _close_all(wrappers):
+        """Close wrappers outside the lock so slow networks don't block the pool"""
+        for wrapper in wrappers:
+            try:
+                wrapper.close()
+            except Exception:
+                pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_tenant_pool():
+    """Return the process-wide tenant connection pool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = TenantConnectionPool.from_settings()
+    return _pool
@@ -0,0 +1,245 @@
+# common/utils/tenant_registry.py
+"""
+In-memory registry of tenants (customers + softwares tables in MAIN database)
+
+Company names, licence expiry and customer database credentials are loaded
+once into memory and refreshed by TTL, so login and request handling do not
+have to query the customers/softwares tables every time.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connections
+from core.dbhelper import main_database_changed
+import logging
+
+logger = logging.getLogger(__name__)
+
+TenantRecord = namedtuple('TenantRecord', [
+    'custid',
+    'company_name',
+    'company_expiry',
+    'db_host',
+    'db_name',
+    'db_user',
+    'db_password',
+])
+
+DEFAULT_REGISTRY_SETTINGS = {
+    'TTL': 300,           # Seconds before the snapshot is reloaded
+    'MISS_TTL': 30,       # Seconds an unknown custid is not looked up again
+    'DATABASE': 'default',
+}
+
+
+def resolve_softwares_columns(connection):
+    """
+    Resolve the actual softwares column names for the credential fields
+
+    Column names differ between installations (DB/database, pwd/password...)
+
+    Returns:
+        dict: logical name -> actual column name
+    """
+    with connection.cursor() as cursor:
+        description = connection.introspection.get_table_description(cursor, 'softwares')
+    column_map = {column.name.lower(): column.name for column in description}
+
+    pwd_col = column_map.get('pwd', column_map.get('password', 'pwd'))
+    return {
+        'custid': column_map.get('custid', 'custid'),
+        'expiry': column_map.get('expiry', 'expiry'),
+        'host': column_map.get('host', 'host'),
+        'db': column_map.get('db', column_map.get('database', 'DB')),
+        'username': column_map.get('username', column_map.get('user', 'username')),
+        'pwd': pwd_col,
+        'dbpass': column_map.get('dbpass', pwd_col),
+    }
+
+
+def format_expiry(expiry):
+    """Convert an expiry date to a string for session storage"""
+    if not expiry:
+        return expiry
+    try:
+        return expiry.strftime('%Y-%m-%d')
+    except AttributeError:
+        return str(expiry)
+
+
+def record_from_row(custid, company_name, expiry, host, db, username, pwd, dbpass):
+    """Build a TenantRecord from a customers/softwares row"""
+    return TenantRecord(
+        custid=custid,
+        company_name=company_name,
+        company_expiry=format_expiry(expiry),
+        db_host=host,
+        db_name=db,
+        db_user=username,
+        # Use dbpass if available, otherwise pwd
+        db_password=dbpass if dbpass else pwd,
+    )
+
+
+class TenantRegistry:
+    """
+    Snapshot of all tenants keyed by custid
+
+    - Loaded on first use and reloaded once the TTL expires; while one
+      thread reloads, other threads keep serving the previous snapshot
+    - A custid missing from the snapshot (tenant added since the last
+      load) is fetched on its own and added incrementally; a custid with
+      no softwares row is remembered for miss_ttl seconds so unknown
+      tenants do not cost a MAIN database query per request
+    """
+
+    def __init__(self, ttl=300, using='default', miss_ttl=30):
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self.using = using
+        self._records = None
+        self._loaded_at = 0
+        self._misses = {}     # custid -> when it was not found
+        self._columns = None
+        self._reload_lock = threading.Lock()
+        self._columns_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        registry_settings = dict(DEFAULT_REGISTRY_SETTINGS)
+        registry_settings.update(getattr(settings, 'TENANT_REGISTRY', {}))
+        return cls(
+            ttl=registry_settings['TTL'],
+            using=registry_settings['DATABASE'],
+            miss_ttl=registry_settings['MISS_TTL'],
+        )
+
+    def get(self, custid):
+        """
+        Get the TenantRecord for a custid
+
+        Returns:
+            TenantRecord or None if the tenant has no softwares row
+        """
+        records = self._current_records()
+        record = records.get(str(custid))
+        if record is None:
+            missed_at = self._misses.get(str(custid))
+            if missed_at is not None and time.monotonic() - missed_at < self.miss_ttl:
+                return None
+            record = self._load_one(custid)
+            if record is not None:
+                self.put(record)
+            else:
+                self._misses[str(custid)] = time.monotonic()
+        return record
+
+    def put(self, record):
+        """Add or replace one tenant in the snapshot"""
+        records = dict(self._records or {})
+        records[str(record.custid)] = record
+        self._records = records
+        self._misses.pop(str(record.custid), None)
+
+    def invalidate(self, custid=None):
+        """Drop one tenant (or the whole snapshot) so it is reloaded on next use"""
+        if custid is None:
+            self._loaded_at = 0
+            self._misses = {}
+            return
+        self._misses.pop(str(custid), None)
+        records = dict(self._records or {})
+        records.pop(str(custid), None)
+        self._records = records
+
+    def refresh(self):
+        """Reload every tenant from the MAIN database"""
+        records = {}
+        for record in self._query():
+            records.setdefault(str(record.custid), record)
+        self._records = records
+        self._misses = {}
+        self._loaded_at = time.monotonic()
+        logger.info(f"Tenant registry loaded {len(records)} tenants")
+        return len(records)
+
+    def get_columns(self):
+        """softwares column map, resolved once per registry"""
+        if self._columns is None:
+            with self._columns_lock:
+                if self._columns is None:
+                    self._columns = resolve_softwares_columns(connections[self.using])
+        return self._columns
+
+    def _current_records(self):
+        if self._records is None:
+            with self._reload_lock:
+                if self._records is None:
+                    self.refresh()
+        elif time.monotonic() - self._loaded_at >= self.ttl:
+            # Only one thread reloads; the others keep the current snapshot
+            if self._reload_lock.acquire(blocking=False):
+                try:
+                    self.refresh()
+                except Exception:
+                    logger.error("Tenant registry reload failed, keeping previous snapshot",
+                                 exc_info=True)
+                    self._loaded_at = time.monotonic()
+                finally:
+                    self._reload_lock.release()
+        return self._records
+
+    def _load_one(self, custid):
+        records = self._query(custid)
+        return records[0] if records else None
+
+    def _query(self, custid=None):
+        columns = self.get_columns()
+        query = f"""
+            SELECT
+                s.{columns['custid']},
+                c.custname,
+                s.{columns['expiry']},
+                s.{columns['host']},
+                s.{columns['db']},
+                s.{columns['username']},
+                s.{columns['pwd']},
+                s.{columns['dbpass']}
+            FROM softwares s
+            LEFT JOIN customers c ON c.custid = s.{columns['custid']}
+        """
+        params = []
+        if custid is not None:
+            query += f" WHERE s.{columns['custid']} = %s"
+            params.append(custid)
+
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(query, params)
+            return [record_from_row(*row) for row in cursor.fetchall()]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_tenant_registry():
+    """Return the process-wide tenant registry"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TenantRegistry.from_settings()
+    return _registry
+
+
+def _reset_registry(sender, **kwargs):
+    """Tenants are reloaded from the MAIN database after it moved"""
+    global _registry
+    with _registry_lock:
+        _registry = None
+
+
+main_database_changed.connect(_reset_registry)
@@ -1,7 +1,10 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.http import JsonResponse
-from core.dbhelper import DatabaseHelper
+from core.dbhelper import DatabaseHelper, reconfigure_after_response
+from common.middleware.database_middleware import get_customer_db
+from common.utils.form_schema import form_context
+from common.utils.navigation import get_navigation_registry, navbar_context
 from datetime import datetime, timedelta
 
 def get_common_context():
@@ -19,55 +22,7 @@ def get_common_context():
             'account': 'AQWE#'
         },
         'navbar_config': {
-            'sections': [
-                {
-                    'id': 'pending',
-                    'label': 'Pending',
-                    'icon': '📋',
-                    'items': [
-                        {'label': 'Pending Transactions', 'url': '#', 'count': 3},
-                        {'label': 'Pending Approvals', 'url': '#', 'count': 5},
-                    ]
-                },
-                {
-                    'id': 'admin',
-                    'label': 'Admin',
-                    'icon': '⚙️',
-                    'items': [
-                        {'label': 'User Management', 'url': '#'},
-                        {'label': 'Workflow Management', 'url': '#'},
-                        {'label': 'Database Configuration', 'url': 'common:database_config'},
-                    ]
-                },
-                {
-                    'id': 'transactions',
-                    'label': 'Transactions',
-                    'icon': '💳',
-                    'items': [
-                        {'label': 'Debit and Deposit Card', 'url': '#', 'status': 'Draft'},
-                        {'label': 'All Transactions', 'url': '#'},
-                    ]
-                },
-                {
-                    'id': 'accounts',
-                    'label': 'Accounts',
-                    'icon': '🏦',
-                    'items': [
-                        {'label': 'Account Summary', 'url': '#'},
-                        {'label': 'View All Accounts', 'url': '#'},
-                    ]
-                },
-                {
-                    'id': 'settings',
-                    'label': 'Settings',
-                    'icon': '🔧',
-                    'items': [
-                        {'label': 'Company Information', 'url': 'common:company_form'},
-                        {'label': 'Customer Management', 'url': 'common:customer'},
-                        {'label': 'System Settings', 'url': '#'},
-                    ]
-                },
-            ]
+            'sections': get_navigation_registry().get_menu('common').sections
         }
     }
 
@@ -113,105 +68,8 @@ def home(request):
         'expiry_date': formatted_expiry,
     }
     
-    # Navbar configuration based on software_id
-    software_id = request.session.get('software_id')
-    
-    if software_id == 4:
-        # Laundry menu
-        navbar_config = {
-            'sections': [
-                {
-                    'id': 'orders',
-                    'label': 'Orders',
-                    'icon': '📋',
-                    'active': True,
-                    'items': [
-                        {'label': 'New Order', 'url': 'laundry:new_order', 'active': False},
-                        {'label': 'Pending Orders', 'url': 'laundry:pending_orders', 'count': 5},
-                        {'label': 'Completed Orders', 'url': 'laundry:completed_orders'},
-                    ]
-                },
-                {
-                    'id': 'customers',
-                    'label': 'Customers',
-                    'icon': '👥',
-                    'items': [
-                        {'label': 'All Customers', 'url': 'laundry:customers'},
-                        {'label': 'Add Customer', 'url': 'laundry:add_customer'},
-                    ]
-                },
-                {
-                    'id': 'services',
-                    'label': 'Services',
-                    'icon': '🧺',
-                    'items': [
-                        {'label': 'Service List', 'url': 'laundry:services'},
-                        {'label': 'Pricing', 'url': 'laundry:pricing'},
-                    ]
-                },
-            ]
-        }
-    elif software_id == 5:
-        # Restaurant menu
-        navbar_config = {
-            'sections': [
-                {
-                    'id': 'orders',
-                    'label': 'Orders',
-                    'icon': '🍽️',
-                    'active': True,
-                    'items': [
-                        {'label': 'New Order', 'url': 'restaurant:new_order', 'active': False},
-                        {'label': 'Pending Orders', 'url': 'restaurant:pending_orders', 'count': 3},
-                        {'label': 'Completed Orders', 'url': 'restaurant:completed_orders'},
-                    ]
-                },
-                {
-                    'id': 'menu',
-                    'label': 'Menu',
-                    'icon': '📖',
-                    'items': [
-                        {'label': 'All Items', 'url': 'restaurant:menu_items'},
-                        {'label': 'Add Item', 'url': 'restaurant:add_item'},
-                        {'label': 'Categories', 'url': 'restaurant:categories'},
-                    ]
-                },
-                {
-                    'id': 'tables',
-                    'label': 'Tables',
-                    'icon': '🪑',
-                    'items': [
-                        {'label': 'All Tables', 'url': 'restaurant:tables'},
-                        {'label': 'Reservations', 'url': 'restaurant:reservations'},
-                    ]
-                },
-            ]
-        }
-    else:
-        # Default/common menu
-        navbar_config = {
-            'sections': [
-                {
-                    'id': 'masters',
-                    'label': 'Masters',
-                    'icon': '📊',
-                    'active': True,
-                    'items': [
-                        {'label': 'Company Info', 'url': 'common:company_form', 'active': False},
-                        {'label': 'Customers', 'url': 'common:customer'},
-                    ]
-                },
-                {
-                    'id': 'settings',
-                    'label': 'Settings',
-                    'icon': '⚙️',
-                    'items': [
-                        {'label': 'Database Config', 'url': 'common:database_config'},
-                        {'label': 'Logout', 'url': 'common:logout'},
-                    ]
-                },
-            ]
-        }
+    # Sidebar menu of the company's business type (common/utils/navigation.py)
+    navbar_config = navbar_context(request, database=get_customer_db)
     
     context = {
         'page_title': 'Dashboard',
@@ -233,120 +91,13 @@ def database_config(request):
     
     db_configured = DatabaseHelper.is_configured()
     
-    # Default config
-    db_config = {
-        'HOST': '',
-        'PORT': '5432',
-        'NAME': '',
-        'USER': '',
-        'PASSWORD': ''
-    }
-    
-    if db_configured:
-        loaded_config = DatabaseHelper.load_credentials()
-        if loaded_config:
-            db_config.update(loaded_config)
-            db_config['PASSWORD'] = '********'
-    
-    # Configure the form using universal form system
-    db_form_config = {
-        'form_id': 'database-config-form',
-        'title': 'PostgreSQL Database Connection',
-        'icon': '🗄️',
-        'action': '/settings/save-database/',
-        'footer_status': 'Ready',
-        'background': 'soft-pink',
-        
-        # Buttons configuration
-        'buttons': [
-            {
-                'label': 'Test Connection',
-                'icon': '🔌',
-                'type': 'primary',
-                'onclick': "testConnection()"
-            },
-            {
-                'label': 'Save',
-                'icon': '💾',
-                'type': 'success',
-                'onclick': "saveDatabase()"
-            },
-        ],
-        
-        # Menu items (optional)
-        'menu_items': [],
-        
-        # No groups - all fields in main area
-        'groups': [],
-        
-        # Fields configuration
-        'fields': [
-            {
-                'name': 'db_host',
-                'label': 'Database Host',
-                'type': 'text',
-                'required': True,
-                'width': '50%',
-                'placeholder': 'e.g., localhost or 192.168.1.100',
-                'group': None
-            },
-            {
-                'name': 'db_port',
-                'label': 'Port',
-                'type': 'number',
-                'required': True,
-                'width': '50%',
-                'placeholder': '5432',
-                'group': None
-            },
-            {
-                'name': 'db_name',
-                'label': 'Database Name',
-                'type': 'text',
-                'required': True,
-                'width': '100%',
-                'placeholder': 'Enter database name',
-                'group': None
-            },
-            {
-                'name': 'db_user',
-                'label': 'Username',
-                'type': 'text',
-                'required': True,
-                'width': '50%',
-                'placeholder': 'postgres',
-                'group': None
-            },
-            {
-                'name': 'db_password',
-                'label': 'Password',
-                'type': 'password',
-                'required': True,
-                'width': '50%',
-                'placeholder': 'Enter password',
-                'group': None
-            },
-        ]
-    }
-    
-    # Add default values if config exists
-    if db_configured:
-        for field in db_form_config['fields']:
-            field_name = field['name'].replace('db_', '').upper()
-            if field_name in db_config:
-                # We don't have a 'value' key in the template, so we'll use placeholder
-                # or you can modify the template to support initial values
-                pass
-    
-    context = {
-        'db_form_config': db_form_config,
-        'db_configured': db_configured,
-        'page_title': 'Database Configuration',
-    }
+    context = form_context(
+        request, 'database_config', context_name='db_form_config',
+        db_configured=db_configured,
+        page_title='Database Configuration',
+    )
     
-    print(f"Context keys: {context.keys()}")
-    print(f"Form config keys: {db_form_config.keys()}")
-    print(f"Number of fields: {len(db_form_config['fields'])}")
+    print(f"Number of fields: {len(context['db_form_config'].fields)}")
     print(f"Template: common/database_config.html")
     print("=" * 60)
     
@@ -371,9 +122,11 @@ def save_database_config(request):
         success, message = DatabaseHelper.test_connection(db_config)
         
         if success:
-            # Save credentials
+            # Save credentials and switch to them without a restart, once
+            # this response (and its session) has been saved
             DatabaseHelper.save_credentials(db_config)
-            messages.success(request, 'Database configuration saved! Please restart the server.')
+            reconfigure_after_response()
+            messages.success(request, 'Database configuration saved and applied.')
             return redirect('common:home')
         else:
             messages.error(request, f'Connection failed: {message}')
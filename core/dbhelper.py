@@ -1,24 +1,73 @@
+# core/dbhelper.py
+"""
+MAIN database configuration (db_config.ini) and live reconfiguration
+
+db_config.ini is parsed once and cached; the cache is keyed by the file's
+mtime and size, so edits are picked up without re-parsing on every call.
+
+reconfigure_main_database() swaps settings.DATABASES['default'] under a
+lock and bumps a generation counter. Every thread compares its generation
+on request_started and replaces a connection opened with the old settings,
+so a database move takes effect at the next request of each thread, with
+no restart. Other worker processes notice the changed file on their own
+(checked at most every DB_CONFIG['CHECK_INTERVAL'] seconds).
+"""
+
 import os
 import configparser
+import tempfile
+import threading
+import time
 import psycopg2
 from pathlib import Path
 
+from asgiref.local import Local
+from django.dispatch import Signal
+import logging
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Sent with settings_dict=<new DATABASES['default']> after a reconfiguration
+main_database_changed = Signal()
+
+DEFAULT_CHECK_INTERVAL = 5
+
+
+def _file_signature(path):
+    """(mtime, size) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
 class DatabaseHelper:
     """Helper class for database configuration management"""
     
     CONFIG_FILE = 'db_config.ini'
     
+    # (file signature, credentials) of the last parse
+    _cache = None
+    _cache_lock = threading.Lock()
+    
     @staticmethod
     def get_config_path():
         """Get the full path to config file"""
-        base_dir = Path(__file__).resolve().parent.parent
-        return os.path.join(base_dir, DatabaseHelper.CONFIG_FILE)
+        return os.path.join(BASE_DIR, DatabaseHelper.CONFIG_FILE)
     
     @staticmethod
     def is_configured():
         """Check if database is configured"""
-        config_path = DatabaseHelper.get_config_path()
-        return os.path.exists(config_path)
+        return _file_signature(DatabaseHelper.get_config_path()) is not None
+    
+    @staticmethod
+    def invalidate_cache():
+        """Forget the parsed config file (re-read on next use)"""
+        with DatabaseHelper._cache_lock:
+            DatabaseHelper._cache = None
     
     @staticmethod
     def save_credentials(db_config):
@@ -46,23 +95,46 @@ class DatabaseHelper:
             'PORT': str(db_config.get('port', '5432'))
         }
         
+        # Write a temporary file and rename it, so readers never see a
+        # half-written config
         config_path = DatabaseHelper.get_config_path()
-        with open(config_path, 'w') as configfile:
-            config.write(configfile)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(config_path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as configfile:
+                config.write(configfile)
+            os.replace(temp_path, config_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        DatabaseHelper.invalidate_cache()
     
     @staticmethod
     def load_credentials():
         """
         Load database credentials from config file
         
+        The file is parsed again only when its mtime or size changed.
+        
         Returns:
             dict: Database configuration or None if not found
         """
         config_path = DatabaseHelper.get_config_path()
-        
-        if not os.path.exists(config_path):
+        signature = _file_signature(config_path)
+        if signature is None:
             return None
         
+        cached = DatabaseHelper._cache
+        if cached is None or cached[0] != signature:
+            with DatabaseHelper._cache_lock:
+                cached = DatabaseHelper._cache
+                if cached is None or cached[0] != signature:
+                    cached = (signature, DatabaseHelper._parse(config_path))
+                    DatabaseHelper._cache = cached
+        
+        return dict(cached[1]) if cached[1] is not None else None
+    
+    @staticmethod
+    def _parse(config_path):
         config = configparser.ConfigParser()
         config.read(config_path)
         
@@ -130,39 +202,199 @@ class DatabaseHelper:
             return False, f'Unexpected error: {str(e)}'
     
     @staticmethod
-    def get_database_config():
+    def get_main_database_settings():
         """
-        Get database configuration for Django settings
+        DATABASES['default'] for the MAIN database
+        
+        Credentials come from db_config.ini when it exists, else from the
+        .env file; without either, the SQLite fallback (main.db) is used.
         
         Returns:
-            dict: Database configuration for Django DATABASES setting
+            dict: Django database settings
         """
+        from core.env_config import get_env_config
+        env = get_env_config()
         credentials = DatabaseHelper.load_credentials()
         
+        if credentials is None and env.has_main_database:
+            credentials = {
+                'NAME': env.db_name,
+                'USER': env.db_user,
+                'PASSWORD': env.db_password,
+                'HOST': env.db_host,
+                'PORT': env.db_port,
+            }
+        
         if not credentials:
             return {
-                'default': {
-                    'ENGINE': 'django.db.backends.sqlite3',
-                    'NAME': 'db.sqlite3',
-                }
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': BASE_DIR / 'main.db',
             }
         
         return {
-            'default': {
-                'ENGINE': 'django.db.backends.postgresql',
-                'NAME': credentials['NAME'],
-                'USER': credentials['USER'],
-                'PASSWORD': credentials['PASSWORD'],
-                'HOST': credentials['HOST'],
-                'PORT': credentials['PORT'],
-            }
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': credentials['NAME'],
+            'USER': credentials['USER'],
+            'PASSWORD': credentials['PASSWORD'],
+            'HOST': credentials['HOST'],
+            'PORT': credentials['PORT'],
+            # Keep MAIN database connections open between requests;
+            # sessions and logins reuse them instead of reconnecting
+            'CONN_MAX_AGE': env.get_int('DB_CONN_MAX_AGE', 300),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': 10,
+            },
         }
     
+    @staticmethod
+    def get_database_config():
+        """
+        Get database configuration for Django settings
+        
+        Returns:
+            dict: Database configuration for Django DATABASES setting
+        """
+        return {'default': DatabaseHelper.get_main_database_settings()}
+    
     @staticmethod
     def delete_credentials():
         """Delete database configuration file"""
         config_path = DatabaseHelper.get_config_path()
         if os.path.exists(config_path):
             os.remove(config_path)
+            DatabaseHelper.invalidate_cache()
             return True
-        return False
\ No newline at end of file
+        return False
+
+
+# Bumped by every reconfiguration; each thread remembers the generation
+# its MAIN database connection was checked against
+_generation = 0
+_thread_state = Local()
+_reconfigure_lock = threading.Lock()
+
+# Config file signature the current settings were built from, and when
+# the file was last checked
+_applied_signature = _file_signature(DatabaseHelper.get_config_path())
+_last_check = time.monotonic()
+
+# Set by reconfigure_after_response(), applied on request_finished
+_reconfigure_pending = False
+
+
+def config_generation():
+    return _generation
+
+
+def reconfigure_main_database():
+    """
+    Point the MAIN database at the current configuration, without a restart
+    
+    settings.DATABASES['default'] is replaced under a lock; connections
+    opened with the old settings are replaced at the next request of each
+    thread (see refresh_main_connection), the current thread's right away.
+    
+    Returns:
+        int: the new configuration generation
+    """
+    global _generation, _applied_signature
+    from django.db import connections
+    
+    signature = _file_signature(DatabaseHelper.get_config_path())
+    new_settings = connections.configure_settings(
+        {'default': DatabaseHelper.get_main_database_settings()}
+    )['default']
+    
+    with _reconfigure_lock:
+        # connections.settings is settings.DATABASES
+        connections.settings['default'] = new_settings
+        _applied_signature = signature
+        _generation += 1
+        generation = _generation
+    
+    logger.info(
+        f"MAIN database reconfigured (generation {generation}): "
+        f"{new_settings.get('HOST') or new_settings['ENGINE']}/{new_settings['NAME']}"
+    )
+    main_database_changed.send(sender=DatabaseHelper, settings_dict=new_settings)
+    refresh_main_connection()
+    return generation
+
+
+def reconfigure_after_response():
+    """
+    Apply the saved configuration once the current response is finished
+    
+    For views that save db_config.ini: reconfiguring mid-request would
+    replace this thread's MAIN connection before SessionMiddleware saves
+    the session, to a database that does not have it (SessionInterrupted).
+    """
+    global _reconfigure_pending
+    _reconfigure_pending = True
+
+
+def apply_pending_reconfiguration(**kwargs):
+    """request_finished receiver for reconfigure_after_response()"""
+    global _reconfigure_pending
+    if _reconfigure_pending:
+        _reconfigure_pending = False
+        reconfigure_main_database()
+
+
+def refresh_main_connection(**kwargs):
+    """
+    request_started receiver: replace this thread's MAIN database
+    connection if it was opened before the last reconfiguration
+    """
+    check_config_file()
+    
+    generation = _generation
+    if getattr(_thread_state, 'generation', 0) == generation:
+        return
+    
+    from django.db import connections
+    for connection in connections.all(initialized_only=True):
+        if (connection.alias == 'default'
+                and connection.settings_dict is not connections.settings['default']):
+            if connection.in_atomic_block:
+                # Never pull a connection out from under a transaction;
+                # retried at the next request
+                return
+            connection.close()
+            del connections['default']
+    _thread_state.generation = generation
+
+
+def check_config_file():
+    """
+    Reconfigure if db_config.ini changed on disk (e.g. saved by another
+    worker process), or .env changed while there is no db_config.ini; the
+    files are checked at most every CHECK_INTERVAL seconds
+    """
+    global _last_check
+    from django.conf import settings
+    from core.env_config import refresh_env_config_if_changed
+    
+    interval = getattr(settings, 'DB_CONFIG', {}).get('CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL)
+    now = time.monotonic()
+    if interval is None or now - _last_check < interval:
+        return
+    _last_check = now
+    
+    # Receivers of env_config_changed drop what they derived from .env
+    env_changed = refresh_env_config_if_changed()
+    signature = _file_signature(DatabaseHelper.get_config_path())
+    # .env credentials only apply while there is no db_config.ini
+    if signature != _applied_signature or (env_changed and signature is None):
+        reconfigure_main_database()
+
+
+def connect_signals():
+    """
+    Check the MAIN database configuration at the start of each request and
+    apply deferred reconfigurations once a response is finished
+    """
+    from django.core.signals import request_finished, request_started
+    request_started.connect(refresh_main_connection, dispatch_uid='refresh_main_connection')
+    request_finished.connect(apply_pending_reconfiguration, dispatch_uid='apply_pending_reconfiguration')
\ No newline at end of file
@@ -0,0 +1,130 @@
+# core/env_config.py
+"""
+Process-level environment configuration
+
+The .env file is read once when the process starts and exposed as an
+immutable EnvConfig shared by settings, middleware and authentication, so
+the request path never touches the filesystem for configuration.
+
+Call reload_env_config() to pick up edits; receivers of env_config_changed
+are told about the new configuration. Each worker also calls
+refresh_env_config_if_changed() at the start of a request, at most every
+DB_CONFIG['CHECK_INTERVAL'] seconds (core.dbhelper.check_config_file).
+"""
+
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+
+from django.dispatch import Signal
+from dotenv import dotenv_values
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+ENV_FILE = BASE_DIR / '.env'
+
+# Sent with config=<EnvConfig> after the configuration was reloaded
+env_config_changed = Signal()
+
+
+@dataclass(frozen=True)
+class EnvConfig:
+    """Immutable snapshot of the environment and .env file"""
+
+    # MAIN database credentials
+    db_host: str = ''
+    db_port: str = '5432'
+    db_name: str = ''
+    db_user: str = ''
+    db_password: str = ''
+
+    # Every variable, for settings that are not modelled above
+    values: MappingProxyType = field(default_factory=lambda: MappingProxyType({}), repr=False)
+
+    # Modification time of the .env file this snapshot was read from
+    source_mtime: float = None
+
+    def get(self, key, default=None):
+        """Get any variable by name, like os.getenv()"""
+        return self.values.get(key, default)
+
+    def get_int(self, key, default):
+        try:
+            return int(self.values.get(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    @property
+    def has_main_database(self):
+        return bool(self.db_host and self.db_name and self.db_user)
+
+
+def _file_mtime(env_file):
+    try:
+        return os.stat(env_file).st_mtime
+    except OSError:
+        return None
+
+
+def load_env_config(env_file=None):
+    """
+    Read the .env file (ENV_FILE by default) and process environment into
+    a new EnvConfig
+
+    Variables already set in the process environment win over the file,
+    matching load_dotenv() without override.
+    """
+    env_file = env_file or ENV_FILE
+    mtime = _file_mtime(env_file)
+    file_values = dotenv_values(env_file) if mtime is not None else {}
+
+    values = {key: value for key, value in file_values.items() if value is not None}
+    values.update(os.environ)
+
+    return EnvConfig(
+        db_host=values.get('DB_HOST', ''),
+        db_port=values.get('PORT', '5432'),
+        db_name=values.get('DB_NAME', ''),
+        db_user=values.get('DB_USER', ''),
+        db_password=values.get('DB_PASSWORD', ''),
+        values=MappingProxyType(values),
+        source_mtime=mtime,
+    )
+
+
+_config = None
+_config_lock = threading.Lock()
+
+
+def get_env_config():
+    """Return the cached process-wide EnvConfig (loaded on first use)"""
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                _config = load_env_config()
+    return _config
+
+
+def reload_env_config():
+    """Re-read the .env file, swap in the new config and notify receivers"""
+    global _config
+    with _config_lock:
+        _config = load_env_config()
+    env_config_changed.send(sender=EnvConfig, config=_config)
+    return _config
+
+
+def refresh_env_config_if_changed():
+    """
+    Reload the configuration only if the .env file changed on disk
+
+    Returns:
+        bool: True if the configuration was reloaded
+    """
+    current = get_env_config()
+    if _file_mtime(ENV_FILE) == current.source_mtime:
+        return False
+    reload_env_config()
+    return True
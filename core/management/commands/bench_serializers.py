@@ -0,0 +1,97 @@
+"""
+Micro-benchmark for the compiled serializer plans
+
+    python manage.py bench_serializers --records 5000 --repeat 5
+
+Serializes in-memory Organization instances (no database access) with the
+old per-field reflection and with the compiled plan, then encodes the
+result with stdlib json and with the fast JSON path.
+"""
+
+import json
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from common.models.company_information import Organization
+from common.utils.serializers import fast_json_response, get_serializer_plan, to_flag
+from common.views.company_info import COMPANY_FIELD_MAPPING
+
+
+def reflect_record(record, field_mapping):
+    """The previous approach: walk _meta.fields and type-check every value"""
+    data = {}
+    for field in record._meta.fields:
+        value = getattr(record, field.name)
+        if value is None:
+            data[field.name] = None
+        elif hasattr(value, 'strftime'):
+            data[field.name] = value.strftime('%Y-%m-%d')
+        elif isinstance(value, bool):
+            data[field.name] = value
+        else:
+            data[field.name] = str(value)
+
+    mapped = {}
+    for db_field, frontend_field in field_mapping.items():
+        if db_field in data:
+            mapped[frontend_field] = data[db_field]
+    return mapped
+
+
+class Command(BaseCommand):
+    help = 'Measure per-record serialization and JSON encoding cost'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        records = [
+            Organization(
+                CompanyId=i,
+                CompanyName=f'Company {i}',
+                ArabicName=f'شركة {i}',
+                Address1='Street 1',
+                City='Doha',
+                Email=f'company{i}@example.com',
+                Phone='+974 4000 0000',
+                PeriodFrom=date(2024, 1, 1),
+                PeriodTo=date(2024, 12, 31),
+                DefaultDb=1,
+                BusinessType=1,
+            )
+            for i in range(options['records'])
+        ]
+        plan = get_serializer_plan(
+            Organization, COMPANY_FIELD_MAPPING, converters={'DefaultDb': to_flag}
+        )
+
+        reflected = self.measure('reflection', options, lambda: [
+            reflect_record(record, COMPANY_FIELD_MAPPING) for record in records
+        ])
+        compiled = self.measure('compiled plan', options, lambda: [
+            plan.serialize(record) for record in records
+        ])
+
+        payload = {'success': True, 'results': compiled}
+        self.measure('json (stdlib)', options, lambda: json.dumps(payload, cls=DjangoJSONEncoder))
+        self.measure('fast_json_response', options, lambda: fast_json_response(payload))
+
+        if reflected != [dict(row, default_db=str(1)) for row in compiled]:
+            self.stdout.write(self.style.WARNING('Outputs differ beyond the DefaultDb flag'))
+
+    def measure(self, label, options, func):
+        best = None
+        result = None
+        for _ in range(options['repeat']):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        per_record = best / options['records'] * 1e6
+        self.stdout.write(f'{label:<20} {per_record:8.2f} µs/record  (best of {options["repeat"]})')
+        return result
@@ -0,0 +1,45 @@
+"""
+Build the CSS bundles of ASSETS['BUNDLES']
+
+    python manage.py build_assets
+    python manage.py collectstatic --noinput
+
+Writes <name>.<hash>.css plus .gz/.br siblings and
+manifest.json to ASSETS['OUTPUT_DIR'] (see common.utils.assets).
+"""
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from common.utils.assets import brotli, build_bundles, get_asset_settings
+
+
+class Command(BaseCommand):
+    help = 'Bundle, fingerprint and precompress the CSS bundles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-old', action='store_true',
+            help='Keep bundles of previous builds (e.g. while old pages are still cached)',
+        )
+
+    def handle(self, *args, **options):
+        settings = get_asset_settings()
+        try:
+            manifest = build_bundles(settings, clean=not options['keep_old'])
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+
+        output_dir = settings['OUTPUT_DIR']
+        for key, path in sorted(manifest.items()):
+            filename = os.path.join(output_dir, os.path.basename(path))
+            sizes = [f'{os.path.getsize(filename):>7} B']
+            for suffix in ('.gz', '.br'):
+                if os.path.exists(filename + suffix):
+                    sizes.append(f'{suffix} {os.path.getsize(filename + suffix):>6} B')
+            self.stdout.write(f'{key:<16} {os.path.basename(path):<40} {"  ".join(sizes)}')
+
+        if brotli is None:
+            self.stdout.write(self.style.WARNING('brotli is not installed: only .gz files were written'))
+        self.stdout.write(self.style.SUCCESS(f'{len(manifest)} bundles written to {output_dir}'))
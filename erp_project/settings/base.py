@@ -34,17 +34,38 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'common.middleware.query_inspector.QueryInspectorMiddleware',  # No-op unless QUERY_INSPECTOR is on
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',  # Static files, incl. precompressed bundles
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'common.middleware.request_context.RequestClassificationMiddleware',
     'common.middleware.auth.AuthenticationMiddleware',
     'common.middleware.database_middleware.DynamicDatabaseMiddleware',
 ]
 
+# Request classification (common.middleware.request_context)
+# URLs that don't require authentication
+PUBLIC_PATH_PREFIXES = [
+    '/login/',
+    '/admin/',
+    '/static/',
+    '/media/',
+]
+
+# Paths that use the default customer database (no session required)
+NO_SESSION_PATH_PREFIXES = [
+    '/login/',
+    '/static/',
+    '/media/',
+    '/favicon.ico',
+    '/admin/',
+]
+
 ROOT_URLCONF = 'erp_project.urls'
 LOGIN_URL = '/login/'
 
@@ -92,45 +113,23 @@ Database Strategy:
    - Dynamically configured per user from softwares table
 """
 
+from core.dbhelper import DatabaseHelper
+from core.env_config import get_env_config
+
+# Environment (.env) is read once per process and shared with the
+# middleware and authentication code
+ENV = get_env_config()
+
 try:
-    from dotenv import load_dotenv
-    
-    # Load environment variables from .env file
-    env_path = BASE_DIR / '.env'
-    load_dotenv(env_path)
-    
-    # Get MAIN database credentials from .env
-    db_host = os.getenv('DB_HOST', '')
-    db_port = os.getenv('PORT', '5432')
-    db_name = os.getenv('DB_NAME', '')
-    db_user = os.getenv('DB_USER', '')
-    db_password = os.getenv('DB_PASSWORD', '')
-    
-    # Configure MAIN database
-    if db_host and db_name and db_user:
-        # PostgreSQL MAIN database
-        DATABASES = {
-            'default': {
-                'ENGINE': 'django.db.backends.postgresql',
-                'NAME': db_name,
-                'USER': db_user,
-                'PASSWORD': db_password,
-                'HOST': db_host,
-                'PORT': db_port,
-                'OPTIONS': {
-                    'connect_timeout': 10,
-                },
-            }
-        }
-        print(f"✓ Configured MAIN database: {db_host}/{db_name}")
+    # MAIN database: db_config.ini (saved from the Database Configuration
+    # page) wins over the .env credentials; SQLite if neither is set.
+    # Saving a new configuration applies it live (core.dbhelper).
+    DATABASES = {
+        'default': DatabaseHelper.get_main_database_settings()
+    }
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+        print(f"✓ Configured MAIN database: {DATABASES['default']['HOST']}/{DATABASES['default']['NAME']}")
     else:
-        # Fallback to SQLite if credentials not configured
-        DATABASES = {
-            'default': {
-                'ENGINE': 'django.db.backends.sqlite3',
-                'NAME': BASE_DIR / 'main.db',
-            }
-        }
         print("⚠ Using SQLite fallback for MAIN database")
         
 except Exception as e:
@@ -145,7 +144,8 @@ except Exception as e:
     print("⚠ Using SQLite fallback")
 
 # CUSTOMER DATABASE - Customer-specific data
-# This will be dynamically configured by the middleware based on session data
+# Fallback alias used when no tenant is logged in. Logged-in tenants get their
+# own alias ('tenant_<custid>') registered at runtime by the middleware.
 # Customer database credentials come from the 'softwares' table in MAIN database
 DATABASES['customer_db'] = {
     'ENGINE': 'django.db.backends.postgresql',
@@ -162,11 +162,139 @@ DATABASES['customer_db'] = {
     },
 }
 
+# CUSTOMER DATABASE CONNECTION POOL
+# Warm connections are kept per tenant (host, port, database, user) and
+# reused across requests instead of reconnecting on every page view
+TENANT_DB_POOL = {
+    'MAX_PER_TENANT': ENV.get_int('TENANT_DB_POOL_PER_TENANT', 4),
+    'MAX_TOTAL': ENV.get_int('TENANT_DB_POOL_MAX_TOTAL', 64),
+    'IDLE_TIMEOUT': 300,          # Close connections idle for 5 minutes
+    'HEALTH_CHECK_INTERVAL': 30,  # Ping connections idle longer than this
+    'CHECKOUT_TIMEOUT': 10,
+}
+
+# TENANT REGISTRY
+# customers/softwares rows (company name, expiry, customer database
+# credentials) are cached in memory and reloaded after TTL seconds; unknown
+# custids are not looked up again for MISS_TTL seconds
+TENANT_REGISTRY = {
+    'TTL': ENV.get_int('TENANT_REGISTRY_TTL', 300),
+    'MISS_TTL': ENV.get_int('TENANT_REGISTRY_MISS_TTL', 30),
+    'DATABASE': 'default',
+}
+
+# MAIN DATABASE RECONFIGURATION
+# Every worker process re-reads db_config.ini (and .env) at most every
+# CHECK_INTERVAL seconds and switches the MAIN database live when it changed
+DB_CONFIG = {
+    'CHECK_INTERVAL': ENV.get_int('DB_CONFIG_CHECK_INTERVAL', 5),
+}
+
 # ============================================================================
 # DATABASE ROUTER
 # ============================================================================
 DATABASE_ROUTERS = ['common.db_router.CustomerDatabaseRouter']
 
+# Opt-in routing trace written to the 'common.db_router.trace' logger,
+# for a random sample of requests or requests sending the header
+DB_ROUTER_TRACE = {
+    'SAMPLE_RATE': float(ENV.get('DB_ROUTER_TRACE_SAMPLE_RATE', '0')),  # e.g. 0.01 for 1%
+    'HEADER': 'HTTP_X_ROUTER_TRACE',
+}
+
+# ============================================================================
+# FORM SCHEMAS
+# ============================================================================
+# Universal form schemas (common/forms/schemas.py). Rendered form markup is
+# cached per (form, schema version, business type, language); bump VERSION
+# when universal_form.html changes to drop the cached fragments.
+FORM_SCHEMAS = {
+    'VERSION': 1,
+    'FRAGMENT_CACHE_TIMEOUT': 3600,
+}
+
+# ============================================================================
+# QUERY INSPECTOR
+# ============================================================================
+# Opt-in query counting per request (common.utils.query_inspector): logs
+# SQL shapes repeated N_PLUS_ONE_THRESHOLD+ times with the calling file and
+# line, and views exceeding their @query_budget (or DEFAULT_BUDGET)
+QUERY_INSPECTOR = {
+    'ENABLED': ENV.get('QUERY_INSPECTOR', 'off') == 'on',
+    'N_PLUS_ONE_THRESHOLD': ENV.get_int('QUERY_INSPECTOR_N_PLUS_ONE', 5),
+    'DEFAULT_BUDGET': None,
+    'HEADER': True,  # X-Query-Count response header
+}
+
+# ============================================================================
+# SESSIONS
+# ============================================================================
+# SESSION_MODE=db keeps sessions in the MAIN database (django_session).
+# SESSION_MODE=tenant_cache keeps them in a per-worker LRU, shared between
+# workers through Redis at SESSION_REDIS_URL, which is then required
+# ('memory://' gives a single-process stand-in for development and tests).
+# Workers trust their local copy for SESSION_LOCAL_TTL seconds, so a logout
+# reaches the other workers within that time.
+if ENV.get('SESSION_MODE', 'db') == 'tenant_cache':
+    SESSION_ENGINE = 'common.sessions'
+
+SESSION_CACHE = {
+    'LOCAL_MAX_ENTRIES': ENV.get_int('SESSION_LOCAL_MAX_ENTRIES', 10000),
+    'LOCAL_TTL': ENV.get_int('SESSION_LOCAL_TTL', 30),
+    'REDIS_URL': ENV.get('SESSION_REDIS_URL', ''),
+}
+
+# ============================================================================
+# AUTOCOMPLETE INDEX
+# ============================================================================
+# In-memory search index per (tenant database, model, field) used by
+# search_records_view on prefix-search (SQLite) databases; kept current by
+# post_save/post_delete
+AUTOCOMPLETE_INDEX = {
+    'ENABLED': ENV.get('AUTOCOMPLETE_INDEX', 'off') == 'on',
+    'FIELDS': {
+        'common.Organization': ['CompanyName', 'Email'],
+    },
+    'MAX_BYTES': ENV.get_int('AUTOCOMPLETE_INDEX_MAX_MB', 64) * 1024 * 1024,
+    'MAX_ROWS': 50000,
+    'TTL': 600,
+}
+
+# ============================================================================
+# FULL-TEXT SEARCH
+# ============================================================================
+# Full-text search field weights (0..1) per model, applied at query time;
+# the searchable fields themselves are fixed by the search document migration
+FULL_TEXT_SEARCH = {
+    'common.Organization': {
+        'CompanyName': 1.0,
+        'ArabicName': 1.0,
+        'Email': 0.4,
+        'City': 0.2,
+    },
+}
+
+# ============================================================================
+# RECORD VERSIONS
+# ============================================================================
+# Row versions (UpdatedAt) behind the ETag / 304 answers of the record fetch
+# views (common.utils.record_versions), cached so a revalidation by primary
+# key skips the row. TTL bounds staleness when the cache is per process.
+RECORD_VERSIONS = {
+    'CACHE': 'default',
+    'TTL': ENV.get_int('RECORD_VERSION_TTL', 30),
+}
+
+# ============================================================================
+# NAVIGATION
+# ============================================================================
+# Sidebar menus are declared in <app>/navigation.py (common.utils.navigation);
+# badge counts are cached per tenant database for COUNTER_TTL seconds
+NAVIGATION = {
+    'CACHE': 'default',
+    'COUNTER_TTL': 60,
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -197,6 +325,27 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# ============================================================================
+# ASSET BUNDLES
+# ============================================================================
+# `python manage.py build_assets` concatenates each bundle into one
+# fingerprinted, precompressed file (common.utils.assets). Pages link a
+# bundle with {% css_bundle 'name' %} where they linked its files. Run it
+# before collectstatic.
+ASSETS = {
+    'OUTPUT_DIR': BASE_DIR / 'static' / 'bundles',
+    'PREFIX': 'bundles',
+    'BUNDLES': {
+        # Every page (base.html)
+        'base': ['common/css/global.css'],
+        # Dashboard and settings pages
+        'forms': ['common/css/colors.css', 'common/css/universal_form.css'],
+    },
+}
+
+# Content-hashed names (bundles, manifest storage) are cached for a year
+WHITENOISE_IMMUTABLE_FILE_TEST = r'\.[0-9a-f]{12}\.\w+$'
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
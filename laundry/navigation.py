@@ -0,0 +1,44 @@
+# laundry/navigation.py
+"""
+Sidebar menu of the laundry module (software_id 4)
+
+Discovered at startup; see common.utils.navigation. The 'Pending Orders'
+badge shows the 'laundry.pending_orders' counter once one is registered
+with register_counter().
+"""
+
+from common.utils.navigation import register_menu
+
+LAUNDRY_MENU = [
+    {
+        'id': 'orders',
+        'label': 'Orders',
+        'icon': '📋',
+        'active': True,
+        'items': [
+            {'label': 'New Order', 'url': 'laundry:new_order', 'active': False},
+            {'label': 'Pending Orders', 'url': 'laundry:pending_orders', 'counter': 'laundry.pending_orders'},
+            {'label': 'Completed Orders', 'url': 'laundry:completed_orders'},
+        ]
+    },
+    {
+        'id': 'customers',
+        'label': 'Customers',
+        'icon': '👥',
+        'items': [
+            {'label': 'All Customers', 'url': 'laundry:customers'},
+            {'label': 'Add Customer', 'url': 'laundry:add_customer'},
+        ]
+    },
+    {
+        'id': 'services',
+        'label': 'Services',
+        'icon': '🧺',
+        'items': [
+            {'label': 'Service List', 'url': 'laundry:services'},
+            {'label': 'Pricing', 'url': 'laundry:pricing'},
+        ]
+    },
+]
+
+register_menu('laundry', LAUNDRY_MENU)
@@ -0,0 +1,45 @@
+# restaurant/navigation.py
+"""
+Sidebar menu of the restaurant module (software_id 5)
+
+Discovered at startup; see common.utils.navigation. The 'Pending Orders'
+badge shows the 'restaurant.pending_orders' counter once one is registered
+with register_counter().
+"""
+
+from common.utils.navigation import register_menu
+
+RESTAURANT_MENU = [
+    {
+        'id': 'orders',
+        'label': 'Orders',
+        'icon': '🍽️',
+        'active': True,
+        'items': [
+            {'label': 'New Order', 'url': 'restaurant:new_order', 'active': False},
+            {'label': 'Pending Orders', 'url': 'restaurant:pending_orders', 'counter': 'restaurant.pending_orders'},
+            {'label': 'Completed Orders', 'url': 'restaurant:completed_orders'},
+        ]
+    },
+    {
+        'id': 'menu',
+        'label': 'Menu',
+        'icon': '📖',
+        'items': [
+            {'label': 'All Items', 'url': 'restaurant:menu_items'},
+            {'label': 'Add Item', 'url': 'restaurant:add_item'},
+            {'label': 'Categories', 'url': 'restaurant:categories'},
+        ]
+    },
+    {
+        'id': 'tables',
+        'label': 'Tables',
+        'icon': '🪑',
+        'items': [
+            {'label': 'All Tables', 'url': 'restaurant:tables'},
+            {'label': 'Reservations', 'url': 'restaurant:reservations'},
+        ]
+    },
+]
+
+register_menu('restaurant', RESTAURANT_MENU)
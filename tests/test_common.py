@@ -0,0 +1,776 @@
+# tests/test_common.py
+"""
+Tests for the common app
+
+Run with: python manage.py test tests
+"""
+
+import base64
+import gzip
+import os
+import tempfile
+from datetime import date
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import QuerySet
+from django.db.models.functions import Length
+from django.db.utils import load_backend
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.http import http_date
+
+import common.sessions
+from common.backends import get_auth_backend
+from common.middleware.request_context import PathClassifier
+from common.models.company_information import Organization
+from common.sessions import SessionStore
+from common.utils.assets import build_bundles, bundle_urls, read_source
+from common.utils.autocomplete_index import AutocompleteIndex, AutocompleteRegistry
+from common.utils.data_transfer import import_records, read_csv_rows
+from common.utils.form_helpers import changed_fields, upsert_record
+from common.utils.navigation import NavigationRegistry, compile_menu
+from common.utils.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from common.utils.record_versions import add_version_headers, not_modified, record_etag
+from common.utils.search_backends import TrigramSearchBackend
+from common.utils.tenant_pool import PoolExhausted, TenantConnectionPool
+from common.utils.tenant_registry import TenantRegistry, get_tenant_registry, record_from_row
+from common.views.company_info import COMPANY_FIELD_MAPPING, parse_company_data
+from core.dbhelper import main_database_changed
+
+
+def sqlite_config(path):
+    """Complete settings dict for a throwaway SQLite 'tenant' database"""
+    return connections.configure_settings({
+        # Pooled like get_complete_db_config(): lifetime managed by the pool
+        'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path, 'CONN_MAX_AGE': None},
+    })['default']
+
+
+def tenant_database(testcase, alias='tenant_test'):
+    """
+    Register a throwaway SQLite tenant database under alias, with the
+    common migrations applied; removed when the test ends
+    """
+    tempdir = tempfile.TemporaryDirectory()
+    testcase.addCleanup(tempdir.cleanup)
+    config = sqlite_config(os.path.join(tempdir.name, 'tenant.db'))
+    connection = load_backend(config['ENGINE']).DatabaseWrapper(config, alias)
+    connections[alias] = connection
+    testcase.addCleanup(connections.__delitem__, alias)
+    testcase.addCleanup(connection.close)
+    with override_settings(DATABASE_ROUTERS=[]):
+        MigrationExecutor(connection).migrate([('common', '0004_organization_updatedat')])
+    return alias
+
+
+class TenantConnectionPoolTests(SimpleTestCase):
+    """Checkout, release and eviction of pooled tenant connections"""
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.config_a = sqlite_config(os.path.join(self.tempdir.name, 'a.db'))
+        self.config_b = sqlite_config(os.path.join(self.tempdir.name, 'b.db'))
+        self.config_c = sqlite_config(os.path.join(self.tempdir.name, 'c.db'))
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def make_pool(self, **kwargs):
+        options = dict(max_per_tenant=2, max_total=4, idle_timeout=300,
+                       health_check_interval=None, checkout_timeout=0)
+        options.update(kwargs)
+        pool = TenantConnectionPool(**options)
+        self.addCleanup(pool.close_all)
+        return pool
+
+    def test_released_connection_is_reused(self):
+        pool = self.make_pool()
+        wrapper = pool.acquire(self.config_a, 'tenant_1')
+        wrapper.ensure_connection()
+        pool.release(wrapper)
+
+        self.assertEqual(pool.stats(), {'total': 1, 'in_use': 0, 'idle': 1, 'tenants': 1})
+        again = pool.acquire(self.config_a, 'tenant_2')
+        self.assertIs(again, wrapper)
+        self.assertEqual(again.alias, 'tenant_2')
+        self.assertIsNotNone(again.connection)
+        pool.release(again)
+
+    def test_tenants_do_not_share_connections(self):
+        pool = self.make_pool()
+        wrapper = pool.acquire(self.config_a, 'tenant_1')
+        wrapper.ensure_connection()
+        pool.release(wrapper)
+        other = pool.acquire(self.config_b, 'tenant_2')
+        self.assertIsNot(other, wrapper)
+        other.ensure_connection()
+        pool.release(other)
+        self.assertEqual(pool.stats()['tenants'], 2)
+
+    def test_per_tenant_limit(self):
+        pool = self.make_pool(max_per_tenant=1)
+        wrapper = pool.acquire(self.config_a, 'tenant_1')
+        with self.assertRaises(PoolExhausted):
+            pool.acquire(self.config_a, 'tenant_2')
+        pool.release(wrapper)
+        pool.release(pool.acquire(self.config_a, 'tenant_2'))
+
+    def test_least_recently_used_idle_connection_is_evicted_at_max_total(self):
+        pool = self.make_pool(max_total=2)
+        first = pool.acquire(self.config_a, 'tenant_1')
+        first.ensure_connection()
+        pool.release(first)
+        second = pool.acquire(self.config_b, 'tenant_2')
+        second.ensure_connection()
+        pool.release(second)
+
+        third = pool.acquire(self.config_c, 'tenant_3')
+        self.assertIsNone(first.connection)
+        self.assertEqual(pool.stats(), {'total': 2, 'in_use': 1, 'idle': 1, 'tenants': 2})
+        pool.release(third)
+
+    def test_idle_timeout(self):
+        pool = self.make_pool(idle_timeout=0)
+        wrapper = pool.acquire(self.config_a, 'tenant_1')
+        wrapper.ensure_connection()
+        pool.release(wrapper)
+
+        self.assertEqual(pool.evict_idle(), 1)
+        self.assertIsNone(wrapper.connection)
+        self.assertEqual(pool.stats()['total'], 0)
+
+    def test_connection_released_inside_a_transaction_is_discarded(self):
+        pool = self.make_pool()
+        wrapper = pool.acquire(self.config_a, 'pool_test')
+        connections['pool_test'] = wrapper
+        self.addCleanup(connections.__delitem__, 'pool_test')
+
+        atomic = transaction.atomic(using='pool_test')
+        atomic.__enter__()
+        wrapper.cursor().execute('CREATE TABLE t (id integer)')
+        pool.release(wrapper)
+
+        self.assertIsNone(wrapper.connection)
+        self.assertEqual(pool.stats(), {'total': 0, 'in_use': 0, 'idle': 0, 'tenants': 0})
+
+        fresh = pool.acquire(self.config_a, 'tenant_1')
+        self.assertIsNot(fresh, wrapper)
+        self.assertFalse(fresh.in_atomic_block)
+        with fresh.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone(), (1,))
+        pool.release(fresh)
+
+    def test_release_of_unknown_wrapper_is_ignored(self):
+        pool = self.make_pool()
+        wrapper = pool.acquire(self.config_a, 'tenant_1')
+        wrapper.ensure_connection()
+        pool.release(wrapper)
+        pool.release(wrapper)
+        self.assertEqual(pool.stats()['idle'], 1)
+
+
+class OrganizationMigrationTests(SimpleTestCase):
+    """Schema of the Organization table after the common migrations (SQLite)"""
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        config = sqlite_config(os.path.join(self.tempdir.name, 'tenant.db'))
+        self.connection = load_backend(config['ENGINE']).DatabaseWrapper(config, 'migration_test')
+        connections['migration_test'] = self.connection
+        self.addCleanup(connections.__delitem__, 'migration_test')
+        self.addCleanup(self.connection.close)
+
+    def sqlite_objects(self, kind):
+        with self.connection.cursor() as cursor:
+            cursor.execute('SELECT name FROM sqlite_master WHERE type = %s', [kind])
+            return {row[0] for row in cursor.fetchall()}
+
+    @override_settings(DATABASE_ROUTERS=[])
+    def test_updatedat_keeps_search_triggers_and_indexes(self):
+        executor = MigrationExecutor(self.connection)
+        executor.migrate([('common', '0004_organization_updatedat')])
+
+        columns = [
+            column.name for column in
+            self.connection.introspection.get_table_description(self.connection.cursor(), 'Organization')
+        ]
+        self.assertIn('UpdatedAt', columns)
+        self.assertLessEqual(
+            {'organization_fts_ai', 'organization_fts_ad', 'organization_fts_au'},
+            self.sqlite_objects('trigger'),
+        )
+        self.assertLessEqual(
+            {'organization_companyname_nocase', 'organization_email_nocase'},
+            self.sqlite_objects('index'),
+        )
+
+
+class RecordVersionTests(SimpleTestCase):
+    """ETags and 304 answers of the conditional fetch views"""
+
+    stamp = 1_700_000_000_123_456
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.etag = record_etag(Organization, 'tenant_1', 7, self.stamp, 'get')
+
+    def test_etag_changes_with_every_part(self):
+        self.assertEqual(self.etag, record_etag(Organization, 'tenant_1', 7, self.stamp, 'get'))
+        for other in (
+            record_etag(Organization, 'tenant_2', 7, self.stamp, 'get'),
+            record_etag(Organization, 'tenant_1', 8, self.stamp, 'get'),
+            record_etag(Organization, 'tenant_1', 7, self.stamp + 1, 'get'),
+            record_etag(Organization, 'tenant_1', 7, self.stamp, 'lookup'),
+        ):
+            self.assertNotEqual(self.etag, other)
+        self.assertTrue(self.etag.startswith('"') and self.etag.endswith('"'))
+
+    def test_matching_etag_is_not_modified(self):
+        request = self.factory.get('/company/7/', HTTP_IF_NONE_MATCH=self.etag)
+        response = not_modified(request, self.etag, self.stamp)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(response['Last-Modified'], http_date(self.stamp // 1_000_000))
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_other_etag_is_modified(self):
+        other = record_etag(Organization, 'tenant_1', 7, self.stamp - 1, 'get')
+        request = self.factory.get('/company/7/', HTTP_IF_NONE_MATCH=other)
+        self.assertIsNone(not_modified(request, self.etag, self.stamp))
+
+    def test_if_modified_since(self):
+        seconds = self.stamp // 1_000_000
+        request = self.factory.get('/company/7/', HTTP_IF_MODIFIED_SINCE=http_date(seconds))
+        self.assertEqual(not_modified(request, self.etag, self.stamp).status_code, 304)
+
+        request = self.factory.get('/company/7/', HTTP_IF_MODIFIED_SINCE=http_date(seconds - 60))
+        self.assertIsNone(not_modified(request, self.etag, self.stamp))
+
+    def test_version_headers(self):
+        response = add_version_headers(HttpResponse(), self.etag, self.stamp)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertIn('private', response['Cache-Control'])
+
+
+class CacheSessionStoreTests(SimpleTestCase):
+    """Expiry of sessions in the cache session store (common.sessions)"""
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('common.sessions.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def use_tiers(self, **options):
+        session_cache = {'LOCAL_MAX_ENTRIES': 100, 'LOCAL_TTL': 30, 'REDIS_URL': 'memory://'}
+        session_cache.update(options)
+        override = override_settings(SESSION_CACHE=session_cache)
+        override.enable()
+        self.addCleanup(override.disable)
+        common.sessions._tiers = None
+        self.addCleanup(setattr, common.sessions, '_tiers', None)
+
+    def new_session(self, expiry=None):
+        session = SessionStore()
+        session['custid'] = 'C001'
+        if expiry is not None:
+            session.set_expiry(expiry)
+        session.save()
+        return session.session_key
+
+    def test_missing_shared_tier_is_refused(self):
+        self.use_tiers(REDIS_URL='')
+        with self.assertRaises(ImproperlyConfigured):
+            SessionStore()
+
+    def test_session_outlives_local_ttl(self):
+        self.use_tiers()
+        key = self.new_session()
+
+        self.now += 3600
+        self.assertEqual(SessionStore(key).load(), {'custid': 'C001'})
+
+    def test_session_expires_with_its_expiry_age(self):
+        self.use_tiers()
+        key = self.new_session(expiry=120)
+
+        self.now += 119
+        self.assertTrue(SessionStore().exists(key))
+        self.now += 2
+        self.assertFalse(SessionStore().exists(key))
+        self.assertEqual(SessionStore(key).load(), {})
+
+    def test_local_copy_is_refreshed_from_shared_tier(self):
+        self.use_tiers()
+        key = self.new_session()
+        local, shared = common.sessions.get_session_tiers()
+
+        self.now += 31
+        self.assertIsNone(local.get(SessionStore.cache_key_prefix + key))
+        self.assertEqual(SessionStore(key).load()['custid'], 'C001')
+
+    def test_delete(self):
+        self.use_tiers()
+        key = self.new_session()
+        SessionStore(key).delete()
+        self.assertFalse(SessionStore().exists(key))
+
+
+class NavigationCountsTests(SimpleTestCase):
+    """Badge counts resolve the tenant database only when a counter runs"""
+
+    def setUp(self):
+        self.registry = NavigationRegistry({'CACHE': 'default', 'COUNTER_TTL': 0})
+        self.menu = compile_menu('test', [
+            {'id': 'orders', 'items': [{'label': 'Orders', 'counter': 'open_orders'}]},
+        ])
+
+    def test_database_is_not_resolved_without_registered_counters(self):
+        database = mock.Mock(return_value='tenant_1')
+        self.assertEqual(self.registry.get_counts(self.menu, database), {})
+        database.assert_not_called()
+
+    def test_database_callable_is_resolved_for_counters(self):
+        self.registry.register_counter('open_orders', lambda database: len(database))
+        database = mock.Mock(return_value='tenant_1')
+        self.assertEqual(self.registry.get_counts(self.menu, database), {'open_orders': 8})
+        database.assert_called_once_with()
+
+
+class AuthBackendTests(SimpleTestCase):
+    """The shared authentication backend follows MAIN database switches"""
+
+    def test_backend_is_rebuilt_after_main_database_change(self):
+        backend = get_auth_backend()
+        self.assertIs(get_auth_backend(), backend)
+
+        main_database_changed.send(sender=None)
+
+        rebuilt = get_auth_backend()
+        self.assertIsNot(rebuilt, backend)
+        self.assertIs(rebuilt.registry, get_tenant_registry())
+        self.assertIsNone(rebuilt._query)
+
+
+class PathClassifierTests(SimpleTestCase):
+    """(is_public, needs_session) flags of request paths"""
+
+    def test_default_prefixes(self):
+        classifier = PathClassifier(
+            ('/login/', '/admin/', '/static/', '/media/'),
+            ('/login/', '/static/', '/media/', '/favicon.ico', '/admin/'),
+        )
+        self.assertEqual(classifier.classify('/login/'), (True, False))
+        self.assertEqual(classifier.classify('/static/css/base.css'), (True, False))
+        self.assertEqual(classifier.classify('/favicon.ico'), (False, False))
+        self.assertEqual(classifier.classify('/company/7/'), (False, True))
+        self.assertEqual(classifier.classify('/'), (False, True))
+
+    def test_prefix_flags_do_not_mask_each_other(self):
+        # The longer public prefix must not hide the shorter no-session one
+        classifier = PathClassifier(('/static/',), ('/s',))
+        self.assertEqual(classifier.classify('/static/app.js'), (True, False))
+        self.assertEqual(classifier.classify('/search/'), (False, False))
+
+        classifier = PathClassifier(('/a',), ('/admin/',))
+        self.assertEqual(classifier.classify('/admin/'), (True, False))
+        self.assertEqual(classifier.classify('/about/'), (True, True))
+
+    def test_no_prefixes(self):
+        classifier = PathClassifier((), ())
+        self.assertEqual(classifier.classify('/login/'), (False, True))
+
+    def test_prefix_is_not_a_regex(self):
+        classifier = PathClassifier(('/a.b/',), ())
+        self.assertEqual(classifier.classify('/a.b/x'), (True, True))
+        self.assertEqual(classifier.classify('/axb/x'), (False, True))
+
+
+class AutocompleteIndexTests(SimpleTestCase):
+    """In-memory search agrees with the SQLite prefix backend (istartswith)"""
+
+    def setUp(self):
+        self.index = AutocompleteIndex('CompanyName')
+        self.index.extend(
+            (pk, {'CompanyId': pk, 'CompanyName': name})
+            for pk, name in enumerate(['Nepton Trading', 'Neptune', 'Al Nepton', 'nep', 'Other'], 1)
+        )
+
+    def names(self, term, limit=10, after=None):
+        return [row['CompanyName'] for rank, pk, row in self.index.search(term, limit, after)]
+
+    def test_prefix_matches_shortest_first(self):
+        self.assertEqual(self.names('Nep'), ['nep', 'Neptune', 'Nepton Trading'])
+        self.assertEqual(self.names('nepton'), ['Nepton Trading'])
+        self.assertEqual(self.names('n'), ['nep', 'Neptune', 'Nepton Trading'])
+
+    def test_substring_is_not_a_match(self):
+        self.assertEqual(self.names('ton'), [])
+        self.assertEqual(self.names('Al N'), ['Al Nepton'])
+
+    def test_pages_continue_after_the_cursor(self):
+        first = self.index.search('nep', limit=2)
+        self.assertEqual([row['CompanyName'] for rank, pk, row in first], ['nep', 'Neptune'])
+        rank, pk, row = first[-1]
+        self.assertEqual(self.names('nep', limit=2, after=[rank, pk]), ['Nepton Trading'])
+
+    def test_add_and_remove(self):
+        self.index.add(6, {'CompanyId': 6, 'CompanyName': 'Nepal'})
+        self.index.remove(1)
+        self.assertEqual(self.names('nep'), ['nep', 'Nepal', 'Neptune'])
+
+    def test_ties_are_ordered_by_native_pk(self):
+        self.index.add(10, {'CompanyId': 10, 'CompanyName': 'Nepal'})
+        self.index.add(9, {'CompanyId': 9, 'CompanyName': 'NEPAL'})
+        ranked = [(rank, pk) for rank, pk, row in self.index.search('nepa')]
+        self.assertEqual(ranked, [(5, 9), (5, 10)])
+        self.assertEqual([pk for rank, pk, row in self.index.search('nepa', after=[5, 9])], [10])
+
+    def test_substring_search_backends_bypass_the_index(self):
+        db = tenant_database(self)
+        registry = AutocompleteRegistry(fields={'common.Organization': ['CompanyName']})
+        self.assertEqual(registry.search(Organization, 'CompanyName', 'Nep', db), [])
+
+        with mock.patch('common.utils.autocomplete_index.get_search_backend',
+                        return_value=TrigramSearchBackend()):
+            self.assertIsNone(registry.search(Organization, 'CompanyName', 'Nep', db))
+
+
+class TenantRegistryTests(SimpleTestCase):
+    """Lookups of tenants in the registry snapshot"""
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('common.utils.tenant_registry.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.registry = TenantRegistry(ttl=300, miss_ttl=30)
+        self.tenant = record_from_row('C001', 'Nepton', None, 'db.local', 'c001', 'user', 'pwd', None)
+        self.rows = {'C001': self.tenant}
+        self.queries = []
+
+        def query(custid=None):
+            self.queries.append(custid)
+            if custid is None:
+                return list(self.rows.values())
+            return [self.rows[custid]] if custid in self.rows else []
+
+        self.registry._query = query
+
+    def test_snapshot_is_loaded_once(self):
+        self.assertEqual(self.registry.get('C001'), self.tenant)
+        self.assertEqual(self.registry.get('C001'), self.tenant)
+        self.assertEqual(self.queries, [None])
+
+    def test_unknown_custid_is_not_queried_again_within_miss_ttl(self):
+        self.assertIsNone(self.registry.get('C404'))
+        self.assertIsNone(self.registry.get('C404'))
+        self.assertEqual(self.queries, [None, 'C404'])
+
+        self.now += 31
+        self.assertIsNone(self.registry.get('C404'))
+        self.assertEqual(self.queries, [None, 'C404', 'C404'])
+
+    def test_new_tenant_is_found_after_invalidate(self):
+        self.assertIsNone(self.registry.get('C002'))
+        added = self.tenant._replace(custid='C002')
+        self.rows['C002'] = added
+
+        self.assertIsNone(self.registry.get('C002'))
+        self.registry.invalidate('C002')
+        self.assertEqual(self.registry.get('C002'), added)
+
+    def test_put_clears_the_miss(self):
+        self.assertIsNone(self.registry.get('C002'))
+        added = self.tenant._replace(custid='C002')
+        self.registry.put(added)
+        self.assertEqual(self.registry.get('C002'), added)
+
+
+class AssetBundleTests(SimpleTestCase):
+    """build_assets output and the URLs linked by {% css_bundle %}"""
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        override = override_settings(ASSETS={
+            'OUTPUT_DIR': self.tempdir.name,
+            'PREFIX': 'bundles',
+            'BUNDLES': {'forms': ['common/css/colors.css', 'common/css/universal_form.css']},
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_source_files_are_linked_until_built(self):
+        self.assertEqual(bundle_urls('forms'), [
+            '/static/common/css/colors.css', '/static/common/css/universal_form.css',
+        ])
+
+    def test_bundle_keeps_source_order(self):
+        manifest = build_bundles()
+        filename = os.path.basename(manifest['forms'])
+        self.assertRegex(filename, r'^forms\.[0-9a-f]{12}\.css$')
+        self.assertEqual(bundle_urls('forms'), ['/static/' + manifest['forms']])
+
+        with open(os.path.join(self.tempdir.name, filename), encoding='utf-8') as f:
+            data = f.read()
+        colors = data.index(read_source('common/css/colors.css').strip())
+        self.assertLess(colors, data.index(read_source('common/css/universal_form.css').strip()))
+        with gzip.open(os.path.join(self.tempdir.name, filename + '.gz'), 'rt', encoding='utf-8') as f:
+            self.assertEqual(f.read(), data)
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor tokens and keyset pages (on the MAIN database's content types)"""
+
+    databases = {'default'}
+
+    def pages(self, queryset, rank_field=None, limit=3):
+        rows, cursor, pages = [], None, 0
+        while True:
+            after = decode_cursor(cursor)[1:] if cursor else None
+            page, cursor = keyset_page(queryset, ['model'], limit, 'db', rank_field=rank_field, after=after)
+            rows.extend(row['pk'] for row in page)
+            pages += 1
+            if cursor is None:
+                return rows, pages
+
+    def test_cursor_round_trip(self):
+        for rank, pk in ((None, 5), (0.25, 'C001'), ([1, 0.5], 7)):
+            token = encode_cursor('db', rank, pk)
+            self.assertNotIn('=', token)
+            expected_rank = tuple(rank) if isinstance(rank, list) else rank
+            self.assertEqual(decode_cursor(token), ('db', expected_rank, pk))
+
+    def test_tampered_cursors_are_rejected(self):
+        def token(raw):
+            return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+        for cursor in (
+            'not a cursor!',
+            encode_cursor('db', 1, 2)[:-3],
+            token('abc'),                              # unpacks to three characters
+            token('{"a": 1, "b": 2, "c": 3}'),         # unpacks to three keys
+            token('["db", 1]'),
+            token('["db", {"x": 1}, 2]'),
+            token('["db", 1, [2]]'),
+            token('["db", 1, null]'),
+            token('[1, 1, 2]'),
+        ):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+    def test_pages_cover_every_row_once(self):
+        queryset = ContentType.objects.order_by('pk')
+        expected = list(queryset.values_list('pk', flat=True))
+        self.assertGreater(len(expected), 3)
+
+        rows, pages = self.pages(queryset)
+        self.assertEqual(rows, expected)
+        self.assertEqual(pages, -(-len(expected) // 3))
+
+    def test_ranked_pages_follow_rank_then_pk(self):
+        # Many rows share a rank, so pages must break ties on pk
+        queryset = ContentType.objects.annotate(rank=Length('model')).order_by('rank', 'pk')
+        expected = list(queryset.values_list('pk', flat=True))
+
+        rows, pages = self.pages(queryset, rank_field='rank', limit=2)
+        self.assertEqual(rows, expected)
+
+
+class UpsertRecordTests(SimpleTestCase):
+    """Saving companies with one upsert of the changed fields"""
+
+    def setUp(self):
+        self.db = tenant_database(self)
+        self.data = {
+            'CompanyId': 1, 'CompanyName': 'Nepton', 'City': 'Doha', 'BusinessType': 1,
+            'PeriodFrom': date(2026, 1, 1), 'PeriodTo': date(2026, 12, 31),
+        }
+
+    def stored(self):
+        return Organization.objects.using(self.db).get(CompanyId=1)
+
+    def test_changed_fields(self):
+        self.assertEqual(changed_fields(self.data, None, 'CompanyId'),
+                         ['CompanyName', 'City', 'BusinessType', 'PeriodFrom', 'PeriodTo'])
+        original = dict(self.data, City='Dubai')
+        self.assertEqual(changed_fields(self.data, original, 'CompanyId'), ['City'])
+        self.assertEqual(changed_fields(self.data, self.data, 'CompanyId'), [])
+
+    def test_insert(self):
+        result = upsert_record(Organization, self.data, 'CompanyId', database=self.db)
+
+        self.assertTrue(result['success'], result['error'])
+        self.assertEqual(result['action'], 'saved')
+        self.assertEqual(self.stored().CompanyName, 'Nepton')
+        self.assertIsNotNone(self.stored().UpdatedAt)
+
+    def test_update_writes_only_changed_fields(self):
+        upsert_record(Organization, self.data, 'CompanyId', database=self.db)
+        # Someone else moved the company after this client loaded it
+        Organization.objects.using(self.db).filter(CompanyId=1).update(City='Dubai')
+        version = self.stored().UpdatedAt
+
+        result = upsert_record(Organization, dict(self.data, CompanyName='Nepton LLC'), 'CompanyId',
+                               database=self.db, original=self.data)
+
+        self.assertEqual(result['action'], 'updated')
+        self.assertEqual(result['changed_fields'], ['CompanyName'])
+        stored = self.stored()
+        self.assertEqual((stored.CompanyName, stored.City), ('Nepton LLC', 'Dubai'))
+        self.assertGreater(stored.UpdatedAt, version)
+
+    def test_unchanged_record_is_not_written(self):
+        upsert_record(Organization, self.data, 'CompanyId', database=self.db)
+        version = self.stored().UpdatedAt
+
+        result = upsert_record(Organization, self.data, 'CompanyId', database=self.db, original=self.data)
+
+        self.assertEqual(result['action'], 'unchanged')
+        self.assertEqual(self.stored().UpdatedAt, version)
+
+    def autocomplete_registry(self):
+        registry = AutocompleteRegistry(fields={'common.Organization': ['CompanyName']})
+        patcher = mock.patch('common.utils.autocomplete_index.get_autocomplete_registry',
+                             return_value=registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return registry
+
+    def test_index_takes_only_the_written_fields(self):
+        upsert_record(Organization, self.data, 'CompanyId', database=self.db)
+        Organization.objects.using(self.db).filter(CompanyId=1).update(City='Dubai')
+        registry = self.autocomplete_registry()
+        index = registry.get_index(Organization, 'CompanyName', self.db)
+
+        upsert_record(Organization, dict(self.data, CompanyName='Nepton LLC'), 'CompanyId',
+                      database=self.db, original=self.data)
+
+        row = index.get(1)
+        self.assertEqual((row['CompanyName'], row['City']), ('Nepton LLC', 'Dubai'))
+        self.assertIs(registry.get_index(Organization, 'CompanyName', self.db), index)
+
+    def test_index_without_the_row_is_rebuilt(self):
+        registry = self.autocomplete_registry()
+        index = registry.get_index(Organization, 'CompanyName', self.db)
+
+        upsert_record(Organization, self.data, 'CompanyId', database=self.db)
+
+        rebuilt = registry.get_index(Organization, 'CompanyName', self.db)
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(rebuilt.get(1)['CompanyName'], 'Nepton')
+
+    def test_error_is_reported(self):
+        result = upsert_record(Organization, dict(self.data, Unknown=1), 'CompanyId', database=self.db)
+        self.assertFalse(result['success'])
+        self.assertIsNone(result['record'])
+        self.assertTrue(result['error'])
+
+
+class ImportRecordsTests(SimpleTestCase):
+    """Per-row error report of company imports"""
+
+    header = 'company_code,company_name,city,period_from\n'
+
+    def setUp(self):
+        self.db = tenant_database(self)
+
+    def import_csv(self, lines, **kwargs):
+        upload = SimpleUploadedFile('companies.csv', (self.header + lines).encode('utf-8'))
+        return import_records(
+            Organization, read_csv_rows(upload), parse_company_data, 'CompanyId',
+            database=self.db, field_mapping=COMPANY_FIELD_MAPPING, **kwargs
+        )
+
+    def test_invalid_rows_are_reported_by_line(self):
+        result = self.import_csv(
+            '1,Nepton,Doha,2026-01-01\n'
+            'x,Bad code,Doha,2026-01-01\n'
+            '3,,Doha,2026-01-01\n'
+            '4,Bad date,Doha,01/01/2026\n'
+            '5,Neptune,Doha,\n'
+        )
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['imported'], 2)
+        self.assertEqual(result['error_count'], 3)
+        self.assertEqual([error['row'] for error in result['errors']], [3, 4, 5])
+        self.assertIn('Invalid Company Code', result['errors'][0]['error'])
+        self.assertIn('CompanyName', result['errors'][1]['error'])
+        self.assertIn('period_from', result['errors'][2]['error'])
+        self.assertEqual(
+            sorted(Organization.objects.using(self.db).values_list('CompanyId', flat=True)), [1, 5]
+        )
+
+    def test_duplicate_key_reports_the_replaced_row(self):
+        result = self.import_csv('1,First,Doha,\n1,Second,Doha,\n')
+
+        self.assertEqual(result['imported'], 1)
+        self.assertEqual(result['errors'], [{'row': 2, 'error': 'Duplicate CompanyId 1, replaced by row 3'}])
+        self.assertEqual(Organization.objects.using(self.db).get(CompanyId=1).CompanyName, 'Second')
+
+    def test_reported_errors_are_capped(self):
+        with mock.patch('common.utils.data_transfer.MAX_REPORTED_ERRORS', 2):
+            result = self.import_csv('x,A,,\ny,B,,\nz,C,,\n', chunk_size=2)
+
+        self.assertEqual(result['imported'], 0)
+        self.assertEqual(result['error_count'], 3)
+        self.assertEqual([error['row'] for error in result['errors']], [2, 3])
+
+    def test_rejected_chunk_is_reported_and_the_import_continues(self):
+        bulk_create = QuerySet.bulk_create
+        calls = []
+
+        def fail_second_chunk(queryset, objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 2:
+                raise IntegrityError('constraint failed')
+            return bulk_create(queryset, objs, *args, **kwargs)
+
+        registry = mock.Mock()
+        with mock.patch.object(QuerySet, 'bulk_create', fail_second_chunk), \
+                mock.patch('common.utils.data_transfer.get_autocomplete_registry', return_value=registry):
+            result = self.import_csv('1,A,,\n2,B,,\n3,C,,\n4,D,,\n5,E,,\n', chunk_size=2)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['imported'], 3)
+        self.assertEqual([error['row'] for error in result['errors']], [4, 5])
+        self.assertIn('constraint failed', result['errors'][0]['error'])
+        self.assertEqual(
+            sorted(Organization.objects.using(self.db).values_list('CompanyId', flat=True)), [1, 2, 5]
+        )
+        registry.clear.assert_called_once_with(self.db)
+
+    def test_index_is_cleared_when_the_import_fails(self):
+        def broken_rows():
+            yield 2, {'company_code': '1', 'company_name': 'A', 'city': '', 'period_from': ''}
+            raise UnicodeDecodeError('utf-8', b'\xff', 0, 1, 'invalid start byte')
+
+        registry = mock.Mock()
+        with mock.patch('common.utils.data_transfer.get_autocomplete_registry', return_value=registry):
+            with self.assertRaises(UnicodeDecodeError):
+                import_records(Organization, broken_rows(), parse_company_data, 'CompanyId',
+                               database=self.db, field_mapping=COMPANY_FIELD_MAPPING, chunk_size=1)
+        registry.clear.assert_called_once_with(self.db)
+
+    def test_existing_records_keep_columns_missing_from_the_file(self):
+        Organization.objects.using(self.db).create(
+            CompanyId=1, CompanyName='Nepton', Email='info@nepton.example', BusinessType=1,
+            PeriodFrom=date(2026, 1, 1), PeriodTo=date(2026, 12, 31),
+        )
+        result = self.import_csv('1,Nepton LLC,Doha,2026-01-01\n')
+
+        self.assertEqual(result['error_count'], 0)
+        stored = Organization.objects.using(self.db).get(CompanyId=1)
+        self.assertEqual((stored.CompanyName, stored.City), ('Nepton LLC', 'Doha'))
+        self.assertEqual(stored.Email, 'info@nepton.example')
@@ -0,0 +1,234 @@
+# tests/test_core.py
+"""
+Tests for the core package
+
+Run with: python manage.py test tests
+"""
+
+import os
+import tempfile
+import threading
+from unittest import mock
+
+from django.contrib.sessions.models import Session
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import include, path
+
+import core.dbhelper
+import core.env_config
+from core.dbhelper import (
+    DatabaseHelper, check_config_file, config_generation, main_database_changed,
+    reconfigure_main_database, refresh_main_connection,
+)
+from core.env_config import env_config_changed, get_env_config, refresh_env_config_if_changed
+from common.views.settings import save_database_config
+
+# save_database_config is not routed in common.urls
+urlpatterns = [
+    path('settings/database/save/', save_database_config),
+    path('', include('common.urls')),
+]
+
+
+def write_file(path, text, mtime):
+    with open(path, 'w') as f:
+        f.write(text)
+    os.utime(path, (mtime, mtime))
+
+
+class EnvConfigRefreshTests(SimpleTestCase):
+    """Edits of .env are picked up without a restart"""
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.env_file = os.path.join(self.tempdir.name, '.env')
+        write_file(self.env_file, 'ERP_TEST_VALUE=first\n', 1_000_000)
+
+        for patcher in (
+            mock.patch.object(core.env_config, 'ENV_FILE', self.env_file),
+            mock.patch.object(core.env_config, '_config', None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.changes = []
+        receiver = lambda sender, config, **kwargs: self.changes.append(config)
+        env_config_changed.connect(receiver, weak=False, dispatch_uid='test_env_config')
+        self.addCleanup(env_config_changed.disconnect, dispatch_uid='test_env_config')
+
+    def test_unchanged_file_is_not_reloaded(self):
+        config = get_env_config()
+        self.assertFalse(refresh_env_config_if_changed())
+        self.assertIs(get_env_config(), config)
+        self.assertEqual(self.changes, [])
+
+    def test_changed_file_is_reloaded(self):
+        self.assertEqual(get_env_config().get('ERP_TEST_VALUE'), 'first')
+        write_file(self.env_file, 'ERP_TEST_VALUE=second\n', 1_000_060)
+
+        self.assertTrue(refresh_env_config_if_changed())
+        self.assertEqual(get_env_config().get('ERP_TEST_VALUE'), 'second')
+        self.assertEqual(self.changes, [get_env_config()])
+
+    @override_settings(DB_CONFIG={'CHECK_INTERVAL': 0})
+    def test_request_check_reloads_env_and_main_database(self):
+        get_env_config()
+        missing = os.path.join(self.tempdir.name, 'db_config.ini')
+        with mock.patch.object(core.dbhelper.DatabaseHelper, 'get_config_path', return_value=missing), \
+                mock.patch.object(core.dbhelper, '_applied_signature', None), \
+                mock.patch.object(core.dbhelper, 'reconfigure_main_database') as reconfigure:
+            check_config_file()
+            reconfigure.assert_not_called()
+
+            # No db_config.ini: the MAIN database comes from .env
+            write_file(self.env_file, 'ERP_TEST_VALUE=second\n', 1_000_060)
+            check_config_file()
+            reconfigure.assert_called_once_with()
+        self.assertEqual(get_env_config().get('ERP_TEST_VALUE'), 'second')
+
+
+class DatabaseHelperTests(SimpleTestCase):
+    """db_config.ini caching and live MAIN database switches"""
+
+    credentials = {
+        'engine': 'postgresql', 'name': 'erp_main', 'user': 'erp', 'password': 'secret',
+        'host': 'db2.example', 'port': '5433',
+    }
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.config_path = os.path.join(self.tempdir.name, 'db_config.ini')
+
+        # Reconfiguration replaces the test database settings and bumps
+        # module state; all of it is put back after each test
+        saved_settings = connections.settings['default']
+        self.addCleanup(connections.settings.__setitem__, 'default', saved_settings)
+        for patcher in (
+            mock.patch.object(DatabaseHelper, 'get_config_path', return_value=self.config_path),
+            mock.patch.object(core.dbhelper, '_applied_signature', None),
+            mock.patch.object(core.dbhelper, '_generation', 0),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        DatabaseHelper.invalidate_cache()
+        self.addCleanup(DatabaseHelper.invalidate_cache)
+
+    def test_config_file_is_parsed_once_per_version(self):
+        self.assertIsNone(DatabaseHelper.load_credentials())
+        DatabaseHelper.save_credentials(self.credentials)
+
+        with mock.patch.object(DatabaseHelper, '_parse', wraps=DatabaseHelper._parse) as parse:
+            first = DatabaseHelper.load_credentials()
+            self.assertEqual(DatabaseHelper.load_credentials(), first)
+            self.assertEqual(parse.call_count, 1)
+
+            # Edited by another process: new mtime and size
+            DatabaseHelper.save_credentials(dict(self.credentials, host='db3.example'))
+            os.utime(self.config_path, ns=(1, 1))
+            self.assertEqual(DatabaseHelper.load_credentials()['HOST'], 'db3.example')
+            self.assertEqual(parse.call_count, 2)
+
+        self.assertEqual(first['HOST'], 'db2.example')
+        self.assertEqual(first['PORT'], '5433')
+
+    def test_returned_credentials_are_copies(self):
+        DatabaseHelper.save_credentials(self.credentials)
+        DatabaseHelper.load_credentials()['HOST'] = 'changed'
+        self.assertEqual(DatabaseHelper.load_credentials()['HOST'], 'db2.example')
+
+    def test_reconfigure_switches_the_main_database(self):
+        DatabaseHelper.save_credentials(self.credentials)
+        sent = []
+        receiver = lambda sender, settings_dict, **kwargs: sent.append(settings_dict)
+        main_database_changed.connect(receiver, weak=False, dispatch_uid='test_main_database')
+        self.addCleanup(main_database_changed.disconnect, dispatch_uid='test_main_database')
+
+        with mock.patch.object(core.dbhelper, 'refresh_main_connection') as refresh:
+            generation = reconfigure_main_database()
+
+        new_settings = connections.settings['default']
+        self.assertEqual(generation, 1)
+        self.assertEqual(config_generation(), 1)
+        self.assertEqual(new_settings['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((new_settings['HOST'], new_settings['NAME']), ('db2.example', 'erp_main'))
+        self.assertEqual(sent, [new_settings])
+        refresh.assert_called_once_with()
+
+    def test_stale_connection_is_replaced_at_the_next_request(self):
+        DatabaseHelper.save_credentials(self.credentials)
+        results = {}
+
+        def worker():
+            # Per-thread wrapper opened with the old settings (never connected)
+            old = connections['default']
+            with mock.patch.object(core.dbhelper, 'refresh_main_connection'):
+                reconfigure_main_database()
+            with mock.patch.object(core.dbhelper, 'check_config_file'):
+                refresh_main_connection()
+            new = connections['default']
+            results['replaced'] = new is not old
+            results['settings'] = new.settings_dict is connections.settings['default']
+            connections.close_all()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        self.assertEqual(results, {'replaced': True, 'settings': True})
+
+    @override_settings(DB_CONFIG={'CHECK_INTERVAL': 0})
+    def test_changed_config_file_triggers_reconfiguration(self):
+        with mock.patch.object(core.dbhelper, 'reconfigure_main_database') as reconfigure:
+            check_config_file()
+            reconfigure.assert_not_called()
+
+            DatabaseHelper.save_credentials(self.credentials)
+            check_config_file()
+            reconfigure.assert_called_once_with()
+
+
+@override_settings(
+    ROOT_URLCONF=__name__,
+    MESSAGE_STORAGE='django.contrib.messages.storage.session.SessionStorage',
+)
+class SaveDatabaseConfigViewTests(TestCase):
+    """Saving db_config.ini through the middleware stack"""
+
+    databases = {'default'}
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        for patcher in (
+            mock.patch.object(DatabaseHelper, 'get_config_path',
+                              return_value=os.path.join(self.tempdir.name, 'db_config.ini')),
+            mock.patch.object(DatabaseHelper, 'test_connection', return_value=(True, 'ok')),
+            mock.patch.object(core.dbhelper, '_reconfigure_pending', False),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(DatabaseHelper.invalidate_cache)
+
+        session = self.client.session
+        session.update({'is_authenticated': True, 'username': 'admin', 'custid': 'C001'})
+        session.save()
+
+    def test_switch_happens_after_the_session_is_saved(self):
+        switched = []
+
+        def switch():
+            # The new MAIN database has none of the old sessions
+            switched.append(Session.objects.filter(session_key=self.client.session.session_key).exists())
+            Session.objects.all().delete()
+
+        with mock.patch.object(core.dbhelper, 'reconfigure_main_database', side_effect=switch):
+            response = self.client.post('/settings/database/save/', {
+                'db_name': 'erp_main', 'db_user': 'erp', 'db_password': 'secret',
+                'db_host': 'db2.example', 'db_port': '5433',
+            })
+
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertEqual(switched, [True])
+        self.assertEqual(DatabaseHelper.load_credentials()['HOST'], 'db2.example')